@@ -4,15 +4,26 @@ Script to add images to Blood_Assassin_Character_Dossier.docx
 Automatically inserts character portraits and scene images with captions
 """
 
+import argparse
+import copy
+import hashlib
+import io
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from build_profile import StageProfiler
+
 try:
     from docx import Document
     from docx.shared import Inches, Pt
     from docx.enum.text import WD_ALIGN_PARAGRAPH
 except ImportError:
+    if __name__ != "__main__":
+        raise  # importers (the API, the CLI) report it themselves
     print("ERROR: python-docx not installed")
     print("Install with: pip install python-docx")
     sys.exit(1)
@@ -82,6 +93,16 @@ IMAGE_MAP = {
 }
 
 
+# SVG artwork from 03-canvas-design, rasterized for the dossier (see svg_raster.py)
+EMBLEM_MAP = {
+    "crimson_court_emblem.svg": {"title": "Emblem of the Crimson Court", "width": 2.5},
+    "order_of_dagger_emblem.svg": {"title": "Emblem of the Order of the Dagger", "width": 2.5},
+    "nightbringer_concept.svg": {"title": "The Nightbringer - Concept", "width": 5.5},
+    "elara_nightshade_portrait.svg": {"title": "Elara Nightshade - Concept Portrait", "width": 4.0},
+}
+EMBLEM_DPI = 200
+
+
 def find_paragraph_by_keyword(doc, keywords):
     """Find a paragraph containing any of the keywords (case-insensitive)"""
     for i, para in enumerate(doc.paragraphs):
@@ -179,115 +200,173 @@ def add_images_smart_placement(doc, images_dir):
     return added_images
 
 
-def add_images_to_document(docx_path, images_dir, output_path=None):
-    """Main function to add images to the document"""
-    
-    if not os.path.exists(docx_path):
-        print(f"ERROR: Document not found: {docx_path}")
-        return False
-    
-    if not os.path.exists(images_dir):
-        print(f"ERROR: Images directory not found: {images_dir}")
-        return False
-    
-    print(f"📄 Loading document: {docx_path}")
-    doc = Document(docx_path)
-    
-    print(f"📁 Images directory: {images_dir}")
-    print(f"🖼️  Processing {len(IMAGE_MAP)} images...\n")
-    
-    # Strategy: Add images at the end with clear section breaks
-    # This is safer than trying to insert in the middle
-    
+# Gallery sections in document order: (heading, IMAGE_MAP section names)
+GALLERY_SECTIONS = [
+    ("Character Portraits", ["Elara", "Lysandria", "Seraphiel"]),
+    ("Key Locations", ["locations"]),
+    ("Key Scenes", ["scenes"]),
+]
+
+
+def add_gallery(doc, images_dir, image_names=None, sections=None,
+                heading='Visual Reference Gallery', image_source=None, profiler=None, skip=None):
+    """Append the Visual Reference Gallery to an open document
+
+    Args:
+        doc: python-docx Document to append to
+        images_dir: Directory holding the IMAGE_MAP files
+        image_names: Optional subset of IMAGE_MAP filenames to include
+        sections: Optional subset of IMAGE_MAP section names to include
+        heading: Title of the gallery heading
+        image_source: Optional callable(path) -> path or file-like, used to
+                      supply pre-loaded image data instead of reading from disk
+        profiler: Optional StageProfiler; each image is recorded as a stage
+        skip: Optional set of IMAGE_MAP filenames to leave out (e.g. duplicates)
+
+    Returns:
+        list[str]: Filenames that were added
+    """
+    added = []
+    first_section = True
+    profiler = profiler or StageProfiler("add_gallery", enabled=False)
+
     # Add a page break and section header
     doc.add_page_break()
-    
+
     # Add main section header
-    header = doc.add_heading('Visual Reference Gallery', level=1)
+    header = doc.add_heading(heading, level=1)
     header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Character Portraits Section
-    doc.add_heading('Character Portraits', level=2)
-    
-    for img_filename in sorted(IMAGE_MAP.keys()):
-        if IMAGE_MAP[img_filename]["section"] in ["Elara", "Lysandria", "Seraphiel"]:
+
+    for section_title, section_names in GALLERY_SECTIONS:
+        if sections is not None:
+            section_names = [name for name in section_names if name in sections]
+            if not section_names:
+                continue
+
+        if not first_section:
+            doc.add_page_break()
+        first_section = False
+        doc.add_heading(section_title, level=2)
+
+        for img_filename in sorted(IMAGE_MAP.keys()):
+            if IMAGE_MAP[img_filename]["section"] not in section_names:
+                continue
+            if image_names is not None and img_filename not in image_names:
+                continue
+            if skip and img_filename in skip:
+                print(f"↷ Skipping duplicate: {img_filename}")
+                continue
+
             img_info = IMAGE_MAP[img_filename]
             img_path = os.path.join(images_dir, img_filename)
-            
+
             if os.path.exists(img_path):
                 # Add title
                 title_para = doc.add_paragraph()
                 title_para.add_run(img_info["title"]).bold = True
                 title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
+
                 # Add image
-                para = doc.add_paragraph()
-                run = para.add_run()
-                run.add_picture(img_path, width=Inches(img_info["width"]))
-                para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
+                with profiler.stage(f"image:{img_filename}", bytes=os.path.getsize(img_path)):
+                    para = doc.add_paragraph()
+                    run = para.add_run()
+                    picture = image_source(img_path) if image_source else img_path
+                    run.add_picture(picture, width=Inches(img_info["width"]))
+                    para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
                 # Add spacing
                 doc.add_paragraph()
-                
+
                 print(f"✓ Added: {img_filename}")
+                added.append(img_filename)
             else:
                 print(f"⚠️  Missing: {img_filename}")
-    
-    # Locations Section
+
+    return added
+
+
+def _emblem_entries(emblems_dir):
+    """{name: (svg path, width_in, None)} for the EMBLEM_MAP artwork present in emblems_dir"""
+    return {name: (os.path.join(emblems_dir, name), info["width"], None)
+            for name, info in EMBLEM_MAP.items() if os.path.exists(os.path.join(emblems_dir, name))}
+
+
+def add_emblems(doc, emblems_dir, dpi=EMBLEM_DPI, profiler=None):
+    """Append the EMBLEM_MAP artwork, rasterized in parallel at each display width
+
+    Returns:
+        list[str]: Filenames that were added
+    """
+    from svg_raster import rasterize_many
+
+    profiler = profiler or StageProfiler("add_emblems", enabled=False)
+    entries = _emblem_entries(emblems_dir)
+    with profiler.stage("rasterize"):
+        rendered = rasterize_many(entries.values(), dpi=dpi)
+    if not rendered:
+        print(f"⚠️  No emblems rendered from {emblems_dir}")
+        return []
+
     doc.add_page_break()
-    doc.add_heading('Key Locations', level=2)
+    doc.add_heading("Emblems & Concept Art", level=2)
+    added = []
+    for name, entry in entries.items():
+        if entry not in rendered:
+            continue
+        title_para = doc.add_paragraph()
+        title_para.add_run(EMBLEM_MAP[name]["title"]).bold = True
+        title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        para = doc.add_paragraph()
+        para.add_run().add_picture(rendered[entry], width=Inches(EMBLEM_MAP[name]["width"]))
+        para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        doc.add_paragraph()
+        print(f"✓ Added: {name}")
+        added.append(name)
+    return added
+
+
+def duplicate_images(images_dir, threshold):
+    """IMAGE_MAP filenames that near-duplicate an earlier IMAGE_MAP image (see image_dedupe.py)"""
+    from image_dedupe import find_duplicates
+
+    paths = [os.path.join(images_dir, name) for name in sorted(IMAGE_MAP.keys())]
+    return {os.path.basename(path) for path in find_duplicates(paths, threshold)}
+
+
+def add_images_to_document(docx_path, images_dir, output_path=None, profiler=None,
+                           skip_duplicates=None, emblems_dir=None):
+    """
+    Main function to add images to the document
+
+    skip_duplicates: Optional Hamming-distance threshold; near-duplicate
+                     images are left out of the gallery
+    emblems_dir: Optional directory of EMBLEM_MAP SVGs to append, rasterized
+    """
+    profiler = profiler or StageProfiler("add_images_to_dossier", enabled=False)
     
-    for img_filename in sorted(IMAGE_MAP.keys()):
-        if IMAGE_MAP[img_filename]["section"] == "locations":
-            img_info = IMAGE_MAP[img_filename]
-            img_path = os.path.join(images_dir, img_filename)
-            
-            if os.path.exists(img_path):
-                # Add title
-                title_para = doc.add_paragraph()
-                title_para.add_run(img_info["title"]).bold = True
-                title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Add image
-                para = doc.add_paragraph()
-                run = para.add_run()
-                run.add_picture(img_path, width=Inches(img_info["width"]))
-                para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Add spacing
-                doc.add_paragraph()
-                
-                print(f"✓ Added: {img_filename}")
-            else:
-                print(f"⚠️  Missing: {img_filename}")
+    if not os.path.exists(docx_path):
+        print(f"ERROR: Document not found: {docx_path}")
+        return False
     
-    # Scenes Section
-    doc.add_page_break()
-    doc.add_heading('Key Scenes', level=2)
+    if not os.path.exists(images_dir):
+        print(f"ERROR: Images directory not found: {images_dir}")
+        return False
     
-    for img_filename in sorted(IMAGE_MAP.keys()):
-        if IMAGE_MAP[img_filename]["section"] == "scenes":
-            img_info = IMAGE_MAP[img_filename]
-            img_path = os.path.join(images_dir, img_filename)
-            
-            if os.path.exists(img_path):
-                # Add title
-                title_para = doc.add_paragraph()
-                title_para.add_run(img_info["title"]).bold = True
-                title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Add image
-                para = doc.add_paragraph()
-                run = para.add_run()
-                run.add_picture(img_path, width=Inches(img_info["width"]))
-                para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Add spacing
-                doc.add_paragraph()
-                
-                print(f"✓ Added: {img_filename}")
-            else:
-                print(f"⚠️  Missing: {img_filename}")
+    print(f"📄 Loading document: {docx_path}")
+    with profiler.stage("load"):
+        doc = Document(docx_path)
+    
+    print(f"📁 Images directory: {images_dir}")
+    print(f"🖼️  Processing {len(IMAGE_MAP)} images...\n")
+    
+    # Strategy: Add images at the end with clear section breaks
+    # This is safer than trying to insert in the middle
+    with profiler.stage("gallery"):
+        skip = duplicate_images(images_dir, skip_duplicates) if skip_duplicates is not None else None
+        add_gallery(doc, images_dir, profiler=profiler, skip=skip)
+    if emblems_dir:
+        with profiler.stage("emblems"):
+            add_emblems(doc, emblems_dir, profiler=profiler)
     
     # Save the document
     if output_path is None:
@@ -297,13 +376,153 @@ def add_images_to_document(docx_path, images_dir, output_path=None):
         output_path = docx_path
         print(f"\n💾 Backup saved: {backup_path}")
     
-    doc.save(output_path)
+    with profiler.stage("save"):
+        doc.save(output_path)
     print(f"✅ Document saved: {output_path}")
     
     return True
 
 
-if __name__ == "__main__":
+# ----------------------
+# Batch variants
+# ----------------------
+# Worker-process state: the parsed template and the deduplicated image blobs.
+# Populated once per worker by _init_batch_worker so each variant only pays
+# for a deepcopy of the already-parsed document.
+_BATCH_TEMPLATE = None
+_BATCH_BLOBS = {}
+_BATCH_PATH_DIGESTS = {}
+
+
+def _init_batch_worker(template_bytes, blobs, path_digests):
+    """Parse the template once per worker and keep the image blobs in memory"""
+    global _BATCH_TEMPLATE, _BATCH_BLOBS, _BATCH_PATH_DIGESTS
+    _BATCH_TEMPLATE = Document(io.BytesIO(template_bytes))
+    _BATCH_BLOBS = blobs
+    _BATCH_PATH_DIGESTS = path_digests
+
+
+def _batch_image_source(img_path):
+    """Serve a pre-loaded image blob for a path, falling back to the file"""
+    digest = _BATCH_PATH_DIGESTS.get(img_path)
+    if digest is None:
+        return img_path
+    return io.BytesIO(_BATCH_BLOBS[digest])
+
+
+def _build_variant(spec, images_dir, skip=None, emblems_dir=None):
+    """Build one dossier variant from the parsed template (runs in a worker)"""
+    started = time.perf_counter()
+    doc = copy.deepcopy(_BATCH_TEMPLATE)
+    added = add_gallery(
+        doc,
+        images_dir,
+        image_names=spec.get("images"),
+        sections=spec.get("sections"),
+        heading=spec.get("heading", 'Visual Reference Gallery'),
+        image_source=_batch_image_source,
+        skip=skip,
+    )
+    if emblems_dir:
+        add_emblems(doc, emblems_dir)
+    doc.save(spec["output"])
+    return {
+        "output": spec["output"],
+        "images": len(added),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def load_image_blobs(images_dir, image_names=None):
+    """Read every referenced image once, deduplicated by content hash
+
+    Returns:
+        tuple[dict, dict]: ({sha1: bytes}, {image path: sha1})
+    """
+    blobs = {}
+    path_digests = {}
+    for img_filename in sorted(IMAGE_MAP.keys()):
+        if image_names is not None and img_filename not in image_names:
+            continue
+        img_path = os.path.join(images_dir, img_filename)
+        if not os.path.exists(img_path):
+            continue
+        with open(img_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        blobs.setdefault(digest, data)
+        path_digests[img_path] = digest
+    return blobs, path_digests
+
+
+def build_dossier_variants(docx_path, images_dir, variants, jobs=None, skip_duplicates=None,
+                           emblems_dir=None):
+    """Build several dossier variants from one parsed template
+
+    Each variant spec is a dict with:
+        output: Path of the .docx to write (required)
+        images: Optional list of IMAGE_MAP filenames to include
+        sections: Optional list of IMAGE_MAP section names to include
+        heading: Optional gallery heading
+
+    The template is read once and parsed once per worker process; every image
+    is read once and identical images share a single blob (and a single image
+    part inside each .docx). Variants are built in parallel across `jobs`
+    processes (default: number of CPUs). With skip_duplicates (a Hamming
+    distance threshold), near-duplicate images are left out of every variant.
+    With emblems_dir, every variant ends with the rasterized emblems (rendered
+    once up front; the workers read them from the raster cache).
+
+    Returns:
+        list[dict]: Per-variant results with output, images and seconds.
+                    Empty list on failure.
+    """
+    if not os.path.exists(docx_path):
+        print(f"ERROR: Document not found: {docx_path}")
+        return []
+
+    if not os.path.exists(images_dir):
+        print(f"ERROR: Images directory not found: {images_dir}")
+        return []
+
+    for spec in variants:
+        if not spec.get("output"):
+            print(f"ERROR: Variant is missing an output path: {spec}")
+            return []
+
+    started = time.perf_counter()
+    with open(docx_path, 'rb') as f:
+        template_bytes = f.read()
+    blobs, path_digests = load_image_blobs(images_dir)
+    skip = duplicate_images(images_dir, skip_duplicates) if skip_duplicates is not None else None
+    if emblems_dir:
+        from svg_raster import rasterize_many
+        rasterize_many(_emblem_entries(emblems_dir).values(), dpi=EMBLEM_DPI)
+    print(f"📄 Template: {docx_path}")
+    print(f"🖼️  {len(path_digests)} images, {len(blobs)} unique")
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(variants)))
+    init_args = (template_bytes, blobs, path_digests)
+    print(f"⚙️  Building {len(variants)} variants with {jobs} worker(s)...\n")
+
+    if jobs == 1:
+        _init_batch_worker(*init_args)
+        results = [_build_variant(spec, images_dir, skip, emblems_dir) for spec in variants]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                 initargs=init_args) as pool:
+            futures = [pool.submit(_build_variant, spec, images_dir, skip, emblems_dir) for spec in variants]
+            results = [future.result() for future in futures]
+
+    for result in results:
+        print(f"✅ {result['output']}: {result['images']} images in {result['seconds']:.2f}s")
+    print(f"\n⏱️  Total: {time.perf_counter() - started:.2f}s")
+
+    return results
+
+
+def main(argv=None):
+    """Command-line entry point"""
     # Set up paths
     script_dir = Path(__file__).parent
     project_dir = script_dir / "2025_10_19_Claude_Skills_Practice"
@@ -316,25 +535,67 @@ if __name__ == "__main__":
     images_dir = project_dir / "generated-images"
     
     # Allow command line override
-    if len(sys.argv) > 1:
-        docx_file = Path(sys.argv[1])
-    if len(sys.argv) > 2:
-        images_dir = Path(sys.argv[2])
+    parser = argparse.ArgumentParser(description="Add generated images to the character dossier")
+    parser.add_argument("docx", nargs="?", default=str(docx_file), help="Dossier .docx template")
+    parser.add_argument("images_dir", nargs="?", default=str(images_dir), help="Generated images directory")
+    parser.add_argument("--batch", metavar="VARIANTS_JSON",
+                        help="JSON list of variant specs to build from the template in parallel")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--profile", nargs="?", const="profile-dossier.json", metavar="REPORT_JSON",
+                        help="Record per-stage/per-image wall time and allocations to a JSON report")
+    parser.add_argument("--cprofile", metavar="PSTATS_FILE",
+                        help="With --profile, also dump cProfile stats (for snakeviz/flameprof)")
+    parser.add_argument("--skip-duplicates", nargs="?", type=int, const=8, metavar="THRESHOLD",
+                        help="Leave out near-duplicate images (perceptual-hash distance, default 8)")
+    parser.add_argument("--emblems", nargs="?", const=str(script_dir / "03-canvas-design"), metavar="SVG_DIR",
+                        help="Append the canvas-design SVG emblems, rasterized (default: 03-canvas-design)")
+    args = parser.parse_args(argv)
+    if args.cprofile and not args.profile:
+        parser.error("--cprofile requires --profile")
+    docx_file = Path(args.docx)
+    images_dir = Path(args.images_dir)
+
+    if args.batch and (args.profile or args.cprofile):
+        # Variants are built in worker processes, which the stage profiler cannot see into
+        parser.error("--profile/--cprofile profile a single build; they cannot be combined with --batch")
+
+    if args.batch:
+        print("=" * 60)
+        print("Blood Assassin Character Dossier - Batch Variants")
+        print("=" * 60)
+        print()
+
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            variants = json.load(f)
+        results = build_dossier_variants(str(docx_file), str(images_dir), variants, jobs=args.jobs,
+                                         skip_duplicates=args.skip_duplicates, emblems_dir=args.emblems)
+        return 0 if results else 1
     
     print("=" * 60)
     print("Blood Assassin Character Dossier - Image Insertion")
     print("=" * 60)
     print()
     
-    success = add_images_to_document(str(docx_file), str(images_dir))
+    profiler = StageProfiler("add_images_to_dossier", enabled=bool(args.profile),
+                             cprofile=bool(args.cprofile)).start()
+    success = add_images_to_document(str(docx_file), str(images_dir), profiler=profiler,
+                                     skip_duplicates=args.skip_duplicates, emblems_dir=args.emblems)
+    profiler.stop()
+    if args.profile:
+        profiler.write(args.profile, args.cprofile)
     
     if success:
         print("\n" + "=" * 60)
         print("✅ SUCCESS! Images added to document.")
         print("=" * 60)
-        sys.exit(0)
+        return 0
     else:
         print("\n" + "=" * 60)
         print("❌ FAILED. Check errors above.")
         print("=" * 60)
-        sys.exit(1)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
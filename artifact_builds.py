@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Memoized dossier and deck builds for the web API.
+
+Backs POST /api/artifacts/dossier and /api/artifacts/deck in server.py. Each
+request is keyed by a hash of the template, the content of every image the
+build uses and the build options; a finished artifact for that key is
+returned as-is, an identical build already in progress is joined rather than
+started again, and anything else is built by a background worker.
+
+Artifacts are stored in artifacts/ as <kind>-<key>.docx / .pptx.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from generate_images import OUTPUT_DIR
+
+ROOT = Path(__file__).parent
+ARTIFACT_DIR = Path("artifacts")
+BUILD_VERSION = 1  # bump when builder output changes, to invalidate memoized artifacts
+
+DOSSIER_TEMPLATES = (Path("Blood_Assassin_Character_Dossier.docx"),
+                     ROOT / "phase-1-character-dossier" / "Blood_Assassin_Character_Dossier.docx")
+DECK_SPECS_DIR = ROOT / "deck-specs"
+EXTENSIONS = {"dossier": ".docx", "deck": ".pptx"}
+
+_DIGESTS = {}  # (path, size, mtime_ns) -> sha256, so unchanged files are hashed once
+_DIGESTS_LOCK = threading.Lock()
+
+
+class ArtifactError(Exception):
+    """Invalid build request"""
+
+
+class ArtifactUnavailable(ArtifactError):
+    """The builder for an artifact kind cannot run here (a dependency is not installed)"""
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, cached while its size and mtime are unchanged"""
+    st = os.stat(path)
+    stamp = (str(path), st.st_size, st.st_mtime_ns)
+    with _DIGESTS_LOCK:
+        if stamp in _DIGESTS:
+            return _DIGESTS[stamp]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    with _DIGESTS_LOCK:
+        _DIGESTS[stamp] = h.hexdigest()
+    return _DIGESTS[stamp]
+
+
+def digest_cache():
+    """The digest cache as [path, size, mtime_ns, sha256] entries, for persisting between runs"""
+    with _DIGESTS_LOCK:
+        return [[*stamp, digest] for stamp, digest in _DIGESTS.items()]
+
+
+def seed_digests(entries):
+    """Load entries from digest_cache(); stale ones are never matched and simply ignored"""
+    with _DIGESTS_LOCK:
+        for path, size, mtime_ns, digest in entries:
+            _DIGESTS[(path, size, mtime_ns)] = digest
+
+
+def content_map(paths):
+    """{path: digest} for the paths that exist (missing images change the key too)"""
+    return {str(p): file_digest(p) if os.path.exists(p) else None for p in paths}
+
+
+def _option(options, name, kind, description):
+    """options[name] if it is None or an instance of kind (bool never counts as int), else ArtifactError"""
+    value = options.get(name)
+    if value is not None and (not isinstance(value, kind) or (kind is int and isinstance(value, bool))):
+        raise ArtifactError(f"{name} must be {description}")
+    return value
+
+
+def _name_list(options, name):
+    """options[name] as a list of strings (None when absent)"""
+    values = _option(options, name, list, "a list of strings")
+    if values is not None and not all(isinstance(v, str) for v in values):
+        raise ArtifactError(f"{name} must be a list of strings")
+    return values
+
+
+def _duplicate_threshold(options):
+    """skip_duplicates: a Hamming distance between the 64-bit perceptual hashes"""
+    threshold = _option(options, "skip_duplicates", int, "an integer between 0 and 64")
+    if threshold is not None and not 0 <= threshold <= 64:
+        raise ArtifactError("skip_duplicates must be an integer between 0 and 64")
+    return threshold
+
+
+def dossier_plan(options):
+    """(build inputs, key material) for a dossier request"""
+    images = _name_list(options, "images")
+    sections = _name_list(options, "sections")
+    heading = _option(options, "heading", str, "a string")
+    threshold = _duplicate_threshold(options)
+
+    from add_images_to_dossier import EMBLEM_MAP, IMAGE_MAP
+
+    template = next((p for p in DOSSIER_TEMPLATES if p.exists()), None)
+    if template is None:
+        raise ArtifactError("Dossier template not found")
+    if images is not None and not set(images) <= set(IMAGE_MAP):
+        raise ArtifactError(f"Unknown images: {', '.join(sorted(set(images) - set(IMAGE_MAP)))}")
+
+    inputs = {
+        "template": str(template),
+        "images_dir": str(OUTPUT_DIR),
+        "images": images,
+        "sections": sections,
+        "heading": heading or "Visual Reference Gallery",
+        "skip_duplicates": threshold,
+        "emblems": str(ROOT / "03-canvas-design") if options.get("emblems") else None,
+    }
+    used = [OUTPUT_DIR / name for name in sorted(IMAGE_MAP) if images is None or name in images]
+    if inputs["emblems"]:
+        used += [Path(inputs["emblems"]) / name for name in sorted(EMBLEM_MAP)]
+    return inputs, content_map([template] + used)
+
+
+def deck_plan(options):
+    """(build inputs, key material) for a deck request"""
+    name = _option(options, "spec", str, "a file name in deck-specs/") or "blood_assassin.json"
+    dpi = _option(options, "dpi", int, "an integer between 30 and 600")
+    if dpi is not None and not 30 <= dpi <= 600:
+        raise ArtifactError("dpi must be an integer between 30 and 600")
+    threshold = _duplicate_threshold(options)
+
+    from create_pitch_deck import load_spec, spec_images
+
+    spec_path = DECK_SPECS_DIR / Path(name).name  # only specs shipped in deck-specs/
+    if not spec_path.exists():
+        raise ArtifactError(f"Unknown deck spec: {name}")
+
+    inputs = {"spec": str(spec_path), "dpi": dpi, "skip_duplicates": threshold,
+              "auto_colors": bool(options.get("auto_colors"))}
+    used = sorted({path for path, _, _ in spec_images(load_spec(spec_path))})
+    return inputs, content_map([spec_path] + used)
+
+
+PLANS = {"dossier": dossier_plan, "deck": deck_plan}
+
+
+def _build_dossier(inputs, output_path):
+    from add_images_to_dossier import Document, add_emblems, add_gallery, duplicate_images
+
+    doc = Document(inputs["template"])
+    skip = (duplicate_images(inputs["images_dir"], inputs["skip_duplicates"])
+            if inputs["skip_duplicates"] is not None else None)
+    add_gallery(doc, inputs["images_dir"], image_names=inputs["images"], sections=inputs["sections"],
+                heading=inputs["heading"], skip=skip)
+    if inputs["emblems"]:
+        add_emblems(doc, inputs["emblems"])
+    doc.save(output_path)
+
+
+def _build_deck(inputs, output_path):
+    from create_pitch_deck import load_spec, render_deck
+
+    spec = load_spec(inputs["spec"])
+    if inputs["skip_duplicates"] is not None:
+        spec["skip_duplicates"] = inputs["skip_duplicates"]
+    if inputs["auto_colors"]:
+        spec["auto_colors"] = spec.get("auto_colors") or True
+    render_deck(spec, output_path=output_path, dpi=inputs["dpi"])
+
+
+BUILDERS = {"dossier": _build_dossier, "deck": _build_deck}
+
+
+class ArtifactService:
+    """Memoizing, coalescing build queue with one background worker"""
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR, workers=1):
+        self.artifact_dir = Path(artifact_dir)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact-build")
+        self.in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def path_for(self, kind, key):
+        return self.artifact_dir / f"{kind}-{key}{EXTENSIONS[kind]}"
+
+    def request(self, kind, options):
+        """
+        Start (or join, or reuse) the build for a request.
+
+        Returns:
+            tuple: (key, "ready" | "building", Future or None)
+        Raises:
+            ArtifactError: unknown kind or invalid options
+            ArtifactUnavailable: the builder's dependencies are not installed
+        """
+        if kind not in PLANS:
+            raise ArtifactError(f"Unknown artifact kind: {kind}")
+        if options is None:
+            options = {}
+        if not isinstance(options, dict):
+            raise ArtifactError("Build options must be a JSON object")
+        try:
+            inputs, contents = PLANS[kind](options)
+        except ImportError as e:
+            raise ArtifactUnavailable(f"Cannot build {kind}: {e}") from e
+        material = {"version": BUILD_VERSION, "kind": kind, "inputs": inputs, "contents": contents}
+        key = hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+        with self._lock:
+            if self.path_for(kind, key).exists():
+                return key, "ready", None
+            future = self.in_flight.get(key)
+            if future is None or (future.done() and future.exception()):  # retry failed builds
+                future = self.pool.submit(self._build, kind, key, inputs)
+                self.in_flight[key] = future
+        return key, "building", future
+
+    def status(self, kind, key):
+        """("ready" | "building" | "failed" | "unknown", error message or None)"""
+        if kind in EXTENSIONS and self.path_for(kind, key).exists():
+            return "ready", None
+        with self._lock:
+            future = self.in_flight.get(key)
+        if future is None:
+            return "unknown", None
+        if not future.done():
+            return "building", None
+        error = future.exception()
+        return ("failed", str(error)) if error else ("ready", None)
+
+    def _build(self, kind, key, inputs):
+        output = self.path_for(kind, key)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_name(f".{output.stem}.{os.getpid()}.tmp{output.suffix}")
+        try:
+            print(f"🔨 Building {kind} {key[:12]}...")
+            BUILDERS[kind](inputs, str(tmp))
+            os.replace(tmp, output)
+            print(f"✅ Built {output}")
+            return str(output)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+            # Successful builds are served from disk from now on; failures stay to report the error
+            with self._lock:
+                if output.exists():
+                    self.in_flight.pop(key, None)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Stage profiler shared by the dossier and pitch deck builders.
+Records wall time and memory allocations per stage and writes a JSON report,
+optionally alongside a cProfile dump (pstats format, loadable by snakeviz,
+flameprof, gprof2dot and similar flamegraph tools).
+"""
+
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class StageProfiler:
+    """
+    Collects timed stages such as "load", "slide:title" or "image:01_x.png".
+
+    Stages may nest; each is reported with its parent so per-slide and
+    per-image timings can be rolled up. A disabled profiler makes stage()
+    a near no-op so builders can always call it.
+    """
+
+    def __init__(self, tool, enabled=True, cprofile=False):
+        self.tool = tool
+        self.enabled = enabled
+        self.stages = []
+        self._stack = []
+        self._cprofile = cProfile.Profile() if (enabled and cprofile) else None
+        self._started = None
+        self._wall = None
+        self._peak = 0
+
+    def start(self):
+        if not self.enabled:
+            return self
+        tracemalloc.start()
+        self._started = time.perf_counter()
+        if self._cprofile:
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        if not self.enabled or self._started is None:
+            return
+        if self._cprofile:
+            self._cprofile.disable()
+        self._wall = time.perf_counter() - self._started
+        self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    def _fold_peak(self, peak):
+        """Record an absolute traced-memory peak in the innermost open stage and the run total"""
+        if self._stack:
+            self._stack[-1]["max_peak"] = max(self._stack[-1]["max_peak"], peak)
+        self._peak = max(self._peak, peak)
+
+    @contextmanager
+    def stage(self, name, **meta):
+        if not self.enabled:
+            yield
+            return
+        # reset_peak() discards the peak so far; keep it for the enclosing stage (or the whole run)
+        self._fold_peak(tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = {"name": name, "start_mem": tracemalloc.get_traced_memory()[0], "max_peak": 0}
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            # Inner stages reset the peak counter, so fold theirs back in
+            peak = max(peak, frame["max_peak"])
+            self._stack.pop()
+            parent = self._stack[-1] if self._stack else None
+            self._fold_peak(peak)
+            self.stages.append({
+                "name": name,
+                "parent": parent["name"] if parent else None,
+                "seconds": round(seconds, 6),
+                "alloc_bytes": current - frame["start_mem"],
+                "peak_bytes": peak - frame["start_mem"],
+                **meta,
+            })
+
+    def report(self):
+        """Return the report as a dict (stages in completion order)"""
+        return {
+            "tool": self.tool,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "total_seconds": round(self._wall or 0.0, 6),
+            "peak_bytes": self._peak,
+            "stages": self.stages,
+        }
+
+    def write(self, report_path, cprofile_path=None):
+        """Write the JSON report and, if collected, the cProfile stats"""
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"📊 Profile report: {report_path}")
+        if self._cprofile and cprofile_path:
+            self._cprofile.dump_stats(cprofile_path)
+            print(f"📊 cProfile stats: {cprofile_path}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Blood Assassin - unified command line
+Usage: blood-assassin build|generate|sweep|dossier|deck|contact-sheet|dedupe|palette|search|rasterize|telemetry|serve [options]
+
+Subcommand modules (and their heavy dependencies: requests, python-docx,
+python-pptx, Pillow, NumPy, Flask) are imported only when that subcommand
+runs, so `--help` and short-lived job containers start fast.
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+# subcommand -> (module with main(argv), description)
+COMMANDS = {
+    "build": ("pipeline", "Run the release pipeline (images, contact sheet, dossier, deck), skipping unchanged stages"),
+    "generate": ("generate_images", "Generate images for every prompt in image-prompts/"),
+    "sweep": ("prompt_sweep", "Generate templated prompt variants under a budget"),
+    "dossier": ("add_images_to_dossier", "Add generated images to the character dossier (DOCX)"),
+    "deck": ("create_pitch_deck", "Build the pitch deck (PPTX) from a slide spec"),
+    "contact-sheet": ("contact_sheet", "Build gallery sprites and the deck montage"),
+    "dedupe": ("image_dedupe", "Report near-duplicate generated images"),
+    "palette": ("image_palette", "Report dominant palettes, luminance and contrast of images"),
+    "search": ("search_index", "Search prompts and their generated images"),
+    "rasterize": ("svg_raster", "Render SVG artwork to cached PNGs"),
+    "telemetry": ("telemetry", "Query the upstream call telemetry ledger"),
+    "serve": ("server", "Serve the web UI and API"),
+}
+
+# Modules that must not be imported just to start the CLI
+HEAVY_MODULES = ("requests", "docx", "pptx", "PIL", "numpy", "flask", "dotenv")
+
+# Cold-start budget for `blood-assassin --help`, in milliseconds
+STARTUP_BUDGET_MS = 150
+
+
+def startup_check(budget_ms=STARTUP_BUDGET_MS, runs=5):
+    """
+    Measure CLI cold start in fresh interpreters and verify no heavy module
+    is imported at startup. Returns 0 when within budget, 1 otherwise.
+    """
+    script = os.path.abspath(__file__)
+    probe = ("import sys, cli; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                            cwd=os.path.dirname(script)).stdout.strip()
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, script, "--help"], stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    median = sorted(timings)[len(timings) // 2]
+
+    print(f"Cold start (median of {runs}): {median:.1f} ms (budget {budget_ms} ms)")
+    if loaded:
+        print(f"✗ Heavy modules imported at startup: {loaded}")
+    ok = median <= budget_ms and not loaded
+    print("✓ Within budget" if ok else "✗ Over budget")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    commands = "\n".join(f"  {name:<15} {desc}" for name, (_, desc) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="blood-assassin",
+        description="Blood Assassin image suite",
+        epilog=f"commands:\n{commands}\n\nRun 'blood-assassin <command> --help' for command options.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", nargs="?", choices=list(COMMANDS), metavar="command",
+                        help="one of: " + ", ".join(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    parser.add_argument("--startup-check", nargs="?", type=int, const=STARTUP_BUDGET_MS,
+                        metavar="BUDGET_MS", help="Measure cold-start time against a budget and exit")
+    args = parser.parse_args(argv)
+
+    if args.startup_check is not None:
+        return startup_check(args.startup_check)
+    if not args.command:
+        parser.print_help()
+        return 2
+
+    module_name, _ = COMMANDS[args.command]
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        print(f"ERROR: {e}")
+        print("Install with: pip install -r requirements.txt")
+        return 1
+    return module.main(args.args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
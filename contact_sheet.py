@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Contact Sheet Builder
+Composes the images in generated-images/ into a grid sprite (for the web
+gallery, with CSS/JSON coordinates) and a montage PNG (for the pitch deck's
+overview slide). Rebuilds are incremental: only new or changed images are
+re-thumbnailed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+try:
+    import numpy as np
+    from PIL import Image, ImageOps
+except ImportError:
+    if __name__ != "__main__":
+        raise
+    print("ERROR: numpy and Pillow are required")
+    print("Install with: pip install numpy Pillow")
+    sys.exit(1)
+
+IMAGES_DIR = Path("generated-images")
+# Next to this script rather than in the cwd, so the CLI, pipeline and server agree
+OUTPUT_DIR = Path(__file__).parent / "contact-sheets"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# Numbered prompt outputs (01_..., 02_...) by default; excludes ad-hoc test images
+DEFAULT_INCLUDE = "[0-9]*"
+DEFAULT_TILE = 320
+DEFAULT_COLUMNS = 4
+DEFAULT_GUTTER = 8
+BACKGROUND = (25, 25, 35)  # Deck background colour
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def css_class(name):
+    """CSS class for an image file name, e.g. 01_elara.png -> cs-01_elara"""
+    return "cs-" + re.sub(r"[^A-Za-z0-9_-]", "-", Path(name).stem)
+
+
+def find_images(images_dir, include=DEFAULT_INCLUDE):
+    """Sorted image files in images_dir matching the include glob"""
+    return sorted(
+        p for p in Path(images_dir).glob(include)
+        if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def load_manifest(out_dir):
+    try:
+        with open(Path(out_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def image_digests(paths, previous):
+    """
+    Content digest per image, reusing the previous digest when size and
+    mtime are unchanged so unchanged libraries are not re-hashed.
+    """
+    digests = {}
+    for path in paths:
+        st = path.stat()
+        prev = previous.get(path.name)
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+            digests[path.name] = prev
+        else:
+            digests[path.name] = {"digest": file_digest(path), "size": st.st_size,
+                                  "mtime_ns": st.st_mtime_ns}
+    return digests
+
+
+def load_tile(path, digest, tile, tiles_dir):
+    """Return the tile x tile RGB thumbnail as an array, using the per-digest cache (None if unreadable)"""
+    cached = tiles_dir / f"{digest}_{tile}.png"
+    if cached.exists():
+        with Image.open(cached) as img:
+            return np.asarray(img.convert("RGB"))
+
+    try:
+        with Image.open(path) as img:
+            img.draft("RGB", (tile, tile))  # JPEG sources decode at reduced scale
+            thumb = ImageOps.pad(img.convert("RGB"), (tile, tile), Image.LANCZOS, color=BACKGROUND)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping unreadable image {path}: {e}")
+        return None
+    tiles_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+    thumb.save(tmp, "PNG")
+    os.replace(tmp, cached)
+    return np.asarray(thumb)
+
+
+def compose(tiles, columns, gutter=0, background=BACKGROUND):
+    """
+    Arrange an (N, h, w, 3) tile stack into a grid image array.
+
+    Tiles are placed with one reshape/transpose rather than per-tile pastes;
+    empty trailing cells and gutters are filled with the background colour.
+    """
+    count, th, tw, channels = tiles.shape
+    rows = -(-count // columns)
+    cell_h, cell_w = th + 2 * gutter, tw + 2 * gutter
+
+    grid = np.empty((rows, cell_h, columns, cell_w, channels), dtype=np.uint8)
+    grid[:] = np.asarray(background, dtype=np.uint8)
+
+    padded = np.empty((rows * columns, th, tw, channels), dtype=np.uint8)
+    padded[:] = np.asarray(background, dtype=np.uint8)
+    padded[:count] = tiles
+    grid[:, gutter:gutter + th, :, gutter:gutter + tw] = (
+        padded.reshape(rows, columns, th, tw, channels).transpose(0, 2, 1, 3, 4)
+    )
+    return grid.reshape(rows * cell_h, columns * cell_w, channels)
+
+
+def write_outputs(out_dir, names, tiles, tile, columns, gutter):
+    """Write sprite.png, sprite.json, sprite.css and montage.png"""
+    sprite = compose(tiles, columns)
+    montage = compose(tiles, columns, gutter)
+    Image.fromarray(sprite).save(out_dir / "sprite.png", optimize=True)
+    Image.fromarray(montage).save(out_dir / "montage.png", optimize=True)
+
+    frames = []
+    css = [
+        f".cs-sprite {{ background-image: url(sprite.png); background-repeat: no-repeat; "
+        f"display: inline-block; width: {tile}px; height: {tile}px; }}"
+    ]
+    for index, name in enumerate(names):
+        x, y = (index % columns) * tile, (index // columns) * tile
+        frames.append({"name": name, "class": css_class(name), "x": x, "y": y, "w": tile, "h": tile})
+        css.append(f".{css_class(name)} {{ background-position: -{x}px -{y}px; }}")
+
+    index_data = {
+        "image": "sprite.png",
+        "montage": "montage.png",
+        "width": int(sprite.shape[1]),
+        "height": int(sprite.shape[0]),
+        "tile": tile,
+        "columns": columns,
+        "rows": -(-len(names) // columns),
+        "frames": frames,
+    }
+    with open(out_dir / "sprite.json", 'w', encoding='utf-8') as f:
+        json.dump(index_data, f, indent=2)
+    with open(out_dir / "sprite.css", 'w', encoding='utf-8') as f:
+        f.write("\n".join(css) + "\n")
+
+
+def build_contact_sheet(images_dir=IMAGES_DIR, out_dir=OUTPUT_DIR, include=DEFAULT_INCLUDE,
+                        tile=DEFAULT_TILE, columns=DEFAULT_COLUMNS, gutter=DEFAULT_GUTTER, force=False):
+    """
+    Build (or refresh) the contact sheet outputs in out_dir
+
+    Returns:
+        dict: {"images": N, "rethumbnailed": M, "skipped": bool}; None if no images
+    """
+    out_dir = Path(out_dir)
+    paths = find_images(images_dir, include)
+    if not paths:
+        print(f"No images matching '{include}' in {images_dir}")
+        return None
+
+    manifest = load_manifest(out_dir)
+    digests = image_digests(paths, manifest.get("images", {}))
+    config = {"tile": tile, "columns": columns, "gutter": gutter}
+    outputs = [out_dir / name for name in ("sprite.png", "montage.png", "sprite.json", "sprite.css")]
+
+    if (not force and manifest.get("config") == config and manifest.get("images") == digests
+            and all(p.exists() for p in outputs)):
+        count = len(paths) - len(manifest.get("unreadable", []))
+        print(f"✓ Contact sheet up to date ({count} images)")
+        return {"images": count, "rethumbnailed": 0, "skipped": True}
+
+    tiles_dir = out_dir / ".tiles"
+    changed = [p.name for p in paths
+               if not (tiles_dir / f"{digests[p.name]['digest']}_{tile}.png").exists()]
+    loaded = {p.name: load_tile(p, digests[p.name]["digest"], tile, tiles_dir) for p in paths}
+    # Undecodable files are left off the sheet; they stay in the manifest, so they are
+    # only retried once their contents change
+    unreadable = [name for name, thumb in loaded.items() if thumb is None]
+    names = [name for name, thumb in loaded.items() if thumb is not None]
+    changed = [name for name in changed if name in names]
+    if not names:
+        print(f"No readable images matching '{include}' in {images_dir}")
+        return None
+    tiles = np.stack([loaded[name] for name in names])
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_outputs(out_dir, names, tiles, tile, columns, gutter)
+
+    # Drop cached tiles that no longer belong to any image
+    live = {f"{d['digest']}_{tile}.png" for d in digests.values()}
+    for stale in tiles_dir.glob("*.png"):
+        if stale.name not in live:
+            stale.unlink()
+
+    with open(out_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump({"config": config, "images": digests, "unreadable": unreadable}, f, indent=2)
+
+    print(f"✅ Contact sheet: {len(names)} images ({len(changed)} re-thumbnailed) -> {out_dir}")
+    return {"images": len(names), "rethumbnailed": len(changed), "skipped": False}
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Build gallery sprites and montage contact sheets")
+    parser.add_argument("images_dir", nargs="?", default=str(IMAGES_DIR), help="Source images directory")
+    parser.add_argument("--out", default=str(OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--include", default=DEFAULT_INCLUDE, help="Glob of images to include")
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE, help="Tile size in pixels")
+    parser.add_argument("--columns", type=int, default=DEFAULT_COLUMNS, help="Tiles per row")
+    parser.add_argument("--gutter", type=int, default=DEFAULT_GUTTER, help="Montage spacing in pixels")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if nothing changed")
+    args = parser.parse_args(argv)
+
+    result = build_contact_sheet(args.images_dir, args.out, args.include, args.tile,
+                                 args.columns, args.gutter, args.force)
+    return 0 if result else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,15 @@ Blood Assassin - Story Pitch Deck Generator
 Creates a professional PowerPoint presentation for pitching the novel
 """
 
+import argparse
+import copy
+import hashlib
+import io
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
@@ -13,24 +21,180 @@ from pptx.enum.shapes import MSO_SHAPE
 from PIL import Image
 from pathlib import Path
 
-def add_image_safe(slide, image_path, left, top, width=None, height=None):
-    """Add image to slide with error handling"""
+from build_profile import StageProfiler
+
+# Converted images are stored here, keyed by the source content hash
+CACHE_DIR = Path(".deck-cache")
+
+# Slide spec for the standard pitch deck (see render_deck for the format)
+DEFAULT_SPEC = Path(__file__).parent / "deck-specs" / "blood_assassin.json"
+DEFAULT_OUTPUT = "Blood_Assassin_Pitch_Deck.pptx"
+
+# JPEG quality used for photographic images when downsampling
+JPEG_QUALITY = 85
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_webp(path):
+    """Sniff the RIFF/WEBP signature without decoding the image"""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+    return header[:4] == b'RIFF' and header[8:12] == b'WEBP'
+
+
+def target_pixels(size, width, height, dpi):
+    """
+    Pixel size for an image shown in a width/height box (EMU) at dpi.
+
+    Missing box dimensions follow the image aspect ratio, as add_picture does.
+    Never upscales: returns the original size if it is already small enough.
+    """
+    src_w, src_h = size
+    if width and height:
+        box_w, box_h = width, height
+    elif width:
+        box_w, box_h = width, width * src_h / src_w
+    elif height:
+        box_w, box_h = height * src_w / src_h, height
+    else:
+        return size
+    w = max(1, round(box_w / Inches(1) * dpi))
+    h = max(1, round(box_h / Inches(1) * dpi))
+    if w >= src_w and h >= src_h:
+        return size
+    return (w, h)
+
+
+def has_transparency(img):
+    """True if the image uses an alpha channel or a transparent palette entry"""
+    if img.mode in ('RGBA', 'LA', 'PA'):
+        return img.getchannel('A').getextrema()[0] < 255
+    return img.mode == 'P' and 'transparency' in img.info
+
+
+def choose_format(img):
+    """PNG for transparent or flat-colour artwork, JPEG for photographic content"""
+    if has_transparency(img):
+        return 'PNG'
+    # Flat graphics (logos, emblems) have few distinct colours and compress better losslessly
+    if img.getcolors(maxcolors=256) is not None:
+        return 'PNG'
+    return 'JPEG'
+
+
+def _write_atomic(img, path, fmt, **params):
+    """Save through a temp name so a crashed build never leaves a partial cache file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    img.save(tmp, fmt, **params)
+    os.replace(tmp, path)
+
+
+def prepare_image(image_path, width=None, height=None, dpi=None, cache_dir=CACHE_DIR):
+    """
+    Return a path python-pptx can embed for image_path.
+
+    Without dpi, PNG/JPEG sources are returned as-is without decoding and
+    WebP sources (also ones mislabelled as .png) are converted to PNG once.
+
+    With dpi, the image is resized to its width/height display box at that
+    resolution and re-encoded as JPEG or PNG depending on content.
+
+    Results are stored in cache_dir keyed by the source content hash (and the
+    box/dpi when resizing), so later builds reuse them.
+
+    SVG sources are rasterized to PNG at their box size (at dpi, or
+    svg_raster.DEFAULT_DPI) and cached by svg_raster.
+    Returns None if the source does not exist or cannot be rasterized.
+    """
+    if not os.path.exists(image_path):
+        return None
+    if image_path.lower().endswith('.svg'):
+        from svg_raster import DEFAULT_DPI, rasterize_for_box
+        try:
+            return rasterize_for_box(image_path, width and width / Inches(1), height and height / Inches(1),
+                                     dpi=dpi or DEFAULT_DPI)
+        except Exception as e:
+            print(f"Could not rasterize {image_path}: {e}")
+            return None
+    webp = is_webp(image_path) or image_path.lower().endswith('.webp')
+    if not dpi and not webp:
+        return image_path
+
+    cache_dir = Path(cache_dir)
+    digest = file_digest(image_path)
+    if not dpi:
+        cached = cache_dir / f"{digest}.png"
+        if not cached.exists():
+            with Image.open(image_path) as img:
+                _write_atomic(img, cached, 'PNG')
+        return str(cached)
+
+    stem = f"{digest}_{width or 0}x{height or 0}@{dpi}"
+    for ext in ('.jpg', '.png'):
+        if (cache_dir / f"{stem}{ext}").exists():
+            return str(cache_dir / f"{stem}{ext}")
+
+    with Image.open(image_path) as img:
+        size = target_pixels(img.size, width, height, dpi)
+        if size != img.size:
+            img.draft('RGB', size)  # JPEG sources can decode at reduced scale
+            img = img.resize(size, Image.LANCZOS)
+        fmt = choose_format(img)
+        if fmt == 'JPEG':
+            cached = cache_dir / f"{stem}.jpg"
+            _write_atomic(img.convert('RGB'), cached, 'JPEG',
+                          quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            cached = cache_dir / f"{stem}.png"
+            _write_atomic(img, cached, 'PNG', optimize=True)
+    return str(cached)
+
+
+def prepare_images(images, dpi=None, cache_dir=CACHE_DIR, jobs=None):
+    """
+    Prepare every (path, width, height) entry in parallel.
+
+    Returns:
+        dict: {(path, width, height): embeddable path} for images that exist
+    """
+    unique = list(dict.fromkeys(images))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        prepared = pool.map(lambda entry: prepare_image(*entry, dpi=dpi, cache_dir=cache_dir), unique)
+        return {entry: dst for entry, dst in zip(unique, prepared) if dst}
+
+
+def add_image_safe(slide, image_path, left, top, width=None, height=None, prepared=None, blobs=None):
+    """
+    Add image to slide with error handling
+
+    `prepared` is the mapping returned by prepare_images(); when given, the
+    image is only looked up there and never decoded here. `blobs` optionally
+    maps prepared paths to their bytes so shared media is read only once.
+    """
     try:
-        if os.path.exists(image_path):
-            # Check if image needs conversion from WebP
-            img = Image.open(image_path)
-            if img.format == 'WEBP' or image_path.lower().endswith('.webp'):
-                # Convert to PNG
-                png_path = image_path.replace('.webp', '.png').replace('.WEBP', '.png')
-                if not png_path.endswith('.png'):
-                    png_path = image_path + '.png'
-                img.save(png_path, 'PNG')
-                image_path = png_path
-            
+        if prepared is not None:
+            image_path = prepared.get((image_path, width, height))
+        else:
+            image_path = prepare_image(image_path)
+
+        if image_path:
+            if blobs and image_path in blobs:
+                image_path = io.BytesIO(blobs[image_path])
             if width and height:
                 slide.shapes.add_picture(image_path, left, top, width, height)
             elif width:
                 slide.shapes.add_picture(image_path, left, top, width)
+            elif height:
+                slide.shapes.add_picture(image_path, left, top, height=height)
             else:
                 slide.shapes.add_picture(image_path, left, top)
             return True
@@ -38,347 +202,373 @@ def add_image_safe(slide, image_path, left, top, width=None, height=None):
         print(f"Could not add image {image_path}: {e}")
     return False
 
-def create_pitch_deck():
-    """Create the Blood Assassin pitch deck"""
-    
-    # Create presentation
-    prs = Presentation()
-    prs.slide_width = Inches(16)  # Widescreen
-    prs.slide_height = Inches(9)
-    
-    # Slide 1: Title Slide
-    slide_layout = prs.slide_layouts[6]  # Blank layout
-    slide = prs.slides.add_slide(slide_layout)
-    
-    # Dark background
-    background = slide.background
-    fill = background.fill
-    fill.solid()
-    fill.fore_color.rgb = RGBColor(25, 25, 35)
-    
-    # Title
-    title_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(14), Inches(2))
-    title_frame = title_box.text_frame
-    title_frame.clear()
-    p = title_frame.paragraphs[0]
-    p.text = "BLOOD ASSASSIN"
-    p.font.name = 'Arial Black'
-    p.font.size = Pt(72)
-    p.font.color.rgb = RGBColor(139, 0, 0)  # Dark red
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Subtitle
-    subtitle_box = slide.shapes.add_textbox(Inches(1), Inches(4.5), Inches(14), Inches(1))
-    subtitle_frame = subtitle_box.text_frame
-    p = subtitle_frame.paragraphs[0]
-    p.text = "A Dark Fantasy Novel"
-    p.font.name = 'Arial'
-    p.font.size = Pt(32)
-    p.font.color.rgb = RGBColor(200, 200, 200)
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Tagline
-    tagline_box = slide.shapes.add_textbox(Inches(2), Inches(6), Inches(12), Inches(2))
-    tagline_frame = tagline_box.text_frame
-    p = tagline_frame.paragraphs[0]
-    p.text = "When prophecy and blood collide, even monsters must choose their humanity"
-    p.font.name = 'Arial Italic'
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(150, 150, 170)
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Try to add character portraits if available
-    add_image_safe(slide, "generated-images/01_elara_nightshade_portrait.png", 
-                   Inches(0.5), Inches(1), height=Inches(7))
-    add_image_safe(slide, "generated-images/02_queen_lysandria_portrait.png", 
-                   Inches(12), Inches(1), height=Inches(7))
-    
-    # Slide 2: The World
-    slide = prs.slides.add_slide(prs.slide_layouts[5])  # Title Only
-    slide.shapes.title.text = "THE WORLD"
-    
-    # World description
-    content_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(14), Inches(6))
-    tf = content_box.text_frame
-    tf.clear()
-    
-    # Setting
-    p = tf.paragraphs[0]
-    p.text = "A REALM DIVIDED"
-    p.font.bold = True
-    p.font.size = Pt(28)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "\nThe Crimson Court: Vampire aristocracy ruling from shadow"
-    p.font.size = Pt(20)
-    p.level = 1
-    
-    p = tf.add_paragraph()
-    p.text = "The Order of the Dagger: Elite hunters sworn to protect humanity"
-    p.font.size = Pt(20)
-    p.level = 1
-    
-    p = tf.add_paragraph()
-    p.text = "The Rebellion: Mortals fighting for freedom from supernatural tyranny"
-    p.font.size = Pt(20)
-    p.level = 1
-    
-    p = tf.add_paragraph()
-    p.text = "\nTHE BLOODBOUND PROPHECY"
-    p.font.bold = True
-    p.font.size = Pt(28)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "A chosen one with mixed blood will either unite the realms or destroy them all"
-    p.font.size = Pt(20)
-    p.font.italic = True
-    
-    # Slide 3: Main Characters
-    slide = prs.slides.add_slide(prs.slide_layouts[5])
-    slide.shapes.title.text = "CORE CHARACTERS"
-    
-    # Character grid
-    chars = [
-        ("ELARA NIGHTSHADE", "The Chosen Hunter", "Torn between humanity and vampiric heritage"),
-        ("QUEEN LYSANDRIA", "The Tyrant", "Paranoid ruler obsessed with control"),
-        ("SERAPHIEL", "The Fallen Guide", "Celestial being seeking redemption"),
-        ("VALERIA DUSKBANE", "The Double Agent", "Spy caught between two worlds")
-    ]
-    
-    y_pos = 2
-    for name, role, desc in chars:
-        # Name
-        name_box = slide.shapes.add_textbox(Inches(1), Inches(y_pos), Inches(4), Inches(0.5))
-        p = name_box.text_frame.paragraphs[0]
-        p.text = name
-        p.font.bold = True
-        p.font.size = Pt(20)
-        p.font.color.rgb = RGBColor(139, 0, 0)
-        
-        # Role
-        role_box = slide.shapes.add_textbox(Inches(5.5), Inches(y_pos), Inches(3), Inches(0.5))
-        p = role_box.text_frame.paragraphs[0]
-        p.text = role
-        p.font.size = Pt(18)
-        p.font.color.rgb = RGBColor(100, 100, 120)
-        
-        # Description
-        desc_box = slide.shapes.add_textbox(Inches(9), Inches(y_pos), Inches(6), Inches(0.5))
-        p = desc_box.text_frame.paragraphs[0]
-        p.text = desc
-        p.font.size = Pt(16)
-        
-        y_pos += 1.5
-    
-    # Slide 4: The Conflict
-    slide = prs.slides.add_slide(prs.slide_layouts[5])
-    slide.shapes.title.text = "THE CENTRAL CONFLICT"
-    
-    content_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(14), Inches(6))
-    tf = content_box.text_frame
-    tf.clear()
-    
-    p = tf.paragraphs[0]
-    p.text = "PERSONAL STAKES"
-    p.font.bold = True
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "• Elara discovers her vampiric bloodline, shattering her identity"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Must master both sides of her nature to fulfill the prophecy"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Faces betrayal from her mentor who hid the truth"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "\nGLOBAL STAKES"
-    p.font.bold = True
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "• The Nightbringer threatens to lock the world in eternal stasis"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Vampire-mortal war escalates toward mutual destruction"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Only Elara can bridge both worlds—or destroy them"
-    p.font.size = Pt(18)
-    
-    # Slide 5: Themes
-    slide = prs.slides.add_slide(prs.slide_layouts[5])
-    slide.shapes.title.text = "CORE THEMES"
-    
-    themes = [
-        ("Identity & Duality", "The struggle between our nature and our choices"),
-        ("Power & Paranoia", "How fear of losing control becomes self-destructive"),
-        ("Trust & Betrayal", "Learning vulnerability is strength, not weakness"),
-        ("Redemption", "Everyone deserves a chance to change their story"),
-        ("Growth vs. Stasis", "The danger of refusing to evolve")
-    ]
-    
-    y_pos = 2
-    for theme, desc in themes:
-        # Theme name
-        theme_box = slide.shapes.add_textbox(Inches(1), Inches(y_pos), Inches(4), Inches(0.5))
-        p = theme_box.text_frame.paragraphs[0]
-        p.text = theme
-        p.font.bold = True
-        p.font.size = Pt(20)
-        p.font.color.rgb = RGBColor(139, 0, 0)
-        
-        # Description
-        desc_box = slide.shapes.add_textbox(Inches(5.5), Inches(y_pos), Inches(9), Inches(0.5))
-        p = desc_box.text_frame.paragraphs[0]
-        p.text = desc
-        p.font.size = Pt(16)
-        p.font.italic = True
-        
-        y_pos += 1.2
-    
-    # Slide 6: Target Audience & Comps
-    slide = prs.slides.add_slide(prs.slide_layouts[5])
-    slide.shapes.title.text = "MARKET POSITIONING"
-    
-    content_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(14), Inches(6))
-    tf = content_box.text_frame
-    tf.clear()
-    
-    p = tf.paragraphs[0]
-    p.text = "TARGET AUDIENCE"
-    p.font.bold = True
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "• Adults 25-45 who enjoy dark fantasy and vampire fiction"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Readers of morally complex protagonists and anti-heroes"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Fans of political intrigue and prophecy-driven narratives"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "\nCOMPARABLE TITLES"
-    p.font.bold = True
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    
-    p = tf.add_paragraph()
-    p.text = "• Throne of Glass meets Interview with the Vampire"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• The Witcher's moral complexity with Underworld's aesthetic"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "• Castlevania's gothic horror meets Game of Thrones' politics"
-    p.font.size = Pt(18)
-    
-    # Slide 7: Series Potential
-    slide = prs.slides.add_slide(prs.slide_layouts[5])
-    slide.shapes.title.text = "SERIES POTENTIAL"
-    
-    content_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(14), Inches(6))
-    tf = content_box.text_frame
-    tf.clear()
-    
-    p = tf.paragraphs[0]
-    p.text = "BOOK ONE: Blood Assassin"
-    p.font.bold = True
-    p.font.size = Pt(22)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    p = tf.add_paragraph()
-    p.text = "Elara discovers her heritage and confronts the Nightbringer"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "\nBOOK TWO: Crimson Prophecy"
-    p.font.bold = True
-    p.font.size = Pt(22)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    p = tf.add_paragraph()
-    p.text = "The aftermath of the prophecy creates new alliances and enemies"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "\nBOOK THREE: Twilight Throne"
-    p.font.bold = True
-    p.font.size = Pt(22)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    p = tf.add_paragraph()
-    p.text = "Elara must unite both worlds against an ancient threat"
-    p.font.size = Pt(18)
-    
-    p = tf.add_paragraph()
-    p.text = "\nSPIN-OFF POTENTIAL"
-    p.font.bold = True
-    p.font.size = Pt(22)
-    p.font.color.rgb = RGBColor(100, 0, 0)
-    p = tf.add_paragraph()
-    p.text = "• Seraphiel's celestial past  • Mara's rebellion  • The Order's origins"
-    p.font.size = Pt(18)
-    
-    # Slide 8: Call to Action
-    slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank
-    
-    # Dark background
-    background = slide.background
-    fill = background.fill
-    fill.solid()
-    fill.fore_color.rgb = RGBColor(25, 25, 35)
-    
-    # Main text
-    main_box = slide.shapes.add_textbox(Inches(2), Inches(2), Inches(12), Inches(5))
-    tf = main_box.text_frame
+# ----------------------
+# Slide-spec renderer
+# ----------------------
+# A spec is a JSON (or YAML) document:
+#   output      default .pptx path
+#   slide_size  [width, height] in inches
+#   theme       {"colors": {token: [r, g, b]}, "styles": {name: {font props}}}
+#   slides      list of {id, layout, title?, background?, shapes: [...]}
+# Shapes are text boxes ({"type": "text", "box": [l, t, w, h], "paragraphs"}),
+# images ({"type": "image", "path", "left", "top", "width"?, "height"?}; SVG
+# paths are rasterized at the box size, see svg_raster.py) or
+# rows ({"type": "rows", "top", "step", "height", "columns", "rows"}), one text
+# box per cell. Paragraphs and columns take a "style" plus inline overrides of
+# font, size, bold, italic, color (token or [r, g, b]), align and level.
+# An optional top-level "skip_duplicates" (perceptual-hash Hamming threshold)
+# leaves out image slots that near-duplicate an earlier image in the deck.
+# Slides may set "title_color" (token or [r, g, b]) for the layout title.
+# A slide with "optional": true is left out when none of its images exist.
+# A slide "background" of "auto", or a top-level "auto_colors" (true, or
+# {"min_contrast": 3.0}) for every slide with images, derives the background
+# from the slide's image palette and adjusts theme colours to stay readable
+# on it (see image_palette.py).
+
+STYLE_KEYS = ("font", "size", "bold", "italic", "color", "align", "level")
+
+
+def load_spec(path):
+    """Load a deck spec from JSON, or YAML when PyYAML is installed"""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix.lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("ERROR: PyYAML not installed. Install with: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def merge_spec(base, overrides):
+    """Recursively merge overrides into a copy of base (dicts merge, everything else replaces)"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_spec(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def variant_spec(base, variant):
+    """
+    Build the spec for one variant of a base deck.
+
+    A variant may override output and theme (merged), and may list "slides"
+    as base slide ids and/or full slide dicts to select, reorder or add slides.
+
+    Raises:
+        ValueError: the variant names a slide id that is not in the base spec
+    """
+    spec = merge_spec(base, {k: v for k, v in variant.items() if k != "slides"})
+    if "slides" in variant:
+        by_id = {slide.get("id"): slide for slide in base["slides"]}
+        unknown = [entry for entry in variant["slides"] if isinstance(entry, str) and entry not in by_id]
+        if unknown:
+            raise ValueError(f"Variant {spec.get('output', '<no output>')}: unknown slide id(s) "
+                             f"{', '.join(unknown)} (base spec has: {', '.join(str(i) for i in by_id)})")
+        spec["slides"] = [
+            copy.deepcopy(by_id[entry]) if isinstance(entry, str) else entry
+            for entry in variant["slides"]
+        ]
+    return spec
+
+
+class StyleResolver:
+    """Resolves style names + inline overrides against a theme, caching each combination"""
+
+    def __init__(self, theme):
+        self.theme = theme
+        self.colors = {name: RGBColor(*rgb) for name, rgb in theme.get("colors", {}).items()}
+        self.styles = theme.get("styles", {})
+        self._cache = {}
+
+    def with_colors(self, colors):
+        """A resolver for the same styles with some colour tokens replaced"""
+        return StyleResolver(dict(self.theme, colors=dict(self.theme.get("colors", {}), **colors)))
+
+    def color(self, value):
+        if isinstance(value, str):
+            return self.colors[value]
+        return RGBColor(*value)
+
+    def resolve(self, entry):
+        """Return the resolved properties for a paragraph or column entry"""
+        overrides = tuple((k, json.dumps(entry[k])) for k in STYLE_KEYS if k in entry)
+        key = (entry.get("style"), overrides)
+        resolved = self._cache.get(key)
+        if resolved is None:
+            props = dict(self.styles.get(entry.get("style"), {})) if entry.get("style") else {}
+            props.update({k: entry[k] for k in STYLE_KEYS if k in entry})
+            resolved = {}
+            if "font" in props:
+                resolved["name"] = props["font"]
+            if "size" in props:
+                resolved["size"] = Pt(props["size"])
+            for flag in ("bold", "italic", "level"):
+                if flag in props:
+                    resolved[flag] = props[flag]
+            if "color" in props:
+                resolved["color"] = self.color(props["color"])
+            if "align" in props:
+                resolved["align"] = PP_ALIGN[props["align"].upper()]
+            self._cache[key] = resolved
+        return resolved
+
+
+def apply_paragraph(p, text, props):
+    """Set paragraph text and only the font properties the style defines"""
+    p.text = text
+    if "name" in props:
+        p.font.name = props["name"]
+    if "size" in props:
+        p.font.size = props["size"]
+    if "bold" in props:
+        p.font.bold = props["bold"]
+    if "italic" in props:
+        p.font.italic = props["italic"]
+    if "color" in props:
+        p.font.color.rgb = props["color"]
+    if "level" in props:
+        p.level = props["level"]
+    if "align" in props:
+        p.alignment = props["align"]
+
+
+def add_text_shape(slide, box, paragraphs, styles):
+    """Add a text box with one or more styled paragraphs"""
+    textbox = slide.shapes.add_textbox(*(Inches(v) for v in box))
+    tf = textbox.text_frame
     tf.clear()
-    
-    p = tf.paragraphs[0]
-    p.text = "JOIN THE HUNT"
-    p.font.name = 'Arial Black'
-    p.font.size = Pt(48)
-    p.font.color.rgb = RGBColor(139, 0, 0)
-    p.alignment = PP_ALIGN.CENTER
-    
-    p = tf.add_paragraph()
-    p.text = "\nA story of monsters, humanity, and the choices that define us"
-    p.font.size = Pt(24)
-    p.font.color.rgb = RGBColor(200, 200, 200)
-    p.alignment = PP_ALIGN.CENTER
-    
-    p = tf.add_paragraph()
-    p.text = "\n\nBLOOD ASSASSIN"
-    p.font.bold = True
-    p.font.size = Pt(32)
-    p.font.color.rgb = RGBColor(180, 0, 0)
-    p.alignment = PP_ALIGN.CENTER
-    
-    p = tf.add_paragraph()
-    p.text = "Coming Soon"
-    p.font.italic = True
-    p.font.size = Pt(20)
-    p.font.color.rgb = RGBColor(150, 150, 170)
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Save presentation
-    output_path = "Blood_Assassin_Pitch_Deck.pptx"
+    for i, para in enumerate(paragraphs):
+        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+        apply_paragraph(p, para.get("text", ""), styles.resolve(para))
+    return textbox
+
+
+def image_box(shape):
+    """(width, height) EMU display box of an image shape, None where unset"""
+    width = Inches(shape["width"]) if shape.get("width") else None
+    height = Inches(shape["height"]) if shape.get("height") else None
+    return width, height
+
+
+def spec_images(spec):
+    """Every (path, width, height) image slot referenced by a spec"""
+    images = []
+    for slide in spec["slides"]:
+        for shape in slide.get("shapes", []):
+            if shape.get("type") == "image":
+                images.append((shape["path"], *image_box(shape)))
+    return images
+
+
+def duplicate_slots(spec):
+    """Image paths in the spec that near-duplicate an earlier one (see image_dedupe.py)"""
+    if spec.get("skip_duplicates") is None:
+        return set()
+    from image_dedupe import find_duplicates
+
+    paths = list(dict.fromkeys(path for path, _, _ in spec_images(spec)))
+    return {str(Path(p)) for p in find_duplicates(paths, spec["skip_duplicates"])}
+
+
+def auto_colors(spec, slide_spec, styles, palettes):
+    """
+    (slide spec, style resolver) with palette-derived colours for an auto-coloured slide.
+
+    Slides that are not auto-coloured, or whose images have not been
+    analyzed, are returned unchanged.
+    """
+    setting = spec.get("auto_colors")
+    images = [shape["path"] for shape in slide_spec.get("shapes", []) if shape.get("type") == "image"]
+    if not images or not (slide_spec.get("background") == "auto" or setting):
+        return slide_spec, styles
+    from image_palette import MIN_CONTRAST, slide_colors
+
+    min_contrast = setting.get("min_contrast", MIN_CONTRAST) if isinstance(setting, dict) else MIN_CONTRAST
+    colors = slide_colors([palettes.get(str(Path(p))) for p in images],
+                          styles.theme.get("colors", {}), min_contrast)
+    if colors is None:
+        return slide_spec, styles
+    background, theme_colors, text = colors
+    slide_spec = dict(slide_spec, background=background)
+    slide_spec.setdefault("title_color", text)
+    return slide_spec, styles.with_colors(theme_colors)
+
+
+def render_slide(prs, slide_spec, styles, prepared, blobs=None, profiler=None, skip=None):
+    """Add one slide described by slide_spec to prs"""
+    profiler = profiler or StageProfiler("render_slide", enabled=False)
+    slide = prs.slides.add_slide(prs.slide_layouts[slide_spec.get("layout", 6)])
+
+    if slide_spec.get("background") and slide_spec["background"] != "auto":
+        fill = slide.background.fill
+        fill.solid()
+        fill.fore_color.rgb = styles.color(slide_spec["background"])
+
+    if slide_spec.get("title"):
+        slide.shapes.title.text = slide_spec["title"]
+        if slide_spec.get("title_color"):
+            for p in slide.shapes.title.text_frame.paragraphs:
+                p.font.color.rgb = styles.color(slide_spec["title_color"])
+
+    for shape in slide_spec.get("shapes", []):
+        kind = shape.get("type", "text")
+        if kind == "text":
+            add_text_shape(slide, shape["box"], shape.get("paragraphs", []), styles)
+        elif kind == "image":
+            if skip and str(Path(shape["path"])) in skip:
+                print(f"↷ Skipping duplicate image: {shape['path']}")
+                continue
+            width, height = image_box(shape)
+            with profiler.stage(f"image:{shape['path']}"):
+                add_image_safe(slide, shape["path"], Inches(shape["left"]), Inches(shape["top"]),
+                               width=width, height=height, prepared=prepared, blobs=blobs)
+        elif kind == "rows":
+            y_pos = shape["top"]
+            for row in shape["rows"]:
+                for column, text in zip(shape["columns"], row):
+                    box = [column["left"], y_pos, column["width"], shape.get("height", 0.5)]
+                    add_text_shape(slide, box, [dict(column, text=text)], styles)
+                y_pos += shape["step"]
+        else:
+            print(f"⚠️  Unknown shape type '{kind}' on slide {slide_spec.get('id')}")
+    return slide
+
+
+def render_deck(spec, output_path=None, prepared=None, blobs=None, dpi=None, profiler=None):
+    """
+    Render a spec to a .pptx file
+
+    Args:
+        spec: Deck spec dict (see the format notes above)
+        output_path: Overrides spec["output"]
+        prepared: Mapping from prepare_images(); computed here if omitted
+        blobs: Optional {prepared path: bytes} shared across decks
+        dpi: Target image resolution when preparing images here
+        profiler: Optional StageProfiler recording prepare, per-slide, per-image
+                  and save stages
+
+    Returns:
+        str: The saved output path
+    """
+    profiler = profiler or StageProfiler("render_deck", enabled=False)
+    prs = build_presentation(spec, prepared, blobs, dpi, profiler)
+    output_path = output_path or spec.get("output", DEFAULT_OUTPUT)
+    with profiler.stage("save"):
+        prs.save(output_path)
+    return output_path
+
+
+def build_presentation(spec, prepared=None, blobs=None, dpi=None, profiler=None):
+    """The Presentation for a spec, not yet saved (arguments as for render_deck)"""
+    profiler = profiler or StageProfiler("build_presentation", enabled=False)
+    if prepared is None:
+        with profiler.stage("prepare_images"):
+            prepared = prepare_images(spec_images(spec), dpi=dpi)
+
+    prs = Presentation()
+    width, height = spec.get("slide_size", [16, 9])
+    prs.slide_width = Inches(width)
+    prs.slide_height = Inches(height)
+
+    styles = StyleResolver(spec.get("theme", {}))
+    skip = duplicate_slots(spec)
+    palettes = {}
+    if spec.get("auto_colors") or any(s.get("background") == "auto" for s in spec["slides"]):
+        from image_palette import analyze_paths
+        with profiler.stage("analyze_palettes"):
+            palettes = analyze_paths(path for path, _, _ in spec_images(spec))
+    for index, slide_spec in enumerate(spec["slides"], start=1):
+        slots = spec_images({"slides": [slide_spec]})
+        if slide_spec.get("optional") and not any(prepared.get(slot) for slot in slots):
+            print(f"↷ Skipping slide {slide_spec.get('id', index)}: none of its images exist")
+            continue
+        with profiler.stage(f"slide:{slide_spec.get('id', index)}"):
+            slide_spec, slide_styles = auto_colors(spec, slide_spec, styles, palettes)
+            render_slide(prs, slide_spec, slide_styles, prepared, blobs, profiler=profiler, skip=skip)
+    return prs
+
+
+# Worker-process state for render_variants(), set once per worker
+_RENDER_PREPARED = None
+_RENDER_BLOBS = None
+
+
+def _init_render_worker(prepared, blobs):
+    global _RENDER_PREPARED, _RENDER_BLOBS
+    _RENDER_PREPARED = prepared
+    _RENDER_BLOBS = blobs
+
+
+def _render_variant(spec):
+    started = time.perf_counter()
+    prs = build_presentation(spec, prepared=_RENDER_PREPARED, blobs=_RENDER_BLOBS)
+    output_path = spec.get("output", DEFAULT_OUTPUT)
     prs.save(output_path)
+    # Optional slides whose images are all missing are not added, so count what is in the deck
+    return {"output": output_path, "slides": len(prs.slides),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def render_variants(base, variants, dpi=None, jobs=None):
+    """
+    Render many variants of a base spec in one go
+
+    Images for every variant are prepared once up front and their bytes read
+    once; decks are rendered in-process (jobs=1) or across worker processes.
+
+    Returns:
+        list[dict]: Per-variant results with output, slides and seconds
+    """
+    started = time.perf_counter()
+    specs = [variant_spec(base, variant) for variant in variants]
+    images = [entry for spec in specs for entry in spec_images(spec)]
+    prepared = prepare_images(images, dpi=dpi)
+    blobs = {}
+    for path in set(prepared.values()):
+        with open(path, 'rb') as f:
+            blobs[path] = f.read()
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(specs)))
+    print(f"⚙️  Rendering {len(specs)} decks with {jobs} worker(s)...")
+    if jobs == 1:
+        _init_render_worker(prepared, blobs)
+        results = [_render_variant(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_render_worker,
+                                 initargs=(prepared, blobs)) as pool:
+            results = list(pool.map(_render_variant, specs))
+
+    for result in results:
+        print(f"✅ {result['output']}: {result['slides']} slides in {result['seconds']:.2f}s")
+    print(f"⏱️  Total: {time.perf_counter() - started:.2f}s")
+    return results
+
+
+def create_pitch_deck(dpi=None, spec_path=DEFAULT_SPEC, profiler=None, skip_duplicates=None,
+                      auto_colors=False):
+    """
+    Create the Blood Assassin pitch deck
+
+    Args:
+        dpi: Optional target resolution (e.g. 150 or 220). When set, images are
+             downsampled to their on-slide size and compactly re-encoded.
+        spec_path: Slide spec to render (defaults to deck-specs/blood_assassin.json)
+        profiler: Optional StageProfiler (see build_profile.py)
+        skip_duplicates: Optional Hamming-distance threshold; overrides the
+                         spec's skip_duplicates
+        auto_colors: Derive slide colours from image palettes (spec "auto_colors")
+    """
+    spec = load_spec(spec_path)
+    if skip_duplicates is not None:
+        spec["skip_duplicates"] = skip_duplicates
+    if auto_colors:
+        spec["auto_colors"] = spec.get("auto_colors") or True
+    output_path = render_deck(spec, dpi=dpi, profiler=profiler)
     print(f"✅ Pitch deck created: {output_path}")
     
     # Create a version with placeholder for images if they're not found
@@ -387,23 +577,52 @@ def create_pitch_deck():
     
     return output_path
 
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Build the Blood Assassin pitch deck")
+    parser.add_argument("--dpi", type=int, default=None,
+                        help="Downsample images to their slide size at this DPI (e.g. 150 or 220)")
+    parser.add_argument("--spec", default=str(DEFAULT_SPEC), help="Slide spec (JSON or YAML)")
+    parser.add_argument("--variants", metavar="VARIANTS_FILE",
+                        help="JSON/YAML list of variants of --spec to render in one run")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes for --variants (default: CPU count)")
+    parser.add_argument("--profile", nargs="?", const="profile-deck.json", metavar="REPORT_JSON",
+                        help="Record per-stage/per-slide wall time and allocations to a JSON report")
+    parser.add_argument("--cprofile", metavar="PSTATS_FILE",
+                        help="With --profile, also dump cProfile stats (for snakeviz/flameprof)")
+    parser.add_argument("--skip-duplicates", nargs="?", type=int, const=8, metavar="THRESHOLD",
+                        help="Leave out near-duplicate images (perceptual-hash distance, default 8)")
+    parser.add_argument("--auto-colors", action="store_true",
+                        help="Pick slide background and text colours from each slide's image palette")
+    args = parser.parse_args(argv)
+    if args.cprofile and not args.profile:
+        parser.error("--cprofile requires --profile")
+
+    if args.variants:
+        if args.profile:
+            print("⚠️  --profile applies to single deck builds; ignored with --variants")
+        base = load_spec(args.spec)
+        if args.skip_duplicates is not None:
+            base["skip_duplicates"] = args.skip_duplicates
+        if args.auto_colors:
+            base["auto_colors"] = base.get("auto_colors") or True
+        try:
+            render_variants(base, load_spec(args.variants), dpi=args.dpi, jobs=args.jobs)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return 1
+    else:
+        profiler = StageProfiler("create_pitch_deck", enabled=bool(args.profile),
+                                 cprofile=bool(args.cprofile)).start()
+        # Create the pitch deck
+        create_pitch_deck(dpi=args.dpi, spec_path=args.spec, profiler=profiler,
+                          skip_duplicates=args.skip_duplicates, auto_colors=args.auto_colors)
+        profiler.stop()
+        if args.profile:
+            profiler.write(args.profile, args.cprofile)
+    return 0
+
+
 if __name__ == "__main__":
-    # Install required packages if needed
-    try:
-        from pptx import Presentation
-    except ImportError:
-        print("Installing python-pptx...")
-        import subprocess
-        subprocess.run(["pip", "install", "python-pptx", "--break-system-packages"])
-        from pptx import Presentation
-    
-    try:
-        from PIL import Image
-    except ImportError:
-        print("Installing Pillow...")
-        import subprocess
-        subprocess.run(["pip", "install", "Pillow", "--break-system-packages"])
-        from PIL import Image
-    
-    # Create the pitch deck
-    create_pitch_deck()
+    sys.exit(main())
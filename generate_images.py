@@ -4,7 +4,11 @@ Image Generation Script using OpenRouter and Gemini 2.5 Flash Image
 Reads prompts from image-prompts/ folder and generates images
 """
 
+import argparse
+import hashlib
+import json
 import os
+import sys
 import base64
 import requests
 from pathlib import Path
@@ -12,13 +16,10 @@ from dotenv import load_dotenv
 import time
 from typing import Optional
 
-# Load environment variables from .env file
-load_dotenv()
+from hedging import HedgeCancelled, policy_from_env, run_hedged
+from telemetry import record_call, recent_latencies
 
 # Configuration
-# Load .env from current working directory explicitly as a fallback
-load_dotenv(dotenv_path=Path.cwd() / ".env")
-OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 MODEL = "google/gemini-2.5-flash-image"  # Gemini 2.5 Flash Image model
 PROMPTS_DIR = Path("image-prompts")
 OUTPUT_DIR = Path("generated-images")
@@ -27,22 +28,90 @@ OUTPUT_DIR = Path("generated-images")
 SESSION = requests.Session()
 SESSION.trust_env = False
 
-# Create output directory if it doesn't exist
-OUTPUT_DIR.mkdir(exist_ok=True)
+_ENV_LOADED = False
+_HEDGE_POLICY = None
 
-def generate_image(prompt_text, output_filename, api_key: Optional[str] = None):
+
+def load_env():
+    """Load environment variables from .env once, on first use rather than at import"""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        # Load .env from current working directory explicitly as a fallback
+        load_dotenv(dotenv_path=Path.cwd() / ".env")
+        _ENV_LOADED = True
+
+
+def get_api_key() -> Optional[str]:
+    """Return OPENROUTER_API_KEY from the environment (loading .env if needed)"""
+    load_env()
+    return os.getenv('OPENROUTER_API_KEY')
+
+
+def get_hedge_policy():
+    """Process-wide hedge policy (see hedging.py), seeded from the telemetry ledger; None if disabled"""
+    global _HEDGE_POLICY
+    if _HEDGE_POLICY is None:
+        load_env()
+        _HEDGE_POLICY = policy_from_env(recent_latencies(MODEL)) or False
+    return _HEDGE_POLICY or None
+
+
+def post_completion(url, headers, payload, cancel=None):
+    """
+    Send one chat-completions request and read the reply.
+
+    The body is read in chunks so a hedged attempt that lost the race stops
+    downloading as soon as `cancel` is set (raising HedgeCancelled).
+
+    Returns:
+        dict: {"json", "model", "http_status", "bytes_out", "bytes_in", "ttfb_s", "download_s"}
+    """
+    body = json.dumps(payload).encode("utf-8")
+    # Use our session and avoid cross-host redirects that may drop Authorization headers
+    response = SESSION.post(url, data=body, headers=headers, timeout=30, allow_redirects=False,
+                            stream=True)
+    with response:
+        if response.status_code >= 400:
+            response.content  # read the error body for the caller's message
+            response.raise_for_status()
+        chunks = []
+        download_started = time.perf_counter()
+        for chunk in response.iter_content(chunk_size=1 << 16):
+            if cancel is not None and cancel.is_set():
+                raise HedgeCancelled()
+            chunks.append(chunk)
+        content = b"".join(chunks)
+        download_s = time.perf_counter() - download_started
+    return {
+        "json": json.loads(content),
+        "model": payload["model"],
+        "http_status": response.status_code,
+        "bytes_out": len(body),
+        "bytes_in": len(content),
+        "ttfb_s": response.elapsed.total_seconds(),
+        "download_s": download_s,
+    }
+
+
+def generate_image(prompt_text, output_filename, api_key: Optional[str] = None,
+                   seed: Optional[int] = None, hedge: bool = False, hedge_permit=None):
     """
     Generate an image using OpenRouter API with Gemini 2.5 Flash Image
 
     Args:
         prompt_text: The text prompt for image generation
         output_filename: Name for the output file (without extension)
+        seed: Optional sampling seed, forwarded to providers that support it
+        hedge: Race a second request against a slow first one (see hedging.py)
+        hedge_permit: Optional callable taking a rate token for the hedge request;
+                      the generation scheduler passes one so hedges stay within its budget
 
     Returns:
         list[str]: List of saved image file names (within OUTPUT_DIR). Empty list on failure.
                    Note: The function is truthy on success for backward compatibility with CLI usage.
     """
-    key = api_key or OPENROUTER_API_KEY
+    key = api_key or get_api_key()
     if not key:
         print("Error: OPENROUTER_API_KEY not found and no override provided")
         return []
@@ -68,14 +137,38 @@ def generate_image(prompt_text, output_filename, api_key: Optional[str] = None):
         # Request image outputs explicitly per OpenRouter docs
         "modalities": ["image", "text"]
     }
+    if seed is not None:
+        payload["seed"] = seed
+
+    # Telemetry for this call; recorded to the ledger (telemetry.py) in the finally block
+    call = {
+        "model": MODEL,
+        "prompt_sha256": hashlib.sha256(prompt_text.encode("utf-8")).hexdigest(),
+        "status": "error",
+        "retries": 0,
+        "images": 0,
+        "role": "primary",
+    }
+    started = time.perf_counter()
+    received = None
+    settled = []  # hedged calls: (role, outcome, seconds, error) per attempt, see run_hedged()
     
+    def attempt(model, endpoint=url):
+        return lambda cancel: post_completion(endpoint, headers, dict(payload, model=model), cancel)
+
     try:
         print(f"Generating image for: {output_filename}...")
-        # Use our session and avoid cross-host redirects that may drop Authorization headers
-        response = SESSION.post(url, json=payload, headers=headers, timeout=30, allow_redirects=False)
-        response.raise_for_status()
-        
-        result = response.json()
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        policy = get_hedge_policy() if hedge else None
+        if policy:
+            models = {"primary": MODEL, "hedge": policy.fallback_model or MODEL}
+            reply, _, _ = run_hedged(attempt(models["primary"]), attempt(models["hedge"]), policy,
+                                     permit=hedge_permit, report=lambda *entry: settled.append(entry))
+        else:
+            reply = attempt(MODEL)(None)
+        received = time.perf_counter()
+        result = reply.pop("json")
+        call.update(reply)
         
         # Extract image data from response per OpenRouter image generation format
         if 'choices' in result and len(result['choices']) > 0:
@@ -113,6 +206,9 @@ def generate_image(prompt_text, output_filename, api_key: Optional[str] = None):
                         print(f"✗ Failed to decode/save image {idx}: {e}")
 
             if saved_filenames:
+                call.update(status="ok", images=len(saved_filenames),
+                            formats=",".join(sorted({Path(n).suffix[1:] for n in saved_filenames})))
+                call.setdefault("extra", {})["outputs"] = saved_filenames
                 return saved_filenames
 
             # Fallback: some responses may inline a single data URL in content
@@ -131,79 +227,130 @@ def generate_image(prompt_text, output_filename, api_key: Optional[str] = None):
                     with open(output_path, 'wb') as f:
                         f.write(image_bytes)
                     print(f"✓ Successfully saved: {output_path}")
+                    call.update(status="ok", images=1, formats=ext)
+                    call.setdefault("extra", {})["outputs"] = [output_path.name]
                     return [output_path.name]
                 except (ValueError, base64.binascii.Error, OSError) as e:
                     print(f"✗ Failed to decode inline image: {e}")
+                    call["status"] = "decode_error"
                     return []
 
             # If we got here, no images were returned
             preview = (message.get('content') or '')
             print(f"✗ No image data in response. Assistant said: {str(preview)[:120]}")
+            call["status"] = "no_image"
             return []
         else:
             print(f"✗ No image data in response: {result}")
+            call["status"] = "no_image"
             return []
             
     except requests.exceptions.RequestException as e:
         print(f"✗ Error generating image: {e}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"  Response: {e.response.text}")
+        call.update(_failure_fields(e))
         return []
     except (ValueError, KeyError, base64.binascii.Error) as e:
         print(f"✗ Unexpected parse error: {e}")
+        call["status"] = "parse_error"
         return []
+    finally:
+        finished = time.perf_counter()
+        call["latency_s"] = finished - started
+        if received is not None:
+            call["decode_s"] = finished - received
+        # One ledger row per upstream attempt: the call's outcome goes on the winning (or, if
+        # every attempt failed, the last) attempt's row; the others get a row of their own
+        final = next((a for a in settled if a[1] == "ok"), settled[-1] if settled else None)
+        for role, outcome, seconds, error in settled:
+            if role != final[0]:
+                record_call(model=models[role], prompt_sha256=call["prompt_sha256"], role=role,
+                            retries=0, images=0, latency_s=seconds,
+                            **(_failure_fields(error) if outcome == "error" else {"status": outcome}))
+        if final:
+            call.update(role=final[0], model=models[final[0]])
+        record_call(**call)
+
+
+def _failure_fields(error):
+    """Ledger status (and HTTP status) for an exception raised by post_completion()"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        return {"status": "http_error", "http_status": response.status_code}
+    if isinstance(error, requests.exceptions.RequestException):
+        return {"status": "network_error"}
+    return {"status": "parse_error" if isinstance(error, ValueError) else "error"}
+
 
-def main():
+def main(argv=None):
     """Main function to process all prompts"""
-    if not OPENROUTER_API_KEY:
+    from generation_scheduler import run_bulk
+    from prompt_sweep import base_prompt
+
+    parser = argparse.ArgumentParser(description="Generate images for every prompt in image-prompts/")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge slow requests with a second one (HEDGE_* env vars, see hedging.py)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Instead of a full run, regenerate prompts as their files change")
+    parser.add_argument("--poll", action="store_true", help="With --watch: poll instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=0.5,
+                        help="With --watch: seconds of quiet before regenerating a burst of edits")
+    parser.add_argument("--concurrency", type=int, default=4, help="With --watch: parallel regenerations")
+    args = parser.parse_args(argv)
+
+    api_key = get_api_key()
+    if not api_key:
         print("Error: Please set OPENROUTER_API_KEY in your .env file")
-        return
+        return 1
 
     # Validate key format (OpenRouter API keys usually start with 'sk-or-v1-')
-    if not str(OPENROUTER_API_KEY).startswith("sk-or-v1-"):
+    if not str(api_key).startswith("sk-or-v1-"):
         print("Error: The OPENROUTER_API_KEY in .env doesn't look like a standard OpenRouter API key.")
-        print("Expected prefix: 'sk-or-v1-'. Current:", mask_key(OPENROUTER_API_KEY))
+        print("Expected prefix: 'sk-or-v1-'. Current:", mask_key(api_key))
         print("Action: Visit https://openrouter.ai/keys and create a new API key, then update your .env.")
-        return
+        return 1
 
     # Quick auth check before doing any work
     if not check_auth():
-        return
+        return 1
+
+    if args.watch:
+        from prompt_watch import PromptWatcher
+        PromptWatcher(PROMPTS_DIR, debounce=args.debounce, concurrency=args.concurrency,
+                      poll=args.poll, hedge=args.hedge).run()
+        return 0
     
     # Get all prompt files
     prompt_files = sorted(PROMPTS_DIR.glob("*.txt"))
     
     if not prompt_files:
         print(f"No prompt files found in {PROMPTS_DIR}")
-        return
+        return 1
     
     print(f"Found {len(prompt_files)} prompt files")
     print(f"Model: {MODEL}")
     print(f"Output directory: {OUTPUT_DIR}")
     print("-" * 60)
     
-    successful = 0
-    failed = 0
-    
+    jobs = []
     for prompt_file in prompt_files:
         # Read prompt
         with open(prompt_file, 'r', encoding='utf-8') as f:
-            prompt_text = f.read().strip()
+            # Templated prompts (see prompt_sweep.py) contribute their base variant
+            prompt_text = base_prompt(f.read())
         
         # Generate output filename (remove .txt extension)
-        output_filename = prompt_file.stem
-        
-        # Generate image
-        if generate_image(prompt_text, output_filename):
-            successful += 1
-        else:
-            failed += 1
-        
-        # Rate limiting: wait between requests to avoid API limits
-        time.sleep(2)
+        jobs.append((prompt_text, prompt_file.stem))
+
+    # Rate limiting and priority against the web UI are handled by the shared scheduler
+    results = run_bulk(jobs, hedge=args.hedge)
+    successful = sum(1 for images in results if images)
+    failed = len(results) - successful
     
     print("-" * 60)
     print(f"Complete! Success: {successful}, Failed: {failed}")
+    return 0 if not failed else 1
 
 # Helper functions
 # ----------------------
@@ -219,12 +366,13 @@ def mask_key(key: Optional[str]) -> str:
 def check_auth() -> bool:
     """Validate API auth by calling the models endpoint and printing diagnostics."""
     test_url = "https://openrouter.ai/api/v1/models"
+    api_key = get_api_key()
     headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Accept": "application/json",
     }
     print("Auth check:",
-          f"key={mask_key(OPENROUTER_API_KEY)}",
+          f"key={mask_key(api_key)}",
           f"endpoint={test_url}")
     try:
         resp = SESSION.get(test_url, headers=headers, timeout=15, allow_redirects=False)
@@ -243,4 +391,4 @@ def check_auth() -> bool:
         return False
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Priority-lane scheduler for image generation requests.
+
+The web UI (interactive lane) and batch runs (bulk lane) share one OpenRouter
+key. Every request goes through one Scheduler, which:
+  - dispatches interactive work before any queued bulk work (queued bulk jobs
+    yield whenever an interactive request is waiting),
+  - enforces one global rate budget (token bucket) across both lanes, keeping
+    a reserve of tokens and a dedicated worker that only interactive requests
+    may use, so bulk runs cannot starve the UI.
+
+server.py runs the scheduler in-process and exposes it on a local socket;
+batch tools (generate_images.py, its --watch mode, prompt_sweep.py and the
+release pipeline) submit their work there as bulk work through BulkGenerator
+(or run their own in-process scheduler when no server is listening).
+
+Configuration (environment, read by scheduler_from_env()):
+    SCHEDULER_RATE         requests per second across all lanes (default 0.5)
+    SCHEDULER_BURST        token bucket size (default 3)
+    SCHEDULER_CONCURRENCY  shared workers (default 4); one more serves interactive only
+    SCHEDULER_SOCKET       local socket path (default .generation.sock)
+"""
+
+import json
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from generate_images import generate_image
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+DEFAULT_RATE = 0.5  # one request every 2 s, as the batch CLI used to sleep
+DEFAULT_BURST = 3
+DEFAULT_CONCURRENCY = 4
+INTERACTIVE_RESERVE = 1  # tokens only interactive requests may take
+DEFAULT_SOCKET = ".generation.sock"
+
+# Output names accepted over the socket: a bare file stem, no directories
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+
+
+class TokenBucket:
+    """Rate budget: `rate` tokens per second, holding at most `burst` (not thread-safe)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, reserve=0):
+        """Take a token if more than `reserve` would be left over"""
+        self._refill()
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, reserve=0):
+        """Seconds until try_take(reserve) can succeed"""
+        self._refill()
+        return max(0.0, (1 + reserve - self.tokens) / self.rate)
+
+
+class Scheduler:
+    """
+    In-process scheduler; submit() returns a Future of the generate() result.
+
+    Worker threads pick the next job only once a rate token is available, so
+    the highest-priority job at that moment wins (queued bulk work is
+    preempted by later interactive requests).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, concurrency=DEFAULT_CONCURRENCY,
+                 generate=generate_image):
+        self.generate = generate
+        self.bucket = TokenBucket(rate, max(burst, INTERACTIVE_RESERVE + 1))
+        self.queues = {lane: deque() for lane in LANES}
+        self.stats = {lane: {"submitted": 0, "done": 0, "wait_s": 0.0} for lane in LANES}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [threading.Thread(target=self._worker, args=(LANES,), daemon=True,
+                                          name=f"scheduler-{i}") for i in range(max(1, concurrency))]
+        # Dedicated interactive worker: a UI request never waits behind in-flight bulk calls
+        self._workers.append(threading.Thread(target=self._worker, args=((INTERACTIVE,),), daemon=True,
+                                              name="scheduler-interactive"))
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, prompt_text, output_filename, lane=BULK, **kwargs):
+        """Queue one generate_image() call in a lane; returns a Future of its result"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            if kwargs.get("hedge"):
+                # A hedge is a second upstream request; it must come out of the same rate budget
+                kwargs["hedge_permit"] = lambda: self.try_take_token(lane)
+            self.queues[lane].append((future, time.monotonic(), (prompt_text, output_filename), kwargs))
+            self.stats[lane]["submitted"] += 1
+            self._cond.notify_all()
+        return future
+
+    def generate_now(self, prompt_text, output_filename, lane=INTERACTIVE, **kwargs):
+        """Submit and wait; drop-in for generate_image()"""
+        return self.submit(prompt_text, output_filename, lane=lane, **kwargs).result()
+
+    def try_take_token(self, lane=BULK):
+        """Take a rate token for extra work in a lane (e.g. a hedge) without waiting; False if none"""
+        with self._cond:
+            if lane == BULK and self.queues[INTERACTIVE]:
+                return False
+            return self.bucket.try_take(0 if lane == INTERACTIVE else INTERACTIVE_RESERVE)
+
+    def pending(self):
+        with self._cond:
+            return {lane: len(queue) for lane, queue in self.queues.items()}
+
+    def _next(self, lanes):
+        """Pop the next runnable job for a worker serving `lanes`, or return seconds to wait"""
+        for lane in LANES:
+            if lane not in lanes or not self.queues[lane]:
+                continue
+            if lane == BULK and self.queues[INTERACTIVE]:
+                return None  # interactive work is waiting; bulk yields
+            reserve = 0 if lane == INTERACTIVE else INTERACTIVE_RESERVE
+            if self.bucket.try_take(reserve):
+                return lane, self.queues[lane].popleft()
+            return self.bucket.wait_time(reserve)
+        return None
+
+    def _worker(self, lanes):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    job = self._next(lanes)
+                    if isinstance(job, tuple):
+                        self._cond.notify_all()  # the queues changed; let other workers re-check
+                        break
+                    self._cond.wait(timeout=job)
+            lane, (future, queued_at, args, kwargs) = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._cond:
+                self.stats[lane]["wait_s"] += time.monotonic() - queued_at
+            try:
+                future.set_result(self.generate(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self.stats[lane]["done"] += 1
+                    self._cond.notify_all()  # a token may be free for a waiting worker
+
+    def close(self):
+        """Stop the workers; queued jobs are cancelled"""
+        with self._cond:
+            self._closed = True
+            for queue in self.queues.values():
+                while queue:
+                    queue.popleft()[0].cancel()
+            self._cond.notify_all()
+
+
+def scheduler_from_env(generate=generate_image):
+    """Scheduler configured from SCHEDULER_* environment variables"""
+    return Scheduler(
+        rate=float(os.getenv("SCHEDULER_RATE", DEFAULT_RATE)),
+        burst=int(os.getenv("SCHEDULER_BURST", DEFAULT_BURST)),
+        concurrency=int(os.getenv("SCHEDULER_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        generate=generate,
+    )
+
+
+def socket_path():
+    return os.getenv("SCHEDULER_SOCKET", DEFAULT_SOCKET)
+
+
+# ----------------------
+# Local socket access
+# ----------------------
+# Protocol: one JSON object per line in each direction.
+#   -> {"prompt": str, "name": str, "seed": int?}
+#   <- {"images": [file names]} or {"error": str}
+# API keys are never sent over the socket; the serving process uses its own.
+# The socket is owner-only (0600), socket work always runs in the bulk lane
+# whatever the client asks for, and names must be bare file stems.
+
+def _parse_request(line):
+    """(prompt, name, kwargs) from one socket request line; ValueError if invalid"""
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    prompt, name, seed = request.get("prompt"), request.get("name"), request.get("seed")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError("prompt must be a non-empty string")
+    if not isinstance(name, str) or not NAME_PATTERN.match(name) or ".." in name:
+        raise ValueError(f"name must be a bare file stem: {name!r}")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError("seed must be an integer")
+    return prompt, name, {"seed": seed} if seed is not None else {}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                prompt, name, kwargs = _parse_request(line)
+                future = self.server.scheduler.submit(prompt, name, lane=BULK, **kwargs)
+                reply = {"images": future.result() or []}
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _SocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(scheduler, path=None):
+    """Expose a scheduler on a local Unix socket in a background thread; returns the server"""
+    path = path or socket_path()
+    if os.path.exists(path):
+        if SchedulerClient.available(path):
+            raise RuntimeError(f"Another scheduler is already listening on {path}")
+        os.unlink(path)  # stale socket from a previous run
+    server = _SocketServer(path, _RequestHandler, bind_and_activate=False)
+    try:
+        server.server_bind()
+        os.chmod(path, 0o600)  # before listen(), so no other user can ever connect
+        server.server_activate()
+    except Exception:
+        server.server_close()
+        raise
+    server.scheduler = scheduler
+    threading.Thread(target=server.serve_forever, daemon=True, name="scheduler-socket").start()
+    return server
+
+
+class SchedulerClient:
+    """Submit work to a scheduler in another process; one connection per client"""
+
+    def __init__(self, path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path or socket_path())
+        self.file = self.sock.makefile("rwb")
+
+    @staticmethod
+    def available(path=None):
+        """True if a scheduler is listening on the socket"""
+        path = path or socket_path()
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+            return True
+        except OSError:
+            return False
+
+    def generate(self, prompt_text, output_filename, seed=None):
+        """Same contract as generate_image(): saved file names, empty on failure (always the bulk lane)"""
+        request = {"prompt": prompt_text, "name": output_filename, "seed": seed}
+        self.file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.file.flush()
+        reply = json.loads(self.file.readline() or b"{}")
+        if "error" in reply:
+            print(f"✗ Scheduler error for {output_filename}: {reply['error']}")
+        return reply.get("images", [])
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class BulkGenerator:
+    """
+    Drop-in for generate_image() that runs every call in the bulk lane.
+
+    Calls go to the server's scheduler when one is listening on the local
+    socket (one connection per calling thread), so batch tools share the
+    rate budget with the web UI and yield to it; otherwise an in-process
+    scheduler applies the same budget. Extra keyword arguments (api_key,
+    hedge) only apply in-process; the server uses its own. Close when done,
+    or use as a context manager.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self._local, self._clients, self._lock = threading.local(), [], threading.Lock()
+        if SchedulerClient.available():
+            print(f"Submitting to the server's scheduler at {socket_path()} (bulk lane)")
+        else:
+            self.scheduler = scheduler_from_env()
+
+    def __call__(self, prompt_text, output_filename, seed=None, **kwargs):
+        if self.scheduler is not None:
+            if seed is not None:
+                kwargs["seed"] = seed
+            return self.scheduler.submit(prompt_text, output_filename, lane=BULK, **kwargs).result()
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = SchedulerClient()
+            with self._lock:
+                self._clients.append(client)
+        return client.generate(prompt_text, output_filename, seed=seed)
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_bulk(jobs, **kwargs):
+    """
+    Run (prompt text, output name) jobs in the bulk lane and return their results in order.
+
+    See BulkGenerator: jobs share the server's rate budget when it is
+    running. kwargs (e.g. hedge) only apply in-process.
+    """
+    with BulkGenerator() as generate:
+        if generate.scheduler is not None:
+            futures = [generate.scheduler.submit(*job, lane=BULK, **kwargs) for job in jobs]
+            return [future.result() for future in futures]
+        with ThreadPoolExecutor(max_workers=DEFAULT_CONCURRENCY) as pool:
+            return list(pool.map(lambda job: generate(*job), jobs))
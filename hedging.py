@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Hedged requests for upstream image generation.
+
+A hedged call starts the primary request and, if it has not finished after
+the policy's delay (a percentile of recently observed latencies), starts a
+second request - to the same model or a configured fallback model. The first
+successful reply wins and the other attempt is cancelled. Hedges are capped
+at a fraction of recent calls, so the tail gets shorter without doubling cost.
+The cap also means no call is hedged until 1 / max_fraction calls have been
+made (the first 20 at the default 5%). A hedge is an extra upstream request,
+so callers running under the generation scheduler pass a `permit` that takes
+a token from its rate budget; without a token the call is not hedged.
+
+Configuration (environment, read by policy_from_env()):
+    HEDGE_PERCENTILE     latency percentile used as the hedge delay (default 95)
+    HEDGE_MAX_FRACTION   max share of calls that may be hedged (default 0.05; 0 disables)
+    HEDGE_DELAY          delay in seconds until enough latencies are observed (default 12)
+    HEDGE_FALLBACK_MODEL model for the hedge request (default: the primary model)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from telemetry import percentile
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_MAX_FRACTION = 0.05
+DEFAULT_DELAY = 12.0  # seconds; used until MIN_SAMPLES latencies are known
+MIN_SAMPLES = 20
+WINDOW = 500  # recent calls considered for the delay and the hedge cap
+
+
+class HedgeCancelled(Exception):
+    """Raised inside an attempt that lost the race and was cancelled"""
+
+
+class HedgePolicy:
+    """
+    When to hedge and how often.
+
+    Latencies of completed attempts feed a rolling window; the hedge delay is
+    the configured percentile of that window. At most max_fraction of the last
+    WINDOW calls may be hedged.
+    """
+
+    def __init__(self, percentile=DEFAULT_PERCENTILE, max_fraction=DEFAULT_MAX_FRACTION,
+                 default_delay=DEFAULT_DELAY, fallback_model=None, history=(), window=WINDOW):
+        """
+        Args:
+            history: Recent attempt latencies in seconds (e.g. from the telemetry ledger)
+        """
+        self.percentile = percentile
+        self.max_fraction = max_fraction
+        self.default_delay = default_delay
+        self.fallback_model = fallback_model
+        self.window = window
+        self._latencies = deque(history, maxlen=window)
+        self._calls = 0
+        self._hedges = deque()  # call numbers of recent hedged calls
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record the latency of a completed attempt"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self):
+        """Seconds to wait on the primary attempt before hedging"""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.default_delay
+            return percentile(sorted(self._latencies), self.percentile)
+
+    def begin(self):
+        """Count a new call"""
+        with self._lock:
+            self._calls += 1
+
+    def try_hedge(self, permit=None):
+        """
+        Claim a hedge if the cap allows one more among the last `window` calls.
+
+        permit() is only asked once the cap allows a hedge (e.g. to take a rate
+        token); when it returns False the call is not hedged.
+        """
+        with self._lock:
+            while self._hedges and self._hedges[0] <= self._calls - self.window:
+                self._hedges.popleft()
+            if len(self._hedges) + 1 > self.max_fraction * min(self._calls, self.window):
+                return False
+            if permit is not None and not permit():
+                return False
+            self._hedges.append(self._calls)
+            return True
+
+
+def policy_from_env(history=()):
+    """HedgePolicy configured from HEDGE_* environment variables; None when disabled"""
+    max_fraction = float(os.getenv("HEDGE_MAX_FRACTION", DEFAULT_MAX_FRACTION))
+    if max_fraction <= 0:
+        return None
+    return HedgePolicy(
+        percentile=float(os.getenv("HEDGE_PERCENTILE", DEFAULT_PERCENTILE)),
+        max_fraction=max_fraction,
+        default_delay=float(os.getenv("HEDGE_DELAY", DEFAULT_DELAY)),
+        fallback_model=os.getenv("HEDGE_FALLBACK_MODEL") or None,
+        history=history,
+    )
+
+
+def run_hedged(primary, hedge, policy, permit=None, report=None):
+    """
+    Run primary(cancel_event), hedging with hedge(cancel_event) after the policy delay.
+
+    permit: Optional callable asked before the hedge is sent (see HedgePolicy.try_hedge)
+    report: Optional callable report(label, outcome, seconds, error), called once per
+            attempt as it settles; outcome is "ok", "error" or "cancelled" (lost the race)
+
+    Attempts should check their cancel event while reading the response and
+    raise HedgeCancelled once it is set. The loser is cancelled and not waited for.
+
+    Returns:
+        tuple: (result, "primary" | "hedge", hedged: bool)
+    Raises:
+        The last attempt's exception when no attempt succeeds
+    """
+    policy.begin()
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+    attempts = {}  # future -> (label, cancel event, start time)
+    report = report or (lambda label, outcome, seconds, error: None)
+
+    def launch(label, fn):
+        cancel = threading.Event()
+        attempts[pool.submit(fn, cancel)] = (label, cancel, time.perf_counter())
+
+    try:
+        launch("primary", primary)
+        done, _ = wait(attempts, timeout=policy.delay())
+        if not done and policy.try_hedge(permit):
+            launch("hedge", hedge)
+
+        pending, settled, error = set(attempts), set(), None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                label, _, started = attempts[future]
+                settled.add(future)
+                try:
+                    result = future.result()
+                except Exception as e:  # the other attempt may still succeed
+                    error = e
+                    report(label, "error", time.perf_counter() - started, e)
+                    continue
+                now = time.perf_counter()
+                policy.observe(now - started)
+                report(label, "ok", now - started, None)
+                for other in set(attempts) - settled:
+                    other_label, cancel, other_started = attempts[other]
+                    cancel.set()
+                    report(other_label, "cancelled", now - other_started, None)
+                    if other_label == "primary":
+                        # A lower bound, but keeps slow primaries in the tail the delay is based on
+                        policy.observe(now - other_started)
+                return result, label, len(attempts) > 1
+        raise error
+    finally:
+        pool.shutdown(wait=False)
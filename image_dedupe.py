@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash duplicate detection for the generated image library.
+
+Computes 64-bit DCT perceptual hashes (pHash) in vectorized batches, keeps
+them in a persistent per-directory index (only new or changed files are
+re-hashed), and finds near-duplicates by Hamming distance using multi-index
+hashing, so grouping does not compare every pair. Used as a CLI
+report and by the dossier and deck builders' --skip-duplicates option.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    if __name__ != "__main__":
+        raise
+    print("ERROR: numpy and Pillow are required")
+    print("Install with: pip install numpy Pillow")
+    sys.exit(1)
+
+IMAGES_DIR = Path("generated-images")
+INDEX_NAME = ".phash-index.json"
+INDEX_VERSION = 1
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# Hamming distance (out of 64 bits) at or below which two images count as near-duplicates
+DEFAULT_THRESHOLD = 8
+BATCH_SIZE = 256
+
+SAMPLE = 32  # images are reduced to SAMPLE x SAMPLE greyscale before the DCT
+HASH_SIZE = 8  # top-left HASH_SIZE x HASH_SIZE DCT coefficients -> 64 bits
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an n x n matrix"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+_DCT = _dct_matrix(SAMPLE)
+
+
+def _popcount(values):
+    """Per-element count of set bits in a uint64 array"""
+    if hasattr(np, "bitwise_count"):  # NumPy 2
+        return np.bitwise_count(values)
+    # SWAR bit count, a handful of vectorized ops (uint64 arithmetic wraps as intended)
+    v = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    v = (v & np.uint64(0x3333333333333333)) + ((v >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    v = (v + (v >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((v * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.uint8)
+
+
+def _load_sample(path):
+    """Decode an image straight to the small greyscale sample used for hashing (None if unreadable)"""
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (SAMPLE * 4, SAMPLE * 4))  # JPEG sources decode at reduced scale
+            small = img.convert("L").resize((SAMPLE, SAMPLE), Image.LANCZOS)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping unreadable image {path}: {e}")
+        return None
+    return np.asarray(small, dtype=np.float32)
+
+
+def phash_batch(paths, jobs=None):
+    """
+    Perceptual hashes for a batch of image files.
+
+    Decoding runs in a thread pool; the DCT, median threshold and bit packing
+    run once over the whole (batch, 32, 32) stack.
+
+    Returns:
+        list: int hash per path, None for files that could not be decoded
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        samples = list(pool.map(_load_sample, paths))
+    decoded = [i for i, sample in enumerate(samples) if sample is not None]
+    results = [None] * len(paths)
+    if not decoded:
+        return results
+    stack = np.stack([samples[i] for i in decoded])
+    coeffs = _DCT @ stack @ _DCT.T
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(len(decoded), -1)
+    # Median of the AC coefficients; the DC term only reflects overall brightness
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    for i, value in zip(decoded, np.packbits(bits, axis=1).view(">u8").ravel()):
+        results[i] = int(value)
+    return results
+
+
+def find_images(images_dir):
+    """Sorted image files directly inside images_dir (hidden files excluded)"""
+    return sorted(
+        p for p in Path(images_dir).iterdir()
+        if p.is_file() and not p.name.startswith(".") and p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+class PhashIndex:
+    """
+    Persistent perceptual-hash index for one image directory.
+
+    Stored as <dir>/.phash-index.json; entries are reused while a file's size
+    and mtime are unchanged, so refreshing a large library only hashes new or
+    edited images.
+    """
+
+    def __init__(self, images_dir=IMAGES_DIR):
+        self.images_dir = Path(images_dir)
+        self.path = self.images_dir / INDEX_NAME
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("images", {})
+        except (OSError, ValueError):
+            pass
+
+    def refresh(self, paths=None, jobs=None):
+        """Hash new/changed files (all images in the directory by default); returns count hashed"""
+        paths = find_images(self.images_dir) if paths is None else [Path(p) for p in paths]
+        live = {p.name for p in paths}
+        stale = []
+        for path in paths:
+            st = path.stat()
+            entry = self.entries.get(path.name)
+            if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                stale.append((path, st))
+
+        for start in range(0, len(stale), BATCH_SIZE):
+            batch = stale[start:start + BATCH_SIZE]
+            hashes = phash_batch([p for p, _ in batch], jobs=jobs)
+            for (path, st), value in zip(batch, hashes):
+                if value is None:  # undecodable; left out of the index (and retried next refresh)
+                    self.entries.pop(path.name, None)
+                    continue
+                self.entries[path.name] = {"hash": f"{value:016x}", "size": st.st_size,
+                                           "mtime_ns": st.st_mtime_ns}
+
+        removed = [name for name in self.entries if name not in live and
+                   not (self.images_dir / name).exists()]
+        for name in removed:
+            del self.entries[name]
+
+        if stale or removed:
+            self.save()
+        return len(stale)
+
+    def save(self):
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "images": self.entries}, f)
+        os.replace(tmp, self.path)
+
+    def arrays(self, names=None):
+        """(names, uint64 hashes) for the given names (default: every indexed image)"""
+        names = sorted(self.entries) if names is None else [n for n in names if n in self.entries]
+        hashes = np.array([int(self.entries[n]["hash"], 16) for n in names], dtype=np.uint64)
+        return names, hashes
+
+    def query(self, value, threshold=DEFAULT_THRESHOLD):
+        """[(name, distance)] of indexed images within threshold of a hash, nearest first"""
+        names, hashes = self.arrays()
+        distances = _popcount(hashes ^ np.uint64(value))
+        hits = np.nonzero(distances <= threshold)[0]
+        return sorted(((names[i], int(distances[i])) for i in hits), key=lambda hit: hit[1])
+
+
+def _bands(threshold):
+    """(shift, mask) of threshold + 1 disjoint bit bands covering the 64-bit hash"""
+    count = threshold + 1
+    bands, shift = [], 0
+    for b in range(count):
+        width = 64 // count + (1 if b < 64 % count else 0)
+        bands.append((np.uint64(shift), np.uint64((1 << width) - 1)))
+        shift += width
+    return bands
+
+
+def similar_pairs(hashes, threshold=DEFAULT_THRESHOLD):
+    """
+    (i, j) index pairs, i < j, of hashes within threshold bits of each other.
+
+    Multi-index hashing: the hash is split into threshold + 1 disjoint bands,
+    so by pigeonhole any two hashes within threshold bits agree exactly on at
+    least one band. Per band, hashes are sorted by band value and only those
+    in the same bucket are compared (XOR + popcount), so the work grows with
+    the number of candidate pairs rather than with N².
+
+    Returns:
+        tuple: (i, j) int arrays
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    n = len(hashes)
+    if n < 2 or threshold < 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if threshold >= 64:
+        i, j = np.triu_indices(n, k=1)
+        return i.astype(np.int64), j.astype(np.int64)
+
+    found_i, found_j = [], []
+    for shift, mask in _bands(threshold):
+        keys = (hashes >> shift) & mask
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # Positions k whose bucket extends to k + d; shrinks as d grows (keys are sorted)
+        active = np.nonzero(sorted_keys[:-1] == sorted_keys[1:])[0]
+        d = 1
+        while active.size:
+            a, b = order[active], order[active + d]
+            hit = _popcount(hashes[a] ^ hashes[b]) <= threshold
+            found_i.append(np.minimum(a[hit], b[hit]))
+            found_j.append(np.maximum(a[hit], b[hit]))
+            d += 1
+            active = active[active + d < n]
+            active = active[sorted_keys[active + d] == sorted_keys[active]]
+
+    if not found_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # A pair agreeing on several bands is found once per band
+    pairs = np.unique(np.concatenate(found_i).astype(np.int64) * n + np.concatenate(found_j))
+    return pairs // n, pairs % n
+
+
+def duplicate_groups(names, hashes, threshold=DEFAULT_THRESHOLD):
+    """
+    Group near-duplicate images.
+
+    Pairs within threshold come from similar_pairs() (multi-index hashing)
+    and are linked with union-find.
+
+    Returns:
+        list[list[str]]: Groups of two or more names, each sorted canonical-first
+    """
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*similar_pairs(hashes, threshold)):
+        a, b = find(int(i)), find(int(j))
+        if a != b:
+            parent[b] = a
+
+    groups = {}
+    for i, name in enumerate(names):
+        groups.setdefault(find(i), []).append(name)
+    return [sorted(g, key=canonical_key) for g in groups.values() if len(g) > 1]
+
+
+def canonical_key(name):
+    """Sort key preferring originals over _1/_2 reruns, then shorter and alphabetical names"""
+    stem = Path(name).stem
+    rerun = 1 if re.search(r"_\d+$", stem) and not re.match(r"^\d+$", stem) else 0
+    return (rerun, len(stem), name)
+
+
+def find_duplicates(paths, threshold=DEFAULT_THRESHOLD):
+    """
+    Paths among `paths` that near-duplicate another path in the list.
+
+    The first path of each group in the given order is kept; later ones are
+    returned for skipping. Hashes come from each directory's persistent index.
+    """
+    paths = [Path(p) for p in paths if os.path.exists(p)]
+    by_dir = {}
+    for path in paths:
+        by_dir.setdefault(path.parent, []).append(path)
+
+    names, values = [], []
+    for directory, dir_paths in by_dir.items():
+        index = PhashIndex(directory)
+        index.refresh(dir_paths)
+        for path in dir_paths:
+            if path.name not in index.entries:
+                continue
+            names.append(str(path))
+            values.append(int(index.entries[path.name]["hash"], 16))
+
+    order = {str(p): i for i, p in enumerate(paths)}
+    skip = set()
+    for group in duplicate_groups(names, np.array(values, dtype=np.uint64), threshold):
+        group.sort(key=order.get)
+        skip.update(group[1:])
+    return skip
+
+
+def main(argv=None):
+    """Command-line entry point: report near-duplicate groups"""
+    parser = argparse.ArgumentParser(description="Report near-duplicate generated images")
+    parser.add_argument("images_dir", nargs="?", default=str(IMAGES_DIR), help="Image directory to index")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help="Max Hamming distance (0-64) to count as a duplicate")
+    parser.add_argument("--json", action="store_true", help="Print the groups as JSON")
+    parser.add_argument("--jobs", type=int, default=None, help="Decode threads")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.images_dir):
+        print(f"ERROR: Images directory not found: {args.images_dir}")
+        return 1
+
+    index = PhashIndex(args.images_dir)
+    hashed = index.refresh(jobs=args.jobs)
+    names, hashes = index.arrays()
+    groups = duplicate_groups(names, hashes, args.threshold)
+
+    if args.json:
+        print(json.dumps({"images": len(names), "threshold": args.threshold, "groups": groups}, indent=2))
+        return 0
+
+    print(f"🖼️  {len(names)} images indexed ({hashed} hashed this run)")
+    if not groups:
+        print(f"✓ No near-duplicates within {args.threshold} bits")
+        return 0
+    print(f"⚠️  {len(groups)} near-duplicate group(s) within {args.threshold} bits:")
+    for group in groups:
+        print(f"  keep {group[0]}")
+        for name in group[1:]:
+            print(f"    dup {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Dominant palette, luminance and contrast of the generated image library.
+
+Images are decoded straight to a small RGB sample and analyzed in vectorized
+batches: every pixel is quantized to an 8x8x8 colour cube, per-image bin
+counts and colour sums come from a single bincount over the whole batch, and
+luminance is WCAG relative luminance via a lookup table. Results are kept in
+a persistent per-directory index keyed by content hash, so renamed or copied
+images are not re-analyzed and only new or edited files are decoded.
+
+The deck builder uses this for "auto_colors" (see create_pitch_deck.py):
+slides with images get a background drawn from their images' palette, and
+text colours are adjusted to stay readable on it.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    if __name__ != "__main__":
+        raise
+    print("ERROR: numpy and Pillow are required")
+    print("Install with: pip install numpy Pillow")
+    sys.exit(1)
+
+from image_dedupe import find_images
+
+IMAGES_DIR = Path("generated-images")
+INDEX_NAME = ".palette-index.json"
+INDEX_VERSION = 1
+BATCH_SIZE = 256
+
+SAMPLE = 64  # images are reduced to SAMPLE x SAMPLE RGB before quantizing
+LEVELS = 8  # quantization levels per channel -> LEVELS**3 colour bins
+PALETTE_SIZE = 5
+MIN_CONTRAST = 3.0  # WCAG contrast ratio for large text
+
+_BINS = LEVELS ** 3
+_SHIFT = 8 - (LEVELS - 1).bit_length()
+_LUMA = np.array([0.2126, 0.7152, 0.0722])
+
+
+def _linear_table():
+    """sRGB 0-255 -> linear light, as a 256-entry lookup table"""
+    c = np.arange(256) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+_LINEAR = _linear_table()
+
+
+def relative_luminance(rgb):
+    """WCAG relative luminance (0-1) of an [r, g, b] colour"""
+    return float(_LINEAR[np.asarray(rgb, dtype=np.uint8)] @ _LUMA)
+
+
+def contrast_ratio(a, b):
+    """WCAG contrast ratio (1-21) between two [r, g, b] colours"""
+    la, lb = sorted((relative_luminance(a), relative_luminance(b)), reverse=True)
+    return (la + 0.05) / (lb + 0.05)
+
+
+def _load_sample(path):
+    """Decode an image straight to the small RGB sample used for analysis (None if unreadable)"""
+    try:
+        with Image.open(path) as img:
+            img.draft("RGB", (SAMPLE * 4, SAMPLE * 4))  # JPEG sources decode at reduced scale
+            small = img.convert("RGB").resize((SAMPLE, SAMPLE), Image.BILINEAR)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping unreadable image {path}: {e}")
+        return None
+    return np.asarray(small, dtype=np.uint8)
+
+
+def analyze_batch(paths, jobs=None):
+    """
+    Palette, mean luminance and contrast for a batch of image files.
+
+    Decoding runs in a thread pool; quantization, histograms and luminance run
+    once over the whole (batch, pixels, 3) stack.
+
+    Returns:
+        list: Per path, {"palette": [{"rgb", "share"}], "luminance", "contrast"}, or None
+              for files that could not be decoded; luminance is the mean relative
+              luminance and contrast its RMS spread
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        samples = list(pool.map(_load_sample, paths))
+    decoded = [i for i, sample in enumerate(samples) if sample is not None]
+    results = [None] * len(paths)
+    if not decoded:
+        return results
+    pixels = np.stack([samples[i] for i in decoded]).reshape(len(decoded), -1, 3)
+    n, count = pixels.shape[:2]
+
+    q = (pixels >> _SHIFT).astype(np.int64)
+    codes = (q[..., 0] * LEVELS + q[..., 1]) * LEVELS + q[..., 2]
+    flat = (codes + np.arange(n)[:, None] * _BINS).ravel()
+    counts = np.bincount(flat, minlength=n * _BINS).reshape(n, _BINS)
+    sums = np.stack([np.bincount(flat, weights=pixels[..., c].ravel(), minlength=n * _BINS)
+                     for c in range(3)], axis=-1).reshape(n, _BINS, 3)
+
+    top = np.argsort(-counts, axis=1, kind="stable")[:, :PALETTE_SIZE]
+    top_counts = np.take_along_axis(counts, top, axis=1)
+    colors = np.take_along_axis(sums, top[..., None], axis=1) / np.maximum(top_counts, 1)[..., None]
+    shares = top_counts / count
+
+    luma = _LINEAR[pixels] @ _LUMA
+    for i, position in enumerate(decoded):
+        palette = [{"rgb": [int(round(v)) for v in colors[i, j]], "share": round(float(shares[i, j]), 4)}
+                   for j in range(PALETTE_SIZE) if top_counts[i, j]]
+        results[position] = {"palette": palette, "luminance": round(float(luma[i].mean()), 4),
+                             "contrast": round(float(luma[i].std()), 4)}
+    return results
+
+
+def _digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PaletteIndex:
+    """
+    Persistent palette index for one image directory.
+
+    Stored as <dir>/.palette-index.json. Analyses are keyed by content hash;
+    a file's hash is reused while its size and mtime are unchanged, so
+    refreshing a large library only reads new or edited images.
+    """
+
+    def __init__(self, images_dir=IMAGES_DIR):
+        self.images_dir = Path(images_dir)
+        self.path = self.images_dir / INDEX_NAME
+        self.files = {}  # name -> {"size", "mtime_ns", "sha256"}
+        self.analyses = {}  # sha256 -> analysis
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.files = data.get("files", {})
+                self.analyses = data.get("analyses", {})
+        except (OSError, ValueError):
+            pass
+
+    def refresh(self, paths=None, jobs=None):
+        """Analyze new/changed files (all images in the directory by default); returns count analyzed"""
+        paths = find_images(self.images_dir) if paths is None else [Path(p) for p in paths]
+        changed = False
+        for path in paths:
+            st = path.stat()
+            entry = self.files.get(path.name)
+            if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                self.files[path.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _digest(path)}
+                changed = True
+
+        todo = {}  # sha256 -> a path with that content
+        for path in paths:
+            digest = self.files[path.name]["sha256"]
+            if digest not in self.analyses:
+                todo.setdefault(digest, path)
+        todo = list(todo.items())
+        for start in range(0, len(todo), BATCH_SIZE):
+            batch = todo[start:start + BATCH_SIZE]
+            for (digest, _), analysis in zip(batch, analyze_batch([p for _, p in batch], jobs=jobs)):
+                if analysis is not None:  # undecodable; left out of analyses (and retried next refresh)
+                    self.analyses[digest] = analysis
+
+        removed = [name for name in self.files if not (self.images_dir / name).exists()]
+        for name in removed:
+            del self.files[name]
+        live = {entry["sha256"] for entry in self.files.values()}
+        orphaned = [digest for digest in self.analyses if digest not in live]
+        for digest in orphaned:
+            del self.analyses[digest]
+
+        if changed or todo or removed or orphaned:
+            self.save()
+        return len(todo)
+
+    def save(self):
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files, "analyses": self.analyses}, f)
+        os.replace(tmp, self.path)
+
+    def get(self, name):
+        entry = self.files.get(name)
+        return self.analyses.get(entry["sha256"]) if entry else None
+
+
+def analyze_paths(paths, jobs=None):
+    """{path: analysis} for the existing image files among paths, via each directory's index"""
+    by_dir = {}
+    for path in dict.fromkeys(Path(p) for p in paths if os.path.isfile(p)):
+        by_dir.setdefault(path.parent, []).append(path)
+
+    results = {}
+    for directory, dir_paths in by_dir.items():
+        index = PaletteIndex(directory)
+        index.refresh(dir_paths, jobs=jobs)
+        for path in dir_paths:
+            results[str(path)] = index.get(path.name)
+    return results
+
+
+def _mix(rgb, target, amount):
+    return [int(round(c + (t - c) * amount)) for c, t in zip(rgb, target)]
+
+
+def readable(rgb, background, min_contrast=MIN_CONTRAST):
+    """rgb, lightened or darkened (keeping its hue) until it reaches min_contrast on background"""
+    target = (255, 255, 255) if relative_luminance(background) < 0.18 else (0, 0, 0)
+    for step in range(11):
+        candidate = _mix(rgb, target, step / 10)
+        if contrast_ratio(candidate, background) >= min_contrast:
+            return candidate
+    return list(target)
+
+
+def slide_colors(analyses, theme_colors, min_contrast=MIN_CONTRAST):
+    """
+    Background and text colours for a slide showing images with these analyses.
+
+    The background is the images' dominant colour (weighted across images),
+    pushed dark for dark artwork and light for bright artwork. Theme colours
+    that would be hard to read on it are adjusted toward white or black.
+
+    Returns:
+        tuple: (background [r, g, b], {theme token: [r, g, b]}, text token with the
+                highest contrast) or None when there is nothing to go on
+    """
+    analyses = [a for a in analyses if a and a["palette"]]
+    if not analyses:
+        return None
+    weights = {}
+    for analysis in analyses:
+        for entry in analysis["palette"]:
+            key = tuple(entry["rgb"])
+            weights[key] = weights.get(key, 0.0) + entry["share"]
+    dominant = max(weights, key=weights.get)
+    luminance = sum(a["luminance"] for a in analyses) / len(analyses)
+    background = _mix(dominant, (0, 0, 0), 0.75) if luminance < 0.4 else _mix(dominant, (255, 255, 255), 0.8)
+
+    colors = {name: readable(rgb, background, min_contrast) for name, rgb in theme_colors.items()}
+    text = max(colors, key=lambda name: contrast_ratio(colors[name], background)) if colors else None
+    return background, colors, text
+
+
+def _hex(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+def main(argv=None):
+    """Command-line entry point: report each image's palette, luminance and contrast"""
+    parser = argparse.ArgumentParser(description="Report dominant palettes of generated images")
+    parser.add_argument("images_dir", nargs="?", default=str(IMAGES_DIR), help="Image directory to analyze")
+    parser.add_argument("--json", action="store_true", help="Print the analyses as JSON")
+    parser.add_argument("--jobs", type=int, default=None, help="Decode threads")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.images_dir):
+        print(f"ERROR: Images directory not found: {args.images_dir}")
+        return 1
+
+    index = PaletteIndex(args.images_dir)
+    analyzed = index.refresh(jobs=args.jobs)
+    names = [name for name in sorted(index.files) if index.get(name)]
+
+    if args.json:
+        print(json.dumps({name: index.get(name) for name in names}, indent=2))
+        return 0
+
+    print(f"🎨 {len(names)} images ({analyzed} analyzed this run)")
+    for name in names:
+        analysis = index.get(name)
+        swatches = " ".join(f"{_hex(e['rgb'])} {e['share']:.0%}" for e in analysis["palette"])
+        print(f"  {name}: luminance {analysis['luminance']:.3f}, contrast {analysis['contrast']:.3f}  {swatches}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Read-through disk cache for externally hosted gallery images.
+
+server.py serves /mirror/<path> from here: the first request fetches
+<origin>/<path> and stores it under the cache directory; later requests are
+local disk reads, revalidated against the origin with ETag/Last-Modified
+once an entry is older than the revalidation interval. If the origin is
+unreachable, cached copies keep being served. Least recently used entries
+are evicted to stay within the size budget.
+
+Configuration (environment, read by cache_from_env()):
+    MIRROR_ORIGIN       origin base URL (default: the project's Supabase image bucket)
+    MIRROR_CACHE_DIR    cache directory (default .mirror-cache)
+    MIRROR_MAX_MB       size budget in MB (default 512)
+    MIRROR_REVALIDATE   seconds before a cached entry is revalidated (default 300)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+DEFAULT_ORIGIN = "https://xierykaufosmdkcxzfex.supabase.co/storage/v1/object/public/image-gen"
+DEFAULT_CACHE_DIR = Path(".mirror-cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_REVALIDATE = 300.0
+FETCH_TIMEOUT = 15
+
+
+class MirrorError(Exception):
+    """The origin could not provide a file and there is no cached copy"""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+class MirrorCache:
+    """
+    On-disk read-through cache for one origin.
+
+    Each entry is <digest>.bin (the body) plus <digest>.json (origin URL,
+    ETag, Last-Modified, content type, size, fetch time); the body's mtime
+    records the last access for LRU eviction.
+    """
+
+    def __init__(self, origin=DEFAULT_ORIGIN, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 revalidate_after=DEFAULT_REVALIDATE):
+        self.origin = origin.rstrip("/")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.session = requests.Session()
+        self.session.trust_env = False
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _paths(self, path):
+        key = hashlib.sha256(path.encode("utf-8")).hexdigest()
+        return key, self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+
+    def get(self, path):
+        """
+        Local file for an origin path, fetching or revalidating as needed.
+
+        Returns:
+            tuple: (Path to the cached body, metadata dict)
+        Raises:
+            MirrorError: origin failure (or 404) with nothing cached
+        """
+        path = path.lstrip("/")
+        if not path or ".." in Path(path).parts:
+            raise MirrorError("Invalid path", status=404)
+
+        key, body_path, meta_path = self._paths(path)
+        # One fetch per path at a time; concurrent requests wait and reuse its result
+        with self._lock_for(key):
+            meta = self._load_meta(meta_path) if body_path.exists() else None
+            if meta and time.time() - meta["fetched"] < self.revalidate_after:
+                self._touch(body_path)
+                return body_path, meta
+            meta = self._fetch(path, body_path, meta_path, meta)
+        self._evict(keep=body_path)
+        return body_path, meta
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, body_path):
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    def _fetch(self, path, body_path, meta_path, meta):
+        """Conditional GET against the origin; returns the (new or revalidated) metadata"""
+        url = f"{self.origin}/{path}"
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True)
+        except requests.RequestException as e:
+            if meta:
+                # Origin outage: keep serving the cached copy
+                self._touch(body_path)
+                return dict(meta, stale=True)
+            raise MirrorError(f"Origin unreachable: {e}")
+
+        with response:
+            if response.status_code == 304 and meta:
+                meta = dict(meta, fetched=time.time())
+                meta.pop("stale", None)
+                self._write_meta(meta_path, meta)
+                self._touch(body_path)
+                return meta
+            if response.status_code != 200:
+                if meta and response.status_code >= 500:
+                    self._touch(body_path)
+                    return dict(meta, stale=True)
+                raise MirrorError(f"Origin returned {response.status_code} for {path}",
+                                  status=404 if response.status_code == 404 else 502)
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = body_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            size = 0
+            try:
+                with open(tmp, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+                        size += len(chunk)
+                os.replace(tmp, body_path)
+            except (OSError, requests.RequestException) as e:
+                if tmp.exists():
+                    tmp.unlink()
+                if meta:
+                    return dict(meta, stale=True)
+                raise MirrorError(f"Failed to fetch {path}: {e}")
+
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type", "application/octet-stream"),
+            "size": size,
+            "fetched": time.time(),
+        }
+        self._write_meta(meta_path, meta)
+        return meta
+
+    def _write_meta(self, meta_path, meta):
+        tmp = meta_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def usage(self):
+        """[(last access, size, body path)] for every cached entry"""
+        entries = []
+        for body_path in self.cache_dir.glob("*.bin"):
+            try:
+                st = body_path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, body_path))
+        return entries
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries (except `keep`) until the cache fits the size budget"""
+        with self._evict_lock:
+            entries = self.usage()
+            total = sum(size for _, size, _ in entries)
+            for _, size, body_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if body_path == keep:
+                    continue
+                with self._lock_for(body_path.stem):
+                    for stale in (body_path, body_path.with_suffix(".json")):
+                        try:
+                            stale.unlink()
+                        except OSError:
+                            pass
+                total -= size
+
+
+def cache_from_env():
+    """MirrorCache configured from MIRROR_* environment variables"""
+    return MirrorCache(
+        origin=os.getenv("MIRROR_ORIGIN", DEFAULT_ORIGIN),
+        cache_dir=os.getenv("MIRROR_CACHE_DIR", str(DEFAULT_CACHE_DIR)),
+        max_bytes=int(float(os.getenv("MIRROR_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+        revalidate_after=float(os.getenv("MIRROR_REVALIDATE", DEFAULT_REVALIDATE)),
+    )
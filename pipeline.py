@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Dependency-tracked release pipeline: prompts -> images -> dossier and deck.
+
+The release steps form a DAG:
+
+    generate ──┬── contact-sheet ── deck
+               └── dossier
+
+Every stage is keyed by a content hash of its inputs (prompt text, template
+or spec, the content of every image it embeds, options). A stage whose key is
+unchanged since its last successful run, and whose outputs still exist, is
+skipped; so a one-image change rebuilds only the stages that use that image,
+and a no-op run only re-checks hashes (file digests are cached by size and
+mtime between runs). Stages run as soon as their dependencies are done, so
+the dossier and deck build concurrently, each in its own worker process.
+"generate" regenerates only prompts whose text changed or whose image is
+missing, through the shared scheduler (generation_scheduler.py).
+
+The run ends with per-stage timings and the critical path. State is kept in
+.pipeline-state.json; documents are written to release/.
+
+Usage:
+    python3 pipeline.py                  # build whatever changed
+    python3 pipeline.py --no-generate    # build documents from the existing images only
+    python3 pipeline.py --force deck     # rebuild a stage even if its inputs are unchanged
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from generate_images import OUTPUT_DIR, PROMPTS_DIR
+
+STATE_FILE = Path(".pipeline-state.json")
+STATE_VERSION = 1
+RELEASE_DIR = Path("release")
+DOCUMENTS = {"dossier": "Blood_Assassin_Character_Dossier.docx", "deck": "Blood_Assassin_Pitch_Deck.pptx"}
+
+# stage -> stages it depends on (the deck's overview slide embeds the contact-sheet montage)
+STAGES = {
+    "generate": (),
+    "contact-sheet": ("generate",),
+    "dossier": ("generate",),
+    "deck": ("generate", "contact-sheet"),
+}
+
+
+class StageError(Exception):
+    """A stage could not produce its outputs"""
+
+
+def _build_document(kind, inputs, output):
+    """Worker-process entry: build a dossier or deck into output (atomically)"""
+    from artifact_builds import BUILDERS
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f".{output.stem}.{os.getpid()}.tmp{output.suffix}")
+    try:
+        BUILDERS[kind](inputs, str(tmp))
+        os.replace(tmp, output)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return str(output)
+
+
+def _build_contact_sheet():
+    """Worker-process entry: refresh the contact sheet (itself incremental per image)"""
+    from contact_sheet import build_contact_sheet
+
+    return build_contact_sheet()
+
+
+def _key(name, material):
+    from artifact_builds import BUILD_VERSION
+
+    payload = {"stage": name, "version": BUILD_VERSION, **material}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def prompt_outputs(stem, images_dir=OUTPUT_DIR):
+    """Generated images for a prompt (<stem>.png, or <stem>_1.png ... for multi-image replies)"""
+    images_dir = Path(images_dir)
+    return sorted(set(images_dir.glob(f"{stem}.*")) | set(images_dir.glob(f"{stem}_[0-9]*.*")))
+
+
+class Pipeline:
+    """One pipeline run; call run() once"""
+
+    def __init__(self, state_file=STATE_FILE, release_dir=RELEASE_DIR, generate=True, force=(), jobs=None):
+        from artifact_builds import seed_digests
+
+        self.state_file = Path(state_file)
+        self.release_dir = Path(release_dir)
+        self.generate = generate
+        self.force = set(force)
+        self.jobs = jobs
+        self.state = {"stages": {}, "prompts": {}, "digests": []}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.state.update(data)
+        except (OSError, ValueError):
+            pass
+        seed_digests(self.state["digests"])
+        self.results = {}  # stage -> {"status", "start", "end", "detail"}
+        self._lock = threading.Lock()
+        self._processes = None
+
+    # ----- stage plans: (key, outputs, work); work=None means nothing to do -----
+    def plan_generate(self):
+        from prompt_sweep import base_prompt
+
+        jobs, digests = [], {}
+        for path in sorted(PROMPTS_DIR.glob("*.txt")):
+            text = base_prompt(path.read_text(encoding="utf-8"))
+            if not text:
+                continue
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            recorded = self.state["prompts"].get(path.stem)
+            exists = bool(prompt_outputs(path.stem))
+            if exists and recorded is None:
+                recorded = self.state["prompts"][path.stem] = digest  # adopt images made before the pipeline
+            if {"generate", path.stem} & self.force or not exists or recorded != digest:
+                jobs.append((text, path.stem))
+            digests[path.stem] = digest
+
+        def work():
+            from generation_scheduler import run_bulk
+
+            results = run_bulk(jobs)
+            failed = [stem for (_, stem), images in zip(jobs, results) if not images]
+            with self._lock:
+                for _, stem in jobs:
+                    if stem not in failed:
+                        self.state["prompts"][stem] = digests[stem]
+            if failed:
+                raise StageError(f"no images for {', '.join(failed)}")
+            return f"{len(jobs)} prompt(s) regenerated"
+
+        # Tracked per prompt rather than by one stage key
+        return None, [], work if jobs else None
+
+    def plan_contact_sheet(self):
+        from artifact_builds import content_map
+        from contact_sheet import OUTPUT_DIR as SHEETS_DIR, find_images
+
+        material = {"contents": content_map(find_images(OUTPUT_DIR))}
+        outputs = [SHEETS_DIR / "montage.png", SHEETS_DIR / "sprite.png"]
+        return _key("contact-sheet", material), outputs, lambda: self._in_process(_build_contact_sheet)
+
+    def _plan_document(self, kind):
+        from artifact_builds import PLANS
+
+        inputs, contents = PLANS[kind]({})
+        output = self.release_dir / DOCUMENTS[kind]
+        return (_key(kind, {"inputs": inputs, "contents": contents}), [output],
+                lambda: self._in_process(_build_document, kind, inputs, str(output)))
+
+    def plan_dossier(self):
+        return self._plan_document("dossier")
+
+    def plan_deck(self):
+        return self._plan_document("deck")
+
+    def _in_process(self, fn, *args):
+        return self._processes.submit(fn, *args).result()
+
+    # ----- running -----
+    def _run_stage(self, name):
+        started = time.perf_counter()
+        status, detail = "built", ""
+        try:
+            if name == "generate" and not self.generate:
+                status, detail = "disabled", "--no-generate"
+            else:
+                key, outputs, work = getattr(self, "plan_" + name.replace("-", "_"))()
+                recorded = self.state["stages"].get(name, {}).get("key")
+                fresh = key is not None and key == recorded and all(Path(p).exists() for p in outputs)
+                if work is None or (fresh and name not in self.force):
+                    status = "skipped"
+                else:
+                    result = work()
+                    detail = result if isinstance(result, str) else ""
+                    with self._lock:
+                        if key:
+                            self.state["stages"][name] = {"key": key, "built": time.time()}
+                        self._save()
+        except Exception as e:
+            status, detail = "failed", str(e)
+        return status, detail, started, time.perf_counter()
+
+    def run(self):
+        """Run every stage once its dependencies are done; returns the per-stage results"""
+        self.started = time.perf_counter()
+        pending = dict(STAGES)
+        # Stage threads are running when workers start, so fork() could copy a held lock; spawn instead
+        with ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn")) as processes, \
+                ThreadPoolExecutor(max_workers=len(STAGES)) as threads:
+            self._processes = processes
+            running = {}
+            while pending or running:
+                for name, deps in list(pending.items()):
+                    states = [self.results.get(dep, {}).get("status") for dep in deps]
+                    if any(s in ("failed", "blocked") for s in states):
+                        now = time.perf_counter()
+                        self.results[name] = {"status": "blocked", "detail": "a dependency failed",
+                                              "start": now, "end": now}
+                        del pending[name]
+                    elif all(s is not None for s in states):
+                        running[threads.submit(self._run_stage, name)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status, detail, start, end = future.result()
+                    self.results[name] = {"status": status, "detail": detail, "start": start, "end": end}
+                    icon = {"built": "✅", "skipped": "✓", "disabled": "·", "failed": "✗"}[status]
+                    print(f"{icon} {name}: {status}" + (f" ({detail})" if detail else "")
+                          + f" in {end - start:.2f}s")
+        with self._lock:
+            self._save()
+        return self.results
+
+    def _save(self):
+        from artifact_builds import digest_cache
+
+        def current(entry):
+            try:
+                st = os.stat(entry[0])
+            except OSError:
+                return False
+            return (st.st_size, st.st_mtime_ns) == (entry[1], entry[2])
+
+        self.state["version"] = STATE_VERSION
+        self.state["digests"] = [e for e in digest_cache() if current(e)]
+        tmp = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_file)
+
+    # ----- reporting -----
+    def critical_path(self):
+        """Stages on the longest dependency chain, ending at the stage that finished last"""
+        if not self.results:
+            return []
+        path = [max(self.results, key=lambda name: self.results[name]["end"])]
+        while True:
+            deps = [dep for dep in STAGES[path[-1]] if dep in self.results]
+            if not deps:
+                return path[::-1]
+            path.append(max(deps, key=lambda dep: self.results[dep]["end"]))
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        print("\n⏱️  Stage timings")
+        for name in STAGES:
+            result = self.results[name]
+            print(f"  {name:<14} {result['status']:<9} {result['end'] - result['start']:7.2f}s")
+        path = self.critical_path()
+        serial = sum(r["end"] - r["start"] for r in self.results.values())
+        chain = " → ".join(f"{name} ({self.results[name]['end'] - self.results[name]['start']:.2f}s)"
+                           for name in path)
+        print(f"🧭 Critical path: {chain}")
+        print(f"   Wall time {wall:.2f}s (stages total {serial:.2f}s)")
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Build images, dossier and deck, skipping unchanged stages")
+    parser.add_argument("--no-generate", action="store_true",
+                        help="Do not call the image API; build documents from the existing images")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help=f"Rebuild a stage ({', '.join(STAGES)}) or regenerate a prompt (by name); repeatable")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for document builds")
+    parser.add_argument("--release-dir", default=str(RELEASE_DIR), help="Where the dossier and deck are written")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(release_dir=args.release_dir, generate=not args.no_generate, force=args.force,
+                        jobs=args.jobs)
+    results = pipeline.run()
+    pipeline.summary()
+    return 1 if any(r["status"] in ("failed", "blocked") for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Prompt Variant Sweep
+Expands templated prompt files into variant sets and generates them
+concurrently under a request/cost budget, breadth-first (every prompt's first
+variant before any prompt's second), skipping the remaining variants of a
+prompt once one of its images is accepted.
+
+Template format (plain prompt files are a single variant):
+    #seeds: 1, 2, 3                       optional: repeat every variant per seed
+    # any other line starting with # is a comment
+    Portrait of Elara, {oil painting|charcoal sketch} style, {close-up|full body}
+
+Each {a|b|...} group is an alternation; variants are the cartesian product of
+all groups (times seeds), in order, so variant 1 uses every first option.
+"""
+
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from pathlib import Path
+
+from generate_images import PROMPTS_DIR, get_api_key, mask_key
+
+GROUP_PATTERN = re.compile(r"\{([^{}]*\|[^{}]*)\}")
+SEEDS_PATTERN = re.compile(r"^#\s*seeds\s*:(.*)$", re.IGNORECASE)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_INTERVAL = 0.0  # extra spacing between request starts; the shared scheduler sets the rate
+
+
+def expand_prompt(text):
+    """
+    Expand a prompt template into its variants.
+
+    Returns:
+        list[dict]: [{"text": str, "seed": int | None}, ...], base variant first
+    """
+    seeds = [None]
+    body = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            match = SEEDS_PATTERN.match(stripped)
+            if match:
+                seeds = [int(s) for s in re.split(r"[,\s]+", match.group(1).strip()) if s]
+            continue
+        body.append(line)
+    body = "\n".join(body).strip()
+
+    groups = [[option.strip() for option in group.split("|")] for group in GROUP_PATTERN.findall(body)]
+    variants = []
+    for choice in itertools.product(*groups):
+        options = iter(choice)
+        prompt = GROUP_PATTERN.sub(lambda _: next(options), body)
+        for seed in seeds:
+            variants.append({"text": prompt, "seed": seed})
+    return variants
+
+
+def base_prompt(text):
+    """The first variant of a prompt template (the plain text for non-templated files)"""
+    return expand_prompt(text)[0]["text"]
+
+
+class SweepScheduler:
+    """
+    Runs prompt variants concurrently under a budget, breadth-first.
+
+    Call accept(prompt_name) (from any thread) to cancel that prompt's
+    remaining variants; with accept_first, the first variant that returns
+    images is accepted automatically.
+    """
+
+    def __init__(self, prompts, concurrency=DEFAULT_CONCURRENCY, max_requests=None,
+                 max_cost=None, cost_per_request=1.0, interval=DEFAULT_INTERVAL,
+                 accept_first=False, accept_file=None, api_key=None, generate=None):
+        """
+        Args:
+            prompts: {prompt name: [variant dicts from expand_prompt()]}
+            max_requests / max_cost: Budget; whichever is hit first stops dispatching
+            cost_per_request: Estimated cost of one generation call
+            interval: Minimum seconds between request starts, on top of the rate budget
+            accept_file: Optional file of accepted prompt names (one per line),
+                         re-read before each dispatch so reviewers can accept mid-run
+            generate: generate_image()-compatible callable; by default each run
+                      submits to the bulk lane of the shared scheduler
+                      (generation_scheduler.BulkGenerator)
+        """
+        self.prompts = prompts
+        self.concurrency = max(1, concurrency)
+        self.max_requests = max_requests
+        self.max_cost = max_cost
+        self.cost_per_request = cost_per_request
+        self.interval = interval
+        self.accept_first = accept_first
+        self.accept_file = Path(accept_file) if accept_file else None
+        self.api_key = api_key
+        self.generate = generate
+
+        self.accepted = set()
+        self.results = {name: [] for name in prompts}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def accept(self, prompt_name):
+        """Mark a prompt as done; its queued variants will not be requested"""
+        with self._lock:
+            self.accepted.add(prompt_name)
+
+    def queue(self):
+        """(prompt name, variant index) pairs in breadth-first order"""
+        depth = max((len(v) for v in self.prompts.values()), default=0)
+        return [(name, index) for index in range(depth)
+                for name, variants in self.prompts.items() if index < len(variants)]
+
+    def _budget_left(self):
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return False
+        if self.max_cost is not None and (self.requests + 1) * self.cost_per_request > self.max_cost:
+            return False
+        return True
+
+    def _poll_accept_file(self):
+        if self.accept_file and self.accept_file.exists():
+            names = {line.strip() for line in self.accept_file.read_text(encoding="utf-8").splitlines()}
+            with self._lock:
+                self.accepted.update(n for n in names if n)
+
+    def _run_variant(self, generate, name, index):
+        variant = self.prompts[name][index]
+        started = time.perf_counter()
+        images = generate(variant["text"], f"{name}__v{index + 1:02d}",
+                          api_key=self.api_key, seed=variant["seed"]) or []
+        record = {"variant": index + 1, "seed": variant["seed"], "images": images,
+                  "seconds": round(time.perf_counter() - started, 3)}
+        with self._lock:
+            self.results[name].append(record)
+            if images and self.accept_first:
+                self.accepted.add(name)
+        return record
+
+    def run(self):
+        """Run the sweep; returns {"requests", "cost", "accepted", "skipped", "results"}"""
+        pending = deque(self.queue())
+        skipped = 0
+        in_flight = set()
+        last_start = 0.0
+
+        if self.generate is None:
+            from generation_scheduler import BulkGenerator
+            generator = BulkGenerator()
+        else:
+            generator = nullcontext(self.generate)
+        with generator as generate, ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while pending or in_flight:
+                while pending and len(in_flight) < self.concurrency and self._budget_left():
+                    wait_for = self.interval - (time.perf_counter() - last_start)
+                    if wait_for > 0:
+                        time.sleep(wait_for)
+                    # Check acceptance only now, after any rate-limit wait
+                    self._poll_accept_file()
+                    name, index = pending.popleft()
+                    with self._lock:
+                        if name in self.accepted:
+                            skipped += 1
+                            continue
+                    last_start = time.perf_counter()
+                    self.requests += 1
+                    in_flight.add(pool.submit(self._run_variant, generate, name, index))
+
+                if not self._budget_left() and not in_flight:
+                    break
+                if in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+        skipped += len(pending)
+        return {
+            "requests": self.requests,
+            "cost": round(self.requests * self.cost_per_request, 6),
+            "accepted": sorted(self.accepted),
+            "skipped": skipped,
+            "results": self.results,
+        }
+
+
+def load_prompts(prompts_dir=PROMPTS_DIR, include="*.txt"):
+    """{prompt stem: variants} for every prompt file in prompts_dir"""
+    prompts = {}
+    for path in sorted(Path(prompts_dir).glob(include)):
+        variants = expand_prompt(path.read_text(encoding="utf-8"))
+        if variants and variants[0]["text"]:
+            prompts[path.stem] = variants
+    return prompts
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Generate prompt variants under a budget, breadth-first")
+    parser.add_argument("prompts_dir", nargs="?", default=str(PROMPTS_DIR), help="Prompt template directory")
+    parser.add_argument("--include", default="*.txt", help="Glob of prompt files")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Parallel requests")
+    parser.add_argument("--max-requests", type=int, default=None, help="Request budget")
+    parser.add_argument("--max-cost", type=float, default=None, help="Cost budget (same unit as --cost)")
+    parser.add_argument("--cost", type=float, default=1.0, help="Estimated cost per request")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Extra minimum seconds between request starts (the shared scheduler sets the rate)")
+    parser.add_argument("--accept-first", action="store_true",
+                        help="Stop a prompt's variants after its first successful image")
+    parser.add_argument("--accept-file", help="File of accepted prompt names, re-read during the run")
+    parser.add_argument("--report", help="Write the sweep results as JSON")
+    parser.add_argument("--dry-run", action="store_true", help="Print the breadth-first plan and exit")
+    args = parser.parse_args(argv)
+
+    prompts = load_prompts(args.prompts_dir, args.include)
+    if not prompts:
+        print(f"No prompt files found in {args.prompts_dir}")
+        return 1
+
+    scheduler = SweepScheduler(prompts, concurrency=args.concurrency, max_requests=args.max_requests,
+                               max_cost=args.max_cost, cost_per_request=args.cost,
+                               interval=args.interval, accept_first=args.accept_first,
+                               accept_file=args.accept_file)
+    total = sum(len(v) for v in prompts.values())
+    print(f"Found {len(prompts)} prompt files, {total} variants")
+
+    if args.dry_run:
+        for name, index in scheduler.queue():
+            variant = prompts[name][index]
+            seed = f" seed={variant['seed']}" if variant["seed"] is not None else ""
+            print(f"{name}__v{index + 1:02d}{seed}: {variant['text'][:90]}")
+        return 0
+
+    api_key = get_api_key()
+    if not api_key:
+        print("Error: Please set OPENROUTER_API_KEY in your .env file")
+        return 1
+    print(f"Key: {mask_key(api_key)}")
+    print("-" * 60)
+
+    summary = scheduler.run()
+    print("-" * 60)
+    print(f"Complete! Requests: {summary['requests']}, cost: {summary['cost']}, "
+          f"accepted: {len(summary['accepted'])}/{len(prompts)}, skipped variants: {summary['skipped']}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Bounded, streaming parsing of /api/generate uploads.
+
+The multipart body is read in small chunks and decoded incrementally
+(werkzeug's sans-IO MultipartDecoder), keeping only the fields the endpoint
+uses, each capped: the prompt (text field or uploaded .txt file) at
+MAX_PROMPT_BYTES, short fields at FIELD_LIMIT. Parsing stops as soon as a cap
+is exceeded, so an oversized prompt file is rejected after reading at most
+one chunk past the limit; nothing is spooled to disk and memory stays bounded
+regardless of what the client sends. Whole requests larger than
+MAX_UPLOAD_BYTES are rejected by server.py from the Content-Length header,
+before any of the body is read.
+
+Configuration (environment, read by limits_from_env()):
+    MAX_UPLOAD_BYTES   largest request body accepted (default 1 MiB)
+    MAX_PROMPT_BYTES   largest prompt text or prompt file (default 32 KiB)
+"""
+
+import os
+from dataclasses import dataclass
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+DEFAULT_MAX_UPLOAD = 1024 * 1024
+DEFAULT_MAX_PROMPT = 32 * 1024
+FIELD_LIMIT = 1024  # name, apiKey
+MAX_PARTS = 16
+CHUNK_SIZE = 16 * 1024
+
+PROMPT_FIELDS = ("prompt", "prompt_file")
+SHORT_FIELDS = ("name", "apiKey")
+
+
+@dataclass(frozen=True)
+class UploadLimits:
+    max_upload: int = DEFAULT_MAX_UPLOAD
+    max_prompt: int = DEFAULT_MAX_PROMPT
+
+
+def limits_from_env():
+    """UploadLimits configured from MAX_UPLOAD_BYTES / MAX_PROMPT_BYTES"""
+    return UploadLimits(
+        max_upload=int(os.getenv("MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD)),
+        max_prompt=int(os.getenv("MAX_PROMPT_BYTES", DEFAULT_MAX_PROMPT)),
+    )
+
+
+class PromptTooLarge(RequestEntityTooLarge):
+    description = "Prompt is too large."
+
+
+def read_prompt_form(stream, content_type, limits):
+    """
+    Parse a multipart/form-data /api/generate body from a stream.
+
+    Returns:
+        tuple: ({field name: text}, uploaded prompt file name or None); only
+               prompt, prompt_file, name and apiKey are kept
+    Raises:
+        PromptTooLarge: a kept field exceeded its cap (parsing stops there)
+        RequestEntityTooLarge: too many parts
+        ValueError: not a multipart body, or a malformed one
+    """
+    mimetype, options = parse_options_header(content_type or "")
+    boundary = options.get("boundary")
+    if mimetype != "multipart/form-data" or not boundary:
+        raise ValueError("Expected multipart/form-data with a boundary")
+
+    # The decoder's own buffer never holds more than about one chunk, as it is drained after each
+    decoder = MultipartDecoder(boundary.encode("latin-1"), max_form_memory_size=2 * CHUNK_SIZE,
+                               max_parts=MAX_PARTS)
+    fields, buffers, filename = {}, {}, None
+    current = None  # (name, cap) of the part being received; cap None = discarded
+
+    def receive(data):
+        nonlocal current, filename
+        decoder.receive_data(data)
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, (Field, File)):
+                cap = (limits.max_prompt if event.name in PROMPT_FIELDS
+                       else FIELD_LIMIT if event.name in SHORT_FIELDS else None)
+                current = (event.name, cap)
+                if cap is not None:
+                    buffers[event.name] = bytearray()
+                if isinstance(event, File) and event.name == "prompt_file":
+                    filename = event.filename
+            elif isinstance(event, Data) and current and current[1] is not None:
+                name, cap = current
+                buffers[name] += event.data
+                if len(buffers[name]) > cap:
+                    raise PromptTooLarge(f"'{name}' exceeds {cap} bytes.")
+                if not event.more_data:
+                    fields[name] = buffers.pop(name).decode("utf-8", errors="ignore")
+            event = decoder.next_event()
+        return isinstance(event, Epilogue)
+
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            receive(None)
+            break
+        if receive(chunk):
+            break  # closing boundary seen; anything after it is ignored
+    return fields, filename
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Watch mode for generate_images.py --watch.
+
+Monitors the prompts directory (inotify on Linux, a cheap stat-polling
+fallback elsewhere), debounces bursts of edits, and regenerates only the
+prompts whose content actually changed, several at a time. Artifacts derived
+from the regenerated images are then invalidated: their perceptual-hash
+entries are dropped, an existing contact sheet is refreshed (incrementally),
+and built decks/dossiers that now embed outdated images are reported.
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+
+from generate_images import OUTPUT_DIR, PROMPTS_DIR
+
+DEFAULT_DEBOUNCE = 0.5  # seconds without further edits before a batch is regenerated
+DEFAULT_CONCURRENCY = 4
+POLL_INTERVAL = 1.0
+
+# Built documents that embed copies of generated images
+DERIVED_DOCUMENTS = ("Blood_Assassin_Pitch_Deck*.pptx", "Blood_Assassin_Character_Dossier*.docx")
+
+
+class InotifyWatcher:
+    """Directory change events from Linux inotify (via libc, no extra dependency)"""
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def changes(self, timeout):
+        """Names of files changed within `timeout` seconds (empty set if none)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names, offset = set(), 0
+        while offset < len(data):
+            _, _, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback: compares (mtime, size) of the directory's files every interval"""
+
+    def __init__(self, directory, interval=POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        with os.scandir(self.directory) as entries:
+            return {e.name: (e.stat().st_mtime_ns, e.stat().st_size) for e in entries if e.is_file()}
+
+    def changes(self, timeout):
+        time.sleep(min(self.interval, timeout) if timeout is not None else self.interval)
+        current = self._scan()
+        changed = {name for name, sig in current.items() if self.snapshot.get(name) != sig}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, poll=False):
+    """inotify watcher where available, else the polling fallback"""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory)
+
+
+def text_digest(path):
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def invalidate_derived(image_names, images_dir=OUTPUT_DIR):
+    """Refresh or flag artifacts derived from freshly regenerated images"""
+    if not image_names:
+        return
+    images_dir = Path(images_dir)
+
+    # Perceptual-hash index entries (re-hashed on the next dedupe run)
+    from image_dedupe import INDEX_NAME, PhashIndex
+    if (images_dir / INDEX_NAME).exists():
+        index = PhashIndex(images_dir)
+        if any(index.entries.pop(name, None) for name in image_names):
+            index.save()
+
+    # Contact sheet: only rebuilt if one has been built before; re-thumbnails just the changed images
+    from contact_sheet import OUTPUT_DIR as SHEETS_DIR, build_contact_sheet
+    if (SHEETS_DIR / "manifest.json").exists():
+        build_contact_sheet(images_dir, SHEETS_DIR)
+
+    newest = max((images_dir / name).stat().st_mtime for name in image_names
+                 if (images_dir / name).exists())
+    for pattern in DERIVED_DOCUMENTS:
+        for document in Path(".").glob(pattern):
+            if document.stat().st_mtime < newest:
+                print(f"⚠️  {document} embeds outdated images; rebuild it "
+                      f"(blood-assassin deck / blood-assassin dossier)")
+
+
+class PromptWatcher:
+    """
+    Debounced, change-only, concurrent regeneration of edited prompt files.
+
+    Regenerations run in the bulk lane of the shared scheduler by default
+    (generation_scheduler.BulkGenerator), so a watch session shares the rate
+    budget with the web UI; `concurrency` only bounds prompts in flight.
+    """
+
+    def __init__(self, prompts_dir=PROMPTS_DIR, include="*.txt", debounce=DEFAULT_DEBOUNCE,
+                 concurrency=DEFAULT_CONCURRENCY, poll=False, hedge=False, generate=None):
+        self.prompts_dir = Path(prompts_dir)
+        self.include = include
+        self.debounce = debounce
+        self.poll = poll
+        self.hedge = hedge
+        self._bulk = None
+        if generate is None:
+            from generation_scheduler import BulkGenerator
+            generate = self._bulk = BulkGenerator()
+        self.generate = generate
+        self.pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        # Content digest of every prompt as last generated (or as found at startup)
+        self.digests = {p.name: text_digest(p) for p in self.prompts_dir.glob(include)}
+        self.in_flight = set()
+        self._lock = threading.Lock()
+        self._invalidate_lock = threading.Lock()
+
+    def changed(self, names):
+        """Names whose content differs from the last generated version (no-op saves are dropped)"""
+        changed = []
+        for name in sorted(names):
+            if not fnmatch(name, self.include):
+                continue
+            digest = text_digest(self.prompts_dir / name)
+            if digest and digest != self.digests.get(name):
+                changed.append(name)
+        return changed
+
+    def dispatch(self, names):
+        """Queue regeneration for changed prompts; those already regenerating are returned for later"""
+        deferred = set()
+        for name in self.changed(names):
+            with self._lock:
+                if name in self.in_flight:
+                    deferred.add(name)
+                    continue
+                self.in_flight.add(name)
+            self.pool.submit(self._regenerate, name)
+        return deferred
+
+    def _regenerate(self, name):
+        from prompt_sweep import base_prompt
+
+        path = self.prompts_dir / name
+        try:
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            text = data.decode("utf-8")
+            prompt = base_prompt(text)
+            if not prompt:  # emptied, or caught mid-save
+                return
+            print(f"✏️  {name} changed, regenerating...")
+            images = self.generate(prompt, path.stem, hedge=self.hedge) or []
+            if images:
+                self.digests[name] = digest
+                with self._invalidate_lock:  # one invalidation pass at a time
+                    invalidate_derived(images)
+        except Exception as e:
+            print(f"✗ Regenerating {name} failed: {e}")
+        finally:
+            with self._lock:
+                self.in_flight.discard(name)
+
+    def run(self):
+        """Watch until interrupted"""
+        self.prompts_dir.mkdir(exist_ok=True)
+        watcher = make_watcher(self.prompts_dir, self.poll)
+        kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+        print(f"👀 Watching {self.prompts_dir}/{self.include} ({kind}); Ctrl+C to stop")
+        pending, last_event = set(), 0.0
+        try:
+            while True:
+                names = watcher.changes(self.debounce if pending else POLL_INTERVAL)
+                if names:
+                    pending |= names
+                    last_event = time.monotonic()
+                elif pending and time.monotonic() - last_event >= self.debounce:
+                    pending = self.dispatch(pending)
+                    if pending:
+                        last_event = time.monotonic()
+        except KeyboardInterrupt:
+            print("\nStopping watch...")
+        finally:
+            watcher.close()
+            self.pool.shutdown(wait=True)
+            if self._bulk is not None:
+                self._bulk.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+In-memory TF-IDF search over prompts and the images generated from them.
+
+Backs GET /api/search?q= in server.py. Each prompt file in image-prompts/ is
+a document; its generated images are linked through the telemetry ledger
+(calls record the prompt hash and the saved file names) and, for images made
+before that was recorded, the output naming convention (<prompt>.png,
+<prompt>_1.png, <prompt>__v02.png from sweeps). Generations that run in the
+server process are added as they land, including web UI prompts that have
+no prompt file.
+
+The index is an inverted map term -> {document: term frequency} held in
+memory; a query only touches the postings of its own terms. Scores are
+(1 + log tf) * idf per matched term, normalized by document length and
+scaled by the fraction of query terms matched, so documents matching every
+term rank first. A background thread picks up edited prompt files and new
+ledger records, so queries never read from disk.
+
+Usage:
+    python3 search_index.py "seraphiel throne room"
+"""
+
+import argparse
+import hashlib
+import heapq
+import math
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from generate_images import OUTPUT_DIR, PROMPTS_DIR
+
+REFRESH_INTERVAL = 30  # seconds between background re-scans of prompts, images and the ledger
+DEFAULT_LIMIT = 20
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has her his in into is it its of on or over that the their them
+then there these they this to under was with without image images every all show me
+""".split())
+
+# <prompt>[__vNN][_N] -> <prompt>: sweep variants and multi-image suffixes
+OUTPUT_SUFFIX = re.compile(r"^(.+?)(__v\d+)?(_\d+)?$")
+
+
+def tokenize(text):
+    """Lower-case word tokens without stopwords; plural -s is folded ("rooms" -> "room")"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def prompt_digests(text):
+    """SHA-256 of every prompt text a file can send (the variants of a template)"""
+    from prompt_sweep import expand_prompt
+
+    return {hashlib.sha256(v["text"].encode("utf-8")).hexdigest() for v in expand_prompt(text)}
+
+
+class SearchIndex:
+    """Inverted TF-IDF index of prompt documents and their images; thread-safe"""
+
+    def __init__(self, prompts_dir=PROMPTS_DIR, images_dir=OUTPUT_DIR, ledger_db=None):
+        self.prompts_dir = Path(prompts_dir)
+        self.images_dir = Path(images_dir)
+        self.ledger_db = ledger_db
+        self.docs = {}  # doc id -> {"name", "source", "text", "images": set, "terms", "digests", "length"}
+        self.postings = {}  # term -> {doc id: term frequency}
+        self.by_digest = {}  # prompt sha256 -> doc id
+        self._stamps = {}  # prompt file name -> (size, mtime_ns)
+        self._ledger_id = 0
+        self._lock = threading.RLock()
+        self._refresher = None
+
+    # ----- documents -----
+    def add_document(self, doc_id, text, name, source):
+        """Add or replace a document; its images are kept"""
+        with self._lock:
+            images = self.docs[doc_id]["images"] if doc_id in self.docs else set()
+            self.remove_document(doc_id)
+            counts = {}
+            for token in tokenize(text) + tokenize(name.replace("_", " ")):
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            digests = prompt_digests(text)
+            for digest in digests:
+                self.by_digest[digest] = doc_id
+            self.docs[doc_id] = {"name": name, "source": source, "text": text, "images": images,
+                                 "terms": tuple(counts), "digests": digests,
+                                 "length": sum(counts.values()) or 1}
+
+    def remove_document(self, doc_id):
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            for term in doc["terms"]:
+                postings = self.postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self.postings[term]
+            for digest in doc["digests"]:
+                if self.by_digest.get(digest) == doc_id:
+                    del self.by_digest[digest]
+
+    def record_generation(self, prompt_text, images, name="image"):
+        """Link freshly generated images to their prompt's document (created if unknown)"""
+        if not images:
+            return
+        digest = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            doc_id = self.by_digest.get(digest)
+            if doc_id is None:
+                doc_id = f"generation:{digest[:16]}"
+                self.add_document(doc_id, prompt_text, name, "generation")
+            self.docs[doc_id]["images"].update(images)
+
+    # ----- refresh from disk (never on the query path) -----
+    def refresh(self):
+        """Re-read new/edited prompt files, drop deleted ones, and relink images; returns docs changed"""
+        changed = 0
+        current = {}
+        if self.prompts_dir.is_dir():
+            for path in self.prompts_dir.glob("*.txt"):
+                st = path.stat()
+                current[path.name] = (st.st_size, st.st_mtime_ns)
+        for file_name, stamp in current.items():
+            if self._stamps.get(file_name) != stamp:
+                try:
+                    text = (self.prompts_dir / file_name).read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    continue
+                self.add_document(f"prompt:{Path(file_name).stem}", text, Path(file_name).stem, "prompt")
+                self._stamps[file_name] = stamp
+                changed += 1
+        for file_name in set(self._stamps) - set(current):
+            self.remove_document(f"prompt:{Path(file_name).stem}")
+            del self._stamps[file_name]
+            changed += 1
+        self._link_images()
+        return changed
+
+    def _link_images(self):
+        from telemetry import generation_outputs
+
+        on_disk = set()
+        if self.images_dir.is_dir():
+            on_disk = {p.name for p in self.images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS}
+        records = generation_outputs(self._ledger_id, self.ledger_db)
+
+        with self._lock:
+            for row_id, digest, names in records:
+                doc_id = self.by_digest.get(digest)
+                if doc_id is not None:
+                    self.docs[doc_id]["images"].update(names)
+                self._ledger_id = row_id
+            prompts = {doc["name"]: doc_id for doc_id, doc in self.docs.items() if doc["source"] == "prompt"}
+            for image in on_disk:
+                stem = Path(image).stem
+                for candidate in (stem, OUTPUT_SUFFIX.match(stem).group(1)):
+                    if candidate in prompts:
+                        self.docs[prompts[candidate]]["images"].add(image)
+                        break
+            for doc in self.docs.values():
+                doc["images"] &= on_disk
+
+    def start_refresh(self, interval=REFRESH_INTERVAL):
+        """Refresh now, then every interval seconds in a background thread"""
+        self.refresh()
+        if self._refresher is None:
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        print(f"⚠️  Search index refresh failed: {e}")
+
+            self._refresher = threading.Thread(target=loop, daemon=True, name="search-refresh")
+            self._refresher.start()
+        return self
+
+    # ----- queries -----
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Rank documents for a free-text query.
+
+        Returns:
+            list[dict]: {"name", "source", "score", "images", "snippet"}, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            total = len(self.docs)
+            scores, matched = {}, {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for doc_id, tf in postings.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + (1 + math.log(tf)) * idf
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+            ranked = heapq.nlargest(
+                limit, scores,
+                key=lambda d: scores[d] / math.sqrt(self.docs[d]["length"]) * matched[d] / len(terms))
+            results = []
+            for doc_id in ranked:
+                doc = self.docs[doc_id]
+                score = scores[doc_id] / math.sqrt(doc["length"]) * matched[doc_id] / len(terms)
+                snippet = " ".join(doc["text"].split())
+                results.append({"name": doc["name"], "source": doc["source"], "score": round(score, 4),
+                                "images": sorted(doc["images"]),
+                                "snippet": snippet[:160] + ("…" if len(snippet) > 160 else "")})
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self.docs), "terms": len(self.postings),
+                    "images": sum(len(d["images"]) for d in self.docs.values())}
+
+
+def main(argv=None):
+    """Command-line entry point: build the index and run one query"""
+    parser = argparse.ArgumentParser(description="Search prompts and their generated images")
+    parser.add_argument("query", help="Free-text query, e.g. \"seraphiel throne room\"")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Maximum results")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.refresh()
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    results = index.search(args.query, args.limit)
+    elapsed = time.perf_counter() - started
+
+    stats = index.stats()
+    print(f"🔎 {stats['documents']} prompts indexed in {built * 1000:.0f} ms; "
+          f"{len(results)} result(s) in {elapsed * 1000:.2f} ms")
+    for result in results:
+        print(f"  {result['score']:.3f}  {result['name']}: {', '.join(result['images']) or '(no images)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
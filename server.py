@@ -6,22 +6,49 @@ Endpoints:
 - GET / -> serve web UI
 - POST /api/generate -> generate images from prompt text or uploaded .txt file
 - GET /generated-images/<filename> -> serve generated images
+- GET /contact-sheets/<filename> -> serve gallery sprite/montage and coordinates
+- GET /mirror/<path> -> externally hosted gallery images via a local read-through cache
+- GET /api/export.zip -> streaming ZIP of generated images, dossier and deck
+- POST /api/artifacts/<dossier|deck> -> memoized background build; GET /api/artifacts/<kind>/<key> -> result
+- GET /api/search?q= -> prompts and their generated images, ranked by TF-IDF (search_index.py)
+
+Request bodies are capped at MAX_UPLOAD_BYTES (413 from the Content-Length
+header, before the body is read) and prompts at MAX_PROMPT_BYTES; multipart
+uploads are parsed as a stream (prompt_upload.py).
+
+Generation requests run through a priority scheduler (generation_scheduler.py)
+in the interactive lane; batch CLI runs submit to the same scheduler in the
+bulk lane through a local socket.
 """
 
 from __future__ import annotations
 
+import argparse
 import os
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import unquote_etag
 
 # Local import
-from generate_images import generate_image, OUTPUT_DIR, PROMPTS_DIR, OPENROUTER_API_KEY
+from artifact_builds import ArtifactError, ArtifactService, ArtifactUnavailable
+from generate_images import generate_image, get_api_key, OUTPUT_DIR, PROMPTS_DIR
+from generation_scheduler import INTERACTIVE, scheduler_from_env, serve_socket
+from mirror_cache import MirrorError, cache_from_env
+from prompt_upload import PromptTooLarge, limits_from_env, read_prompt_form
+from search_index import SearchIndex
+from zip_export import KINDS, select_files, stream_zip
 
 ROOT = Path(__file__).parent
 WEB_DIR = ROOT / "web"
+# contact_sheet.OUTPUT_DIR; not imported, so serving needs neither numpy nor Pillow
+CONTACT_SHEETS_DIR = ROOT / "contact-sheets"
 EXPERIMENTS_DIRS = {
     "phase-4-html-gallery": ROOT / "phase-4-html-gallery",
     "theme-factory": ROOT / "01-theme-factory",
@@ -33,6 +60,67 @@ EXPERIMENTS_DIRS = {
 app = Flask(__name__, static_folder=str(WEB_DIR), static_url_path="")
 CORS(app)
 
+UPLOAD_LIMITS = limits_from_env()
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_LIMITS.max_upload  # also bounds chunked bodies as they are read
+app.config["MAX_FORM_MEMORY_SIZE"] = UPLOAD_LIMITS.max_prompt  # non-file fields of url-encoded forms
+
+_MIRROR = None
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+_SEARCH = None
+_SEARCH_LOCK = threading.Lock()
+ARTIFACTS = ArtifactService()
+
+
+def generate_and_index(prompt_text, output_filename, **kwargs):
+    """generate_image() that also links the new images into the search index"""
+    images = generate_image(prompt_text, output_filename, **kwargs)
+    if images:
+        get_search_index().record_generation(prompt_text, images, output_filename)
+    return images
+
+
+def get_scheduler():
+    """The process-wide generation scheduler, also served on the local socket for CLI batches"""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = scheduler_from_env(generate=generate_and_index)
+            try:
+                serve_socket(_SCHEDULER)
+            except (OSError, RuntimeError, AttributeError) as e:  # AttributeError: no Unix sockets
+                print(f"⚠️  Scheduler socket unavailable ({e}); CLI batches will not share the rate budget")
+    return _SCHEDULER
+
+
+def get_search_index():
+    """The process-wide search index, built on first use and refreshed in the background"""
+    global _SEARCH
+    with _SEARCH_LOCK:
+        if _SEARCH is None:
+            _SEARCH = SearchIndex().start_refresh(int(os.environ.get("SEARCH_REFRESH", "30")))
+    return _SEARCH
+
+
+def get_mirror():
+    """Read-through cache for /mirror/ (configured by MIRROR_* env vars, see mirror_cache.py)"""
+    global _MIRROR
+    if _MIRROR is None:
+        _MIRROR = cache_from_env()
+    return _MIRROR
+
+
+@app.before_request
+def reject_oversized_body():
+    """413 as soon as the declared body size is over the limit, without reading any of it"""
+    if request.content_length is not None and request.content_length > UPLOAD_LIMITS.max_upload:
+        raise RequestEntityTooLarge()
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": e.description}), 413
+
 
 @app.route("/")
 def index():
@@ -61,7 +149,7 @@ def api_generate():
       - prompt_file: uploaded .txt file (optional)
       - prompt: text (optional)
       - name: base output filename without extension (optional)
-    Returns: { images: ["filename.png", ...] }
+    Returns: { images: ["filename.png", ...] }; 413 when the body or prompt is over its limit
     """
     prompt_text: Optional[str] = None
     base_name: str = "image"
@@ -74,31 +162,35 @@ def api_generate():
         # Optional temporary API key (do not store server-side)
         api_key_override = (data.get("apiKey") or "").strip() or None
     else:
-        # multipart form
-        if "prompt_file" in request.files:
-            f = request.files["prompt_file"]
+        # multipart form, parsed as a stream with per-field caps; url-encoded forms via request.form
+        if request.mimetype == "multipart/form-data":
             try:
-                text = f.read().decode("utf-8", errors="ignore").strip()
-                if text:
-                    prompt_text = text
-                # Use the uploaded filename (stem) if provided and name not set
-                if f.filename:
-                    stem = Path(f.filename).stem
-                    if stem:
-                        base_name = stem
-            except UnicodeDecodeError:
-                # Keep going; user may also provide text in textarea
-                pass
-        form_prompt = (request.form.get("prompt") or "").strip()
+                form, upload_name = read_prompt_form(request.stream, request.content_type, UPLOAD_LIMITS)
+            except ValueError as e:
+                return jsonify({"error": f"Malformed form data: {e}"}), 400
+        else:
+            form, upload_name = {k: v for k, v in request.form.items() if k != "prompt_file"}, None
+        text = (form.get("prompt_file") or "").strip()
+        if text:
+            prompt_text = text
+        # Use the uploaded filename (stem) if provided and name not set
+        if upload_name:
+            stem = Path(upload_name).stem
+            if stem:
+                base_name = stem
+        form_prompt = (form.get("prompt") or "").strip()
         if form_prompt:
             prompt_text = form_prompt
-        form_name = (request.form.get("name") or "").strip()
+        form_name = (form.get("name") or "").strip()
         if form_name:
             base_name = form_name
-        api_key_override = (request.form.get("apiKey") or "").strip() or None
+        api_key_override = (form.get("apiKey") or "").strip() or None
+    if prompt_text and len(prompt_text.encode("utf-8")) > UPLOAD_LIMITS.max_prompt:
+        raise PromptTooLarge()
 
     # Auth check: allow either env var or a provided temporary key from the request
-    has_env_key = bool(OPENROUTER_API_KEY and str(OPENROUTER_API_KEY).startswith("sk-or-v1-"))
+    env_key = get_api_key()
+    has_env_key = bool(env_key and str(env_key).startswith("sk-or-v1-"))
     has_temp_key = bool(api_key_override and str(api_key_override).startswith("sk-or-v1-"))
     if not (has_env_key or has_temp_key):
         return jsonify({
@@ -108,7 +200,10 @@ def api_generate():
     if not prompt_text:
         return jsonify({"error": "No prompt provided. Provide JSON {prompt} or upload a .txt file."}), 400
 
-    images: List[str] = generate_image(prompt_text, base_name, api_key=api_key_override) or []
+    # Interactive lane: ahead of any queued bulk work. Hedged: a slow upstream call is
+    # raced by a second one (capped, see hedging.py)
+    images: List[str] = get_scheduler().generate_now(prompt_text, base_name, lane=INTERACTIVE,
+                                                     api_key=api_key_override, hedge=True) or []
 
     if not images:
         return jsonify({"error": "No images returned from model."}), 502
@@ -118,12 +213,144 @@ def api_generate():
     return jsonify({"images": images, "urls": urls})
 
 
+@app.route("/api/export.zip")
+def api_export_zip():
+    """
+    Stream a ZIP of generated images and built artifacts.
+
+    Query parameters (all optional):
+      - include: comma-separated kinds, any of images, dossier, deck (default: all)
+      - match: glob on file names, e.g. 0*_portrait*
+      - since: only files modified since this ISO date/time or Unix timestamp
+    """
+    kinds = [k.strip() for k in (request.args.get("include") or ",".join(KINDS)).split(",") if k.strip()]
+    unknown = sorted(set(kinds) - set(KINDS))
+    if unknown:
+        return jsonify({"error": f"Unknown include kind(s): {', '.join(unknown)}. Use {', '.join(KINDS)}."}), 400
+
+    since: Optional[float] = None
+    if request.args.get("since"):
+        value = request.args["since"]
+        try:
+            since = float(value)
+        except ValueError:
+            try:
+                since = datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                return jsonify({"error": "Invalid since; use an ISO date/time or Unix timestamp."}), 400
+
+    files = select_files(kinds, match=request.args.get("match") or None, since=since)
+    if not files:
+        return jsonify({"error": "Nothing to export for these filters."}), 404
+
+    # Sent as it is built: no Content-Length, constant memory
+    return Response(stream_zip(files), mimetype="application/zip", headers={
+        "Content-Disposition": 'attachment; filename="blood-assassin-export.zip"',
+        "X-Accel-Buffering": "no",
+    })
+
+
+@app.route("/api/search")
+def api_search():
+    """
+    Query: q (free text, e.g. "seraphiel throne room"), limit (default 20, max 100).
+    Returns: { results: [{ name, source, score, images, urls, snippet }], total_ms }
+    """
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter q"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    started = time.perf_counter()
+    results = get_search_index().search(query, limit)
+    for result in results:
+        result["urls"] = [f"/generated-images/{name}" for name in result["images"]]
+    elapsed = (time.perf_counter() - started) * 1000
+    return jsonify({"results": results, "total_ms": round(elapsed, 2)})
+
+
+@app.route("/api/artifacts/<kind>", methods=["POST"])
+def api_build_artifact(kind: str):
+    """
+    Build the dossier or deck in the background, memoized by template, image contents and options.
+
+    JSON body (all optional):
+      - dossier: images, sections, heading, skip_duplicates, emblems
+      - deck: spec (a file in deck-specs/), dpi, skip_duplicates, auto_colors
+      - wait: true to respond only once the build has finished
+    Returns 200 { status: "ready", url } or 202 { status: "building", url } (poll the url).
+    """
+    options = request.get_json(silent=True)
+    if options is None:
+        options = {}
+    try:
+        key, status, future = ARTIFACTS.request(kind, options)
+    except ArtifactUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except ArtifactError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if future is not None and options.get("wait"):
+        try:
+            future.result()
+            status = "ready"
+        except Exception as e:
+            return jsonify({"status": "failed", "key": key, "error": str(e)}), 500
+
+    body = {"status": status, "key": key, "url": f"/api/artifacts/{kind}/{key}"}
+    return jsonify(body), 200 if status == "ready" else 202
+
+
+@app.route("/api/artifacts/<kind>/<key>")
+def api_get_artifact(kind: str, key: str):
+    status, error = ARTIFACTS.status(kind, key)
+    if status == "ready":
+        path = ARTIFACTS.path_for(kind, key)
+        download = "Blood_Assassin_Character_Dossier.docx" if kind == "dossier" else "Blood_Assassin_Pitch_Deck.pptx"
+        return send_file(str(path.resolve()), as_attachment=True, download_name=download)
+    if status == "building":
+        return jsonify({"status": status, "key": key}), 202
+    if status == "failed":
+        return jsonify({"status": status, "key": key, "error": error}), 500
+    return jsonify({"error": "Unknown artifact"}), 404
+
+
 @app.route('/generated-images/<path:filename>')
 def serve_generated(filename: str):
     directory = str(OUTPUT_DIR.resolve())
     return send_from_directory(directory, filename, as_attachment=False)
 
 
+@app.route('/contact-sheets/<path:filename>')
+def serve_contact_sheets(filename: str):
+    # Sprite, montage and coordinates produced by contact_sheet.py
+    directory = str(CONTACT_SHEETS_DIR.resolve())
+    return send_from_directory(directory, filename, as_attachment=False)
+
+
+@app.route('/mirror/<path:path>')
+def serve_mirror(path: str):
+    # Externally hosted gallery images, served from the local cache (fetched on first use)
+    mirror = get_mirror()
+    try:
+        body_path, meta = mirror.get(path)
+    except MirrorError as e:
+        return str(e), e.status
+    # Validators come from the origin, not the cache file (whose mtime tracks last access)
+    response = send_file(str(body_path.resolve()), mimetype=meta["content_type"], conditional=False, etag=False,
+                         last_modified=None, max_age=int(mirror.revalidate_after))
+    if meta.get("etag"):
+        response.set_etag(*unquote_etag(meta["etag"]))
+    if meta.get("last_modified"):
+        response.headers["Last-Modified"] = meta["last_modified"]
+    response.make_conditional(request)
+    response.headers["X-Mirror-Cache"] = "stale" if meta.get("stale") else "ok"
+    return response
+
+
 @app.route('/image-prompts/<path:filename>')
 def serve_prompts(filename: str):
     # Optional: expose prompt files for convenience in UI if needed
@@ -146,10 +373,17 @@ def serve_experiment_source(group: str, filename: str):
     return send_from_directory(directory, filename, as_attachment=False)
 
 
-def main():
-    port = int(os.environ.get("PORT", "5000"))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the web UI and image generation API")
     # Bind to 0.0.0.0 for Railway or container platforms
-    app.run(host=os.environ.get("HOST", "0.0.0.0"), port=port, debug=True)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    args = parser.parse_args(argv)
+    # Start the scheduler (and its socket) up front in the serving process, not the reloader parent
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        get_scheduler()
+        get_search_index()
+    app.run(host=args.host, port=args.port, debug=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+SVG rasterization for the deck and dossier builders.
+
+python-pptx and python-docx only embed raster images, so SVG artwork (e.g.
+the 03-canvas-design emblems) is rendered to PNG at the exact pixel size a
+builder asks for: its display box at the target DPI. Renders are cached in
+.svg-cache/ by SVG content hash and pixel size, and batches render in parallel.
+
+Rendering uses CairoSVG when installed (pip install cairosvg), otherwise the
+rsvg-convert or inkscape command-line tools.
+
+Usage:
+    python3 svg_raster.py 03-canvas-design/*.svg --width 2.5 --dpi 220
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CACHE_DIR = Path(".svg-cache")
+EMBLEMS_DIR = Path(__file__).parent / "03-canvas-design"
+DEFAULT_DPI = 150
+CSS_DPI = 96  # SVG user units are CSS pixels
+
+_LENGTH_UNITS = {"": 1.0, "px": 1.0, "in": 96.0, "cm": 96 / 2.54, "mm": 96 / 25.4, "pt": 96 / 72, "pc": 16.0}
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _length(value):
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([a-z]*)\s*", value or "")
+    if not match or match.group(2) not in _LENGTH_UNITS:
+        return None
+    return float(match.group(1)) * _LENGTH_UNITS[match.group(2)]
+
+
+def svg_size(svg_path):
+    """Intrinsic (width, height) of an SVG in CSS pixels, from width/height or the viewBox"""
+    root = ET.parse(svg_path).getroot()
+    width, height = _length(root.get("width")), _length(root.get("height"))
+    view_box = [float(v) for v in re.split(r"[\s,]+", root.get("viewBox", "").strip()) if v]
+    if len(view_box) == 4:
+        vb_w, vb_h = view_box[2], view_box[3]
+        if width and not height:
+            height = width * vb_h / vb_w
+        elif height and not width:
+            width = height * vb_w / vb_h
+        elif not width and not height:
+            width, height = vb_w, vb_h
+    if not width or not height:
+        width, height = 300.0, 150.0  # CSS default replaced-element size
+    return width, height
+
+
+def pixel_size(svg_path, width_in=None, height_in=None, dpi=DEFAULT_DPI):
+    """
+    Pixel size for an SVG shown in a width/height box (inches) at dpi.
+
+    A missing box dimension follows the SVG's aspect ratio; with no box, the
+    intrinsic size is used (scaled from 96 DPI to dpi).
+    """
+    src_w, src_h = svg_size(svg_path)
+    if width_in and height_in:
+        box_w, box_h = width_in, height_in
+    elif width_in:
+        box_w, box_h = width_in, width_in * src_h / src_w
+    elif height_in:
+        box_w, box_h = height_in * src_w / src_h, height_in
+    else:
+        box_w, box_h = src_w / CSS_DPI, src_h / CSS_DPI
+    return max(1, round(box_w * dpi)), max(1, round(box_h * dpi))
+
+
+def _render_cairosvg(svg_path, out_path, width, height):
+    import cairosvg
+    cairosvg.svg2png(url=str(svg_path), write_to=str(out_path), output_width=width, output_height=height)
+
+
+def _render_rsvg(svg_path, out_path, width, height):
+    subprocess.run(["rsvg-convert", "-w", str(width), "-h", str(height), "-o", str(out_path), str(svg_path)],
+                   check=True, capture_output=True)
+
+
+def _render_inkscape(svg_path, out_path, width, height):
+    subprocess.run(["inkscape", str(svg_path), "--export-type=png", f"--export-filename={out_path}",
+                    f"--export-width={width}", f"--export-height={height}"], check=True, capture_output=True)
+
+
+def find_renderer():
+    """The first available rendering backend, or None"""
+    try:
+        import cairosvg  # noqa: F401
+        return _render_cairosvg
+    except (ImportError, OSError):  # OSError: cairo shared library missing
+        pass
+    if shutil.which("rsvg-convert"):
+        return _render_rsvg
+    if shutil.which("inkscape"):
+        return _render_inkscape
+    return None
+
+
+def rasterize(svg_path, width, height, cache_dir=CACHE_DIR, renderer=None):
+    """
+    Render an SVG to a width x height PNG, reusing the cached render if present.
+
+    Returns:
+        str: Path of the cached PNG
+    Raises:
+        RuntimeError: no rendering backend is available
+    """
+    cache_dir = Path(cache_dir)
+    cached = cache_dir / f"{file_digest(svg_path)}_{width}x{height}.png"
+    if cached.exists():
+        return str(cached)
+
+    renderer = renderer or find_renderer()
+    if renderer is None:
+        raise RuntimeError("No SVG renderer available. Install with: pip install cairosvg "
+                           "(or install rsvg-convert / inkscape)")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(f".{os.getpid()}.{os.urandom(4).hex()}.tmp.png")
+    try:
+        renderer(svg_path, tmp, width, height)
+        os.replace(tmp, cached)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return str(cached)
+
+
+def rasterize_for_box(svg_path, width_in=None, height_in=None, dpi=DEFAULT_DPI, cache_dir=CACHE_DIR):
+    """Rasterize an SVG for a width/height display box in inches at dpi"""
+    return rasterize(svg_path, *pixel_size(svg_path, width_in, height_in, dpi), cache_dir=cache_dir)
+
+
+def rasterize_many(entries, dpi=DEFAULT_DPI, cache_dir=CACHE_DIR, jobs=None):
+    """
+    Rasterize (svg path, width_in, height_in) entries in parallel.
+
+    Returns:
+        dict: {entry: PNG path}; entries that failed are left out
+    """
+    unique = list(dict.fromkeys(entries))
+
+    def render(entry):
+        try:
+            return rasterize_for_box(*entry, dpi=dpi, cache_dir=cache_dir)
+        except (RuntimeError, OSError, ET.ParseError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  Could not rasterize {entry[0]}: {e}")
+            return None
+
+    # rsvg-convert/inkscape render in subprocesses and CairoSVG mostly inside cairo,
+    # so a thread pool is enough to render in parallel
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(render, unique)
+        return {entry: png for entry, png in zip(unique, results) if png}
+
+
+def main(argv=None):
+    """Command-line entry point: pre-render SVGs into the cache"""
+    parser = argparse.ArgumentParser(description="Rasterize SVG artwork to cached PNGs")
+    parser.add_argument("svgs", nargs="*", help="SVG files (default: the 03-canvas-design artwork)")
+    parser.add_argument("--width", type=float, default=None, help="Display width in inches")
+    parser.add_argument("--height", type=float, default=None, help="Display height in inches")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Target resolution")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="Cache directory")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel renders")
+    args = parser.parse_args(argv)
+
+    svgs = args.svgs or sorted(str(p) for p in EMBLEMS_DIR.glob("*.svg"))
+    if not svgs:
+        print("No SVG files given")
+        return 1
+    if find_renderer() is None:
+        print("ERROR: No SVG renderer available")
+        print("Install with: pip install cairosvg (or install rsvg-convert / inkscape)")
+        return 1
+
+    results = rasterize_many([(svg, args.width, args.height) for svg in svgs], dpi=args.dpi,
+                             cache_dir=args.cache_dir, jobs=args.jobs)
+    for (svg, _, _), png in results.items():
+        print(f"✓ {svg} -> {png}")
+    return 0 if len(results) == len(svgs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Per-request telemetry ledger for upstream image generation calls.
+
+Every upstream request made by generate_images.generate_image() is appended
+to a local SQLite ledger (model, prompt hash, latency phases, status, retries,
+bytes, image count, formats and saved file names). A hedged call writes one
+row per attempt, with role "primary" or "hedge"; the attempt that lost the
+race is recorded with status "cancelled". Records are queued and written in batches by a
+background thread, so the request thread never waits on disk.
+
+Query it with:
+    python3 telemetry.py stats --since 7d --window 1d
+    python3 telemetry.py tail -n 20
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Ledger location; set TELEMETRY_DB=off to disable recording
+DEFAULT_DB = "telemetry.db"
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0  # seconds a partial batch may wait before being written
+QUEUE_LIMIT = 10000
+
+COLUMNS = (
+    "ts", "model", "prompt_sha256", "status", "http_status", "retries",
+    "latency_s", "ttfb_s", "download_s", "decode_s",
+    "bytes_out", "bytes_in", "images", "formats", "extra", "role",
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT,
+    prompt_sha256 TEXT,
+    status TEXT,
+    http_status INTEGER,
+    retries INTEGER,
+    latency_s REAL,
+    ttfb_s REAL,
+    download_s REAL,
+    decode_s REAL,
+    bytes_out INTEGER,
+    bytes_in INTEGER,
+    images INTEGER,
+    formats TEXT,
+    extra TEXT,
+    role TEXT
+);
+CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    if "role" not in {row[1] for row in conn.execute("PRAGMA table_info(calls)")}:
+        conn.execute("ALTER TABLE calls ADD COLUMN role TEXT")  # ledgers written before hedge rows
+    return conn
+
+
+class Ledger:
+    """Append-only call ledger with a background batch writer"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=QUEUE_LIMIT)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._writer, name="telemetry-ledger",
+                                                    daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def record(self, **fields):
+        """Queue one call record; never blocks (records are dropped if the queue is full)"""
+        fields.setdefault("ts", time.time())
+        if isinstance(fields.get("extra"), dict):
+            fields["extra"] = json.dumps(fields["extra"])
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(tuple(fields.get(c) for c in COLUMNS))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Wait (up to timeout) until every queued record has been written"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _writer(self):
+        conn = connect(self.path)
+        insert = f"INSERT INTO calls ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                conn.executemany(insert, batch)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Telemetry write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+_LEDGER = None
+
+
+def get_ledger():
+    """Process-wide ledger, or None when TELEMETRY_DB=off"""
+    global _LEDGER
+    path = os.environ.get("TELEMETRY_DB", DEFAULT_DB)
+    if path.lower() in ("", "off", "0", "false"):
+        return None
+    if _LEDGER is None or _LEDGER.path != path:
+        _LEDGER = Ledger(path)
+    return _LEDGER
+
+
+def record_call(**fields):
+    """Record one upstream call in the process-wide ledger (no-op when disabled)"""
+    ledger = get_ledger()
+    if ledger:
+        ledger.record(**fields)
+
+
+def recent_latencies(model, limit=500, db=None):
+    """Latencies (seconds) of the most recent successful calls to a model, oldest first"""
+    db = db or os.environ.get("TELEMETRY_DB", DEFAULT_DB)
+    if not os.path.exists(db):
+        return []
+    conn = connect(db)
+    try:
+        rows = conn.execute("SELECT latency_s FROM calls WHERE model = ? AND status = 'ok' "
+                            "AND latency_s IS NOT NULL ORDER BY ts DESC LIMIT ?", (model, limit)).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    return [r[0] for r in reversed(rows)]
+
+
+def generation_outputs(after_id=0, db=None):
+    """(row id, prompt sha256, [saved file names]) of successful calls after a row id, oldest first"""
+    db = db or os.environ.get("TELEMETRY_DB", DEFAULT_DB)
+    if not os.path.exists(db):
+        return []
+    conn = connect(db)
+    try:
+        rows = conn.execute("SELECT id, prompt_sha256, extra FROM calls WHERE id > ? AND status = 'ok' "
+                            "AND extra IS NOT NULL ORDER BY id", (after_id,)).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    outputs = []
+    for row_id, digest, extra in rows:
+        try:
+            names = json.loads(extra).get("outputs")
+        except (ValueError, AttributeError):
+            continue
+        if names:
+            outputs.append((row_id, digest, names))
+    return outputs
+
+
+# ----------------------
+# Query CLI
+# ----------------------
+def parse_duration(text):
+    """'90s', '15m', '6h', '7d' or '2w' -> seconds"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    text = text.strip().lower()
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def window_stats(rows):
+    """Aggregate (latency_s, status, bytes_in, images, role) rows into summary numbers"""
+    # A cancelled attempt's latency is only how long it ran before losing the race
+    latencies = sorted(r[0] for r in rows if r[0] is not None and r[1] != "cancelled")
+    ok = sum(1 for r in rows if r[1] == "ok")
+    images = sum(r[3] or 0 for r in rows)
+    bytes_in = sum(r[2] or 0 for r in rows if r[1] == "ok")
+    return {
+        "calls": len(rows),
+        "ok": ok,
+        "hedges": sum(1 for r in rows if r[4] == "hedge"),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "images": images,
+        "bytes_per_image": round(bytes_in / images) if images else None,
+    }
+
+
+def stats(db, since, window, model=None):
+    """Per-window stats for the last `since` seconds, oldest window first"""
+    now = time.time()
+    start = now - since
+    query = "SELECT ts, latency_s, status, bytes_in, images, role FROM calls WHERE ts >= ?"
+    params = [start]
+    if model:
+        query += " AND model = ?"
+        params.append(model)
+    conn = connect(db)
+    try:
+        rows = conn.execute(query + " ORDER BY ts", params).fetchall()
+    finally:
+        conn.close()
+
+    buckets = {}
+    for ts, *rest in rows:
+        buckets.setdefault(int((ts - start) // window), []).append(rest)
+
+    results = []
+    for index in sorted(buckets):
+        summary = window_stats(buckets[index])
+        summary["window_start"] = start + index * window
+        summary["per_hour"] = round(summary["calls"] / (window / 3600), 2)
+        results.append(summary)
+    total = window_stats([r[1:] for r in rows])
+    total["per_hour"] = round(total["calls"] / (since / 3600), 2) if since else None
+    return results, total
+
+
+def _fmt_seconds(value):
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Query the upstream call telemetry ledger")
+    parser.add_argument("--db", default=os.environ.get("TELEMETRY_DB", DEFAULT_DB), help="Ledger path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = sub.add_parser("stats", help="Latency percentiles and throughput per time window")
+    stats_parser.add_argument("--since", default="7d", help="How far back (e.g. 24h, 7d)")
+    stats_parser.add_argument("--window", default="1d", help="Window size (e.g. 1h, 1d)")
+    stats_parser.add_argument("--model", help="Only calls to this model")
+    stats_parser.add_argument("--json", action="store_true", help="Print JSON")
+
+    tail_parser = sub.add_parser("tail", help="Most recent calls")
+    tail_parser.add_argument("-n", type=int, default=20, help="Number of calls")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No ledger at {args.db}")
+        return 1
+
+    if args.command == "tail":
+        conn = connect(args.db)
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM calls ORDER BY ts DESC LIMIT ?",
+                            (args.n,)).fetchall()
+        conn.close()
+        for row in reversed(rows):
+            record = dict(zip(COLUMNS, row))
+            when = datetime.fromtimestamp(record["ts"]).isoformat(timespec="seconds")
+            print(f"{when} {record['model']} {record['status']:<12} {record['role'] or '-':<7} "
+                  f"{_fmt_seconds(record['latency_s']):>8} images={record['images']} "
+                  f"in={record['bytes_in']} prompt={str(record['prompt_sha256'])[:12]}")
+        return 0
+
+    windows, total = stats(args.db, parse_duration(args.since), parse_duration(args.window), args.model)
+    if args.json:
+        print(json.dumps({"windows": windows, "total": total}, indent=2))
+        return 0
+
+    print(f"{'window start':<20} {'calls':>6} {'ok':>5} {'hedges':>6} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'/hour':>7} {'bytes/img':>10}")
+    for w in windows + [dict(total, window_start=None)]:
+        label = (datetime.fromtimestamp(w["window_start"]).isoformat(timespec="minutes")
+                 if w["window_start"] is not None else "TOTAL")
+        print(f"{label:<20} {w['calls']:>6} {w['ok']:>5} {w['hedges']:>6} {_fmt_seconds(w['p50']):>8} "
+              f"{_fmt_seconds(w['p95']):>8} {_fmt_seconds(w['p99']):>8} "
+              f"{w['per_hour'] if w['per_hour'] is not None else '-':>7} "
+              f"{w['bytes_per_image'] if w['bytes_per_image'] is not None else '-':>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Malformed build options are rejected with a 400 before any builder is imported."""
+
+import pytest
+
+pytest.importorskip("flask")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    import server
+    from artifact_builds import ArtifactService
+
+    monkeypatch.setattr(server, "ARTIFACTS", ArtifactService(tmp_path / "artifacts"))
+    return server.app.test_client()
+
+
+@pytest.mark.parametrize("kind, body, message", [
+    ("dossier", [1, 2], "JSON object"),
+    ("dossier", [], "JSON object"),
+    ("dossier", "text", "JSON object"),
+    ("dossier", {"sections": 5}, "sections"),
+    ("dossier", {"images": "abc"}, "images"),
+    ("dossier", {"images": ["01_elara.png", 3]}, "images"),
+    ("dossier", {"heading": ["x"]}, "heading"),
+    ("dossier", {"skip_duplicates": "4"}, "skip_duplicates"),
+    ("dossier", {"skip_duplicates": True}, "skip_duplicates"),
+    ("dossier", {"skip_duplicates": 65}, "skip_duplicates"),
+    ("deck", {"spec": 5}, "spec"),
+    ("deck", {"dpi": True}, "dpi"),
+    ("deck", {"skip_duplicates": -1}, "skip_duplicates"),
+])
+def test_malformed_options_are_a_400(client, kind, body, message):
+    response = client.post(f"/api/artifacts/{kind}", json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
@@ -0,0 +1,41 @@
+"""Contact sheets leave out images that cannot be decoded."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL.Image")
+from PIL import Image
+
+from contact_sheet import build_contact_sheet
+
+
+def test_undecodable_images_are_left_off_the_sheet(tmp_path, capsys):
+    images, out = tmp_path / "images", tmp_path / "sheets"
+    images.mkdir()
+    Image.new("RGB", (40, 30), (200, 30, 30)).save(images / "01_a.png")
+    (images / "02_bad.png").write_bytes(b"garbage")
+
+    result = build_contact_sheet(images, out, tile=16, columns=2, gutter=0)
+    assert result == {"images": 1, "rethumbnailed": 1, "skipped": False}
+    assert "Skipping unreadable image" in capsys.readouterr().out
+    frames = json.loads((out / "sprite.json").read_text())["frames"]
+    assert [frame["name"] for frame in frames] == ["01_a.png"]
+
+    # Unchanged inputs: up to date, and the bad file is not counted
+    assert build_contact_sheet(images, out, tile=16, columns=2, gutter=0) == {
+        "images": 1, "rethumbnailed": 0, "skipped": True}
+
+    (images / "01_a.png").unlink()
+    assert build_contact_sheet(images, out, tile=16, columns=2, gutter=0) is None
+
+
+def test_server_serves_the_directory_the_builder_writes():
+    pytest.importorskip("flask")
+    import contact_sheet
+    import server
+
+    assert server.CONTACT_SHEETS_DIR == contact_sheet.OUTPUT_DIR
+    assert contact_sheet.OUTPUT_DIR.parent == Path(contact_sheet.__file__).parent  # not the cwd
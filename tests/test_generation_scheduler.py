@@ -0,0 +1,179 @@
+"""Priority lanes, rate budget and the local socket of the shared generation scheduler."""
+
+import json
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from generation_scheduler import BULK, INTERACTIVE, Scheduler, SchedulerClient, serve_socket
+
+
+class StubGenerate:
+    """generate_image() stand-in recording start order and times; names in `hold` block until released"""
+
+    def __init__(self, hold=()):
+        self.started = []
+        self.hold = set(hold)
+        self.release = threading.Event()
+        self.holding = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt_text, output_filename, **kwargs):
+        with self._lock:
+            self.started.append((output_filename, time.monotonic(), kwargs))
+        if output_filename in self.hold:
+            self.holding.set()
+            assert self.release.wait(10)
+        return [f"{output_filename}.png"]
+
+    def names(self):
+        return [name for name, _, _ in self.started]
+
+
+@pytest.fixture
+def close_later():
+    schedulers = []
+    yield schedulers.append
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_interactive_overtakes_queued_bulk_jobs(close_later):
+    stub = StubGenerate(hold={"b1"})
+    scheduler = Scheduler(rate=1000, burst=10, concurrency=1, generate=stub)
+    close_later(scheduler)
+
+    bulk = [scheduler.submit("p", f"b{i}", lane=BULK) for i in range(1, 5)]
+    assert stub.holding.wait(5)  # the only shared worker is busy with b1; b2-b4 are queued
+    interactive = scheduler.submit("p", "i1", lane=INTERACTIVE)
+
+    assert interactive.result(timeout=5) == ["i1.png"]
+    assert not bulk[0].done()
+    assert stub.names() == ["b1", "i1"]
+
+    stub.release.set()
+    assert [f.result(timeout=5) for f in bulk] == [[f"b{i}.png"] for i in range(1, 5)]
+    assert stub.names() == ["b1", "i1", "b2", "b3", "b4"]
+
+
+def test_queued_bulk_yields_to_waiting_interactive(close_later):
+    # A slow bucket: every job waits for a token, and the interactive one must win the next token
+    stub = StubGenerate()
+    scheduler = Scheduler(rate=10, burst=2, concurrency=2, generate=stub)
+    close_later(scheduler)
+
+    bulk = [scheduler.submit("p", f"b{i}", lane=BULK) for i in range(6)]
+    time.sleep(0.15)
+    interactive = scheduler.submit("p", "i1", lane=INTERACTIVE)
+    interactive.result(timeout=5)
+    for future in bulk:
+        future.result(timeout=5)
+    names = stub.names()
+    assert names.index("i1") <= 3  # not behind the whole bulk queue
+
+
+def test_token_bucket_limits_throughput(close_later):
+    stub = StubGenerate()
+    rate, burst, jobs = 20.0, 2, 12
+    scheduler = Scheduler(rate=rate, burst=burst, concurrency=4, generate=stub)
+    close_later(scheduler)
+
+    started = time.monotonic()
+    for future in [scheduler.submit("p", f"b{i}", lane=BULK) for i in range(jobs)]:
+        future.result(timeout=10)
+    elapsed = time.monotonic() - started
+
+    # Bulk work may not dip into the interactive reserve (1 token), so only burst - 1 start at once
+    minimum = (jobs - (burst - 1)) / rate
+    assert elapsed >= minimum * 0.9
+    assert elapsed < minimum + 1.0
+    starts = sorted(t for _, t, _ in stub.started)
+    window = [t for t in starts if t - starts[0] < 0.25]
+    assert len(window) <= (burst - 1) + 0.25 * rate + 1
+
+
+needs_unix_socket = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+def _raw_request(path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(request).encode("utf-8") + b"\n")
+            f.flush()
+            return json.loads(f.readline())
+
+
+@needs_unix_socket
+def test_socket_is_owner_only_and_always_bulk(tmp_path, close_later):
+    stub = StubGenerate()
+    scheduler = Scheduler(rate=1000, burst=10, concurrency=1, generate=stub)
+    close_later(scheduler)
+    path = str(tmp_path / "gen.sock")
+    server = serve_socket(scheduler, path)
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+        # A client asking for the interactive lane is still queued as bulk
+        assert _raw_request(path, {"prompt": "p", "name": "x1", "lane": INTERACTIVE}) == {"images": ["x1.png"]}
+        assert scheduler.stats[BULK]["submitted"] == 1
+        assert scheduler.stats[INTERACTIVE]["submitted"] == 0
+
+        client = SchedulerClient(path)
+        try:
+            assert client.generate("p", "x2", seed=7) == ["x2.png"]
+        finally:
+            client.close()
+        assert stub.started[-1][2] == {"seed": 7}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@needs_unix_socket
+@pytest.mark.parametrize("request_body", [
+    {"prompt": "p", "name": "../escape"},
+    {"prompt": "p", "name": "sub/dir"},
+    {"prompt": "p", "name": "/abs"},
+    {"prompt": "p", "name": ""},
+    {"prompt": "p", "name": 5},
+    {"prompt": "", "name": "ok"},
+    {"prompt": "p", "name": "ok", "seed": "7"},
+    ["not", "an", "object"],
+])
+def test_socket_rejects_invalid_requests(tmp_path, close_later, request_body):
+    stub = StubGenerate()
+    scheduler = Scheduler(rate=1000, burst=10, concurrency=1, generate=stub)
+    close_later(scheduler)
+    path = str(tmp_path / "gen.sock")
+    server = serve_socket(scheduler, path)
+    try:
+        reply = _raw_request(path, request_body)
+        assert "error" in reply
+        assert stub.started == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_hedge_takes_a_token_from_the_rate_budget(close_later):
+    permits = []
+
+    def hedging_generate(prompt_text, output_filename, hedge=False, hedge_permit=None):
+        permits.append(hedge_permit())
+        return [f"{output_filename}.png"]
+
+    scheduler = Scheduler(rate=0.01, burst=3, concurrency=1, generate=hedging_generate)
+    close_later(scheduler)
+
+    # The job takes 1 of 3 tokens; its hedge may take the next but not the interactive reserve
+    assert scheduler.submit("p", "b1", lane=BULK, hedge=True).result(timeout=5) == ["b1.png"]
+    assert permits == [True]
+    assert not scheduler.try_take_token(BULK)
+    assert scheduler.try_take_token(INTERACTIVE)
+    assert not scheduler.try_take_token(INTERACTIVE)
+
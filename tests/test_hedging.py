@@ -0,0 +1,66 @@
+"""Hedged calls: the rate permit and one telemetry row per attempt."""
+
+import threading
+
+import pytest
+
+import generate_images
+from hedging import HedgeCancelled, HedgePolicy, run_hedged
+
+
+def test_hedge_is_skipped_without_a_permit():
+    policy = HedgePolicy(max_fraction=1.0, default_delay=0.05)
+
+    def slow(cancel):
+        threading.Event().wait(0.3)
+        return "primary"
+
+    asked = []
+    result = run_hedged(slow, lambda cancel: "hedge", policy, permit=lambda: asked.append(1) or False)
+    assert result == ("primary", "primary", False)
+    assert asked == [1]
+    assert run_hedged(slow, lambda cancel: "hedge", policy, permit=lambda: True) == ("hedge", "hedge", True)
+
+
+def _reply(payload):
+    image = "data:image/png;base64,iVBORw0KGgo="
+    return {"json": {"choices": [{"message": {"images": [{"type": "image_url", "image_url": {"url": image}}]}}]},
+            "model": payload["model"], "http_status": 200, "bytes_out": 1, "bytes_in": 2,
+            "ttfb_s": 0.01, "download_s": 0.01}
+
+
+@pytest.fixture
+def ledger(monkeypatch, tmp_path):
+    rows = []
+    monkeypatch.setattr(generate_images, "record_call", lambda **row: rows.append(row))
+    monkeypatch.setattr(generate_images, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(generate_images, "_HEDGE_POLICY",
+                        HedgePolicy(max_fraction=1.0, default_delay=0.05, fallback_model="vendor/fallback"))
+    return rows
+
+
+def test_hedged_call_writes_one_row_per_attempt(monkeypatch, ledger):
+    def post_completion(url, headers, payload, cancel=None):
+        if payload["model"] == generate_images.MODEL:  # the primary is slow and loses the race
+            while not cancel.is_set():
+                cancel.wait(0.01)
+            raise HedgeCancelled()
+        return _reply(payload)
+
+    monkeypatch.setattr(generate_images, "post_completion", post_completion)
+    assert generate_images.generate_image("p", "x", api_key="k", hedge=True) == ["x.png"]
+
+    rows = {row["role"]: row for row in ledger}
+    assert len(ledger) == 2 and set(rows) == {"primary", "hedge"}
+    assert rows["hedge"]["status"] == "ok" and rows["hedge"]["model"] == "vendor/fallback"
+    assert rows["hedge"]["images"] == 1
+    assert rows["primary"]["status"] == "cancelled" and rows["primary"]["model"] == generate_images.MODEL
+    assert rows["primary"]["latency_s"] >= 0.05
+    assert all(row["retries"] == 0 for row in ledger)
+
+
+def test_unhedged_call_writes_a_single_primary_row(monkeypatch, ledger):
+    monkeypatch.setattr(generate_images, "post_completion",
+                        lambda url, headers, payload, cancel=None: _reply(payload))
+    assert generate_images.generate_image("p", "y", api_key="k", hedge=True) == ["y.png"]
+    assert [(row["role"], row["status"], row["retries"]) for row in ledger] == [("primary", "ok", 0)]
@@ -0,0 +1,81 @@
+"""Near-duplicate grouping (multi-index hashing) against a brute-force reference."""
+
+import numpy as np
+import pytest
+
+from image_dedupe import PhashIndex, _popcount, duplicate_groups, find_duplicates, similar_pairs
+
+
+def synthetic_hashes(count, rng):
+    """Random 64-bit hashes plus planted near-duplicates (1-10 flipped bits) and exact copies"""
+    base = rng.integers(0, 2**32, count, dtype=np.uint64) << np.uint64(32)
+    base |= rng.integers(0, 2**32, count, dtype=np.uint64)
+    copies = []
+    for source in rng.integers(0, count, count // 5):
+        value = int(base[source])
+        for bit in rng.choice(64, size=rng.integers(0, 11), replace=False):
+            value ^= 1 << int(bit)
+        copies.append(value)
+    return np.concatenate([base, np.array(copies, dtype=np.uint64)])
+
+
+def brute_force_groups(names, hashes, threshold):
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i in range(len(hashes)):
+        # Bit counts via unpackbits, independent of the module's popcount
+        distances = np.unpackbits((hashes[i + 1:] ^ hashes[i]).view(np.uint8)).reshape(-1, 64).sum(axis=1)
+        for j in np.nonzero(distances <= threshold)[0] + i + 1:
+            a, b = find(i), find(int(j))
+            if a != b:
+                parent[b] = a
+    groups = {}
+    for i, name in enumerate(names):
+        groups.setdefault(find(i), set()).add(name)
+    return {frozenset(g) for g in groups.values() if len(g) > 1}
+
+
+@pytest.mark.parametrize("threshold", [0, 3, 8, 12])
+def test_groups_match_brute_force(threshold):
+    rng = np.random.default_rng(threshold)
+    hashes = synthetic_hashes(2500, rng)
+    names = [f"{i:05d}.png" for i in range(len(hashes))]
+
+    groups = duplicate_groups(names, hashes, threshold)
+    assert {frozenset(g) for g in groups} == brute_force_groups(names, hashes, threshold)
+
+
+def test_pairs_are_exactly_those_within_threshold():
+    rng = np.random.default_rng(7)
+    hashes = synthetic_hashes(1500, rng)
+    i, j = similar_pairs(hashes, 8)
+    found = set(zip(i.tolist(), j.tolist()))
+
+    distances = _popcount(hashes[:, None] ^ hashes[None, :])
+    rows, cols = np.nonzero(np.triu(distances <= 8, k=1))
+    assert found == set(zip(rows.tolist(), cols.tolist()))
+
+
+def test_popcount_fallback_without_bitwise_count(monkeypatch):
+    values = np.array([0, 1, 0xFF, 2**63, 2**64 - 1, 0x5555555555555555], dtype=np.uint64)
+    expected = [bin(int(v)).count("1") for v in values]
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert _popcount(values).tolist() == expected
+
+
+def test_undecodable_images_are_skipped(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(tmp_path / "01_a.png")
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(tmp_path / "03_copy.png")
+    (tmp_path / "02_bad.png").write_bytes(b"garbage")
+
+    index = PhashIndex(tmp_path)
+    index.refresh()
+    assert sorted(index.entries) == ["01_a.png", "03_copy.png"]
+    paths = [tmp_path / "01_a.png", tmp_path / "02_bad.png", tmp_path / "03_copy.png"]
+    assert find_duplicates(paths) == {str(tmp_path / "03_copy.png")}
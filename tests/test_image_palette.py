@@ -0,0 +1,35 @@
+"""Palette analysis skips files that cannot be decoded."""
+
+import pytest
+
+pytest.importorskip("PIL.Image")
+from PIL import Image
+
+from image_palette import PaletteIndex, analyze_batch, main
+
+
+def test_undecodable_images_are_skipped(tmp_path, capsys):
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(tmp_path / "01_a.png")
+    (tmp_path / "bad.png").write_bytes(b"\x89PNG\r\n\x1a")  # 7 bytes of a PNG signature
+
+    index = PaletteIndex(tmp_path)
+    assert index.refresh() == 2
+    assert index.get("01_a.png")["palette"][0]["rgb"] == [200, 30, 30]
+    assert index.get("bad.png") is None
+    assert len(index.analyses) == 1
+    assert "Skipping unreadable image" in capsys.readouterr().out
+
+    assert main([str(tmp_path)]) == 0
+    assert "01_a.png" in capsys.readouterr().out
+
+
+def test_batch_keeps_positions_around_bad_files(tmp_path):
+    Image.new("RGB", (32, 32), (10, 10, 10)).save(tmp_path / "dark.png")
+    Image.new("RGB", (32, 32), (250, 250, 250)).save(tmp_path / "light.png")
+    (tmp_path / "bad.png").write_bytes(b"garbage")
+
+    results = analyze_batch([tmp_path / "dark.png", tmp_path / "bad.png", tmp_path / "light.png"])
+    assert results[1] is None
+    assert results[0]["luminance"] < 0.01 < 0.9 < results[2]["luminance"]
+    assert analyze_batch([tmp_path / "bad.png"]) == [None]
+    assert analyze_batch([]) == []
@@ -0,0 +1,180 @@
+"""
+MirrorCache and /mirror/ against a local stand-in origin.
+
+The origin is an http.server on localhost that serves a few files with
+ETag/Last-Modified, answers conditional requests with 304, logs every
+request, and can be switched off to simulate an outage.
+"""
+
+import hashlib
+import os
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mirror_cache import MirrorCache, MirrorError
+
+LAST_MODIFIED = formatdate(1_700_000_000, usegmt=True)
+
+
+class StandInOrigin:
+    """Local origin: files[path] = bytes; log holds (path, status, body bytes sent)"""
+
+    def __init__(self):
+        self.files = {}
+        self.log = []
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.lstrip("/")
+                body = origin.files.get(path)
+                if body is None:
+                    self._reply(path, 404, b"missing")
+                    return
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(path, 304, b"", etag=etag)
+                else:
+                    self._reply(path, 200, body, etag=etag, content_type="image/png")
+
+            def _reply(self, path, status, body, etag=None, content_type="text/plain"):
+                origin.log.append((path, status, len(body)))
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", LAST_MODIFIED)
+                if status != 304:
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def off(self):
+        """Stop answering; further connections are refused"""
+        if self.thread is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread = None
+
+    def requests_for(self, path):
+        return [entry for entry in self.log if entry[0] == path]
+
+
+@pytest.fixture
+def origin():
+    origin = StandInOrigin()
+    origin.files["gallery/a.png"] = b"A" * 1000
+    origin.files["gallery/b.png"] = b"B" * 1000
+    origin.files["gallery/c.png"] = b"C" * 1000
+    yield origin
+    origin.off()
+
+
+@pytest.fixture
+def cache(origin, tmp_path):
+    return MirrorCache(origin=origin.url, cache_dir=tmp_path / "mirror", max_bytes=10_000, revalidate_after=300)
+
+
+def test_first_fetch_is_a_miss_and_repeat_is_a_disk_hit(origin, cache):
+    body_path, meta = cache.get("gallery/a.png")
+    assert body_path.read_bytes() == b"A" * 1000
+    assert meta["content_type"] == "image/png"
+    assert origin.requests_for("gallery/a.png") == [("gallery/a.png", 200, 1000)]
+
+    again, _ = cache.get("/gallery/a.png")
+    assert again == body_path
+    assert len(origin.requests_for("gallery/a.png")) == 1  # served from disk
+
+
+def test_expired_entry_is_revalidated_with_304_and_no_body(origin, cache):
+    cache.get("gallery/a.png")
+    cache.revalidate_after = 0
+
+    body_path, meta = cache.get("gallery/a.png")
+    assert origin.requests_for("gallery/a.png") == [("gallery/a.png", 200, 1000), ("gallery/a.png", 304, 0)]
+    assert body_path.read_bytes() == b"A" * 1000
+    assert meta["last_modified"] == LAST_MODIFIED
+    assert not meta.get("stale")
+
+
+def test_changed_origin_file_is_refetched_on_revalidation(origin, cache):
+    cache.get("gallery/a.png")
+    origin.files["gallery/a.png"] = b"a2" * 10
+    cache.revalidate_after = 0
+
+    body_path, _ = cache.get("gallery/a.png")
+    assert body_path.read_bytes() == b"a2" * 10
+    assert origin.requests_for("gallery/a.png")[-1] == ("gallery/a.png", 200, 20)
+
+
+def test_stale_entry_is_served_while_origin_is_down(origin, cache):
+    cache.get("gallery/a.png")
+    origin.off()
+    cache.revalidate_after = 0
+
+    body_path, meta = cache.get("gallery/a.png")
+    assert meta["stale"] is True
+    assert body_path.read_bytes() == b"A" * 1000
+
+    with pytest.raises(MirrorError) as error:
+        cache.get("gallery/b.png")  # never cached
+    assert error.value.status == 502
+
+
+def test_missing_origin_file_is_a_404(origin, cache):
+    with pytest.raises(MirrorError) as error:
+        cache.get("gallery/nope.png")
+    assert error.value.status == 404
+    with pytest.raises(MirrorError):
+        cache.get("../secrets.txt")
+
+
+def test_least_recently_used_entry_is_evicted_over_budget(origin, cache):
+    cache.max_bytes = 2500  # room for two 1000-byte entries
+    a, _ = cache.get("gallery/a.png")
+    b, _ = cache.get("gallery/b.png")
+    # a was used after b, so b is the least recently used
+    os.utime(b, (1_000, 1_000))
+    os.utime(a, (2_000, 2_000))
+
+    c, _ = cache.get("gallery/c.png")
+    assert a.exists() and c.exists()
+    assert not b.exists() and not b.with_suffix(".json").exists()
+    assert sum(size for _, size, _ in cache.usage()) <= cache.max_bytes
+
+    cache.get("gallery/b.png")  # evicted, so fetched again
+    assert len(origin.requests_for("gallery/b.png")) == 2
+
+
+def test_mirror_route_serves_cached_copy_with_origin_validators(origin, cache, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "_MIRROR", cache)
+    client = server.app.test_client()
+
+    response = client.get("/mirror/gallery/a.png")
+    assert response.status_code == 200
+    assert response.data == b"A" * 1000
+    assert response.headers["X-Mirror-Cache"] == "ok"
+    assert response.headers["Last-Modified"] == LAST_MODIFIED
+
+    etag = response.headers["ETag"]
+    assert client.get("/mirror/gallery/a.png", headers={"If-None-Match": etag}).status_code == 304
+
+    origin.off()
+    cache.revalidate_after = 0
+    response = client.get("/mirror/gallery/a.png")
+    assert response.status_code == 200
+    assert response.headers["X-Mirror-Cache"] == "stale"
+    assert client.get("/mirror/gallery/b.png").status_code == 502
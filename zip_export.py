@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Streaming ZIP export of generated images and built artifacts.
+
+Backs GET /api/export.zip in server.py. The archive is produced as a
+generator of byte chunks while it is being sent: every file is read in small
+chunks and written straight through, so memory stays constant regardless of
+export size and nothing is staged on disk. Already-compressed formats
+(PNG/JPEG/WebP, and the zip-based DOCX/PPTX) are stored uncompressed; other
+files are deflated. Entries are written with data descriptors (sizes and CRC
+follow the data), and ZIP64 is used when an export exceeds 4 GB.
+"""
+
+import fnmatch
+import io
+import os
+import time
+import zipfile
+from pathlib import Path
+
+from generate_images import OUTPUT_DIR
+
+ROOT = Path(__file__).parent
+CHUNK_SIZE = 256 * 1024
+
+# Formats that are already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".docx", ".pptx", ".zip"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# kind -> (name glob, directories searched) for built documents
+ARTIFACTS = {
+    "dossier": ("Blood_Assassin_Character_Dossier*.docx",
+                (Path("release"), Path("."), ROOT / "phase-1-character-dossier")),
+    "deck": ("Blood_Assassin_Pitch_Deck*.pptx", (Path("release"), Path("."), ROOT / "phase-2-pptx-pitch-deck")),
+}
+KINDS = ("images",) + tuple(ARTIFACTS)
+
+
+def select_files(kinds=KINDS, match=None, since=None, images_dir=OUTPUT_DIR):
+    """
+    Files to export, as (archive name, path) pairs.
+
+    Args:
+        kinds: Any of "images", "dossier", "deck"
+        match: Optional glob on the file name (e.g. "0*_*portrait*")
+        since: Optional Unix time; only files modified at or after it
+    """
+    selected = []
+
+    def keep(path):
+        return ((match is None or fnmatch.fnmatch(path.name, match))
+                and (since is None or path.stat().st_mtime >= since))
+
+    if "images" in kinds and Path(images_dir).is_dir():
+        for path in sorted(Path(images_dir).iterdir()):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and keep(path):
+                selected.append((f"generated-images/{path.name}", path))
+
+    for kind, (pattern, directories) in ARTIFACTS.items():
+        if kind not in kinds:
+            continue
+        seen = set()
+        for directory in directories:
+            for path in sorted(Path(directory).glob(pattern)):
+                if path.name in seen or path.stem.endswith("_backup") or not keep(path):
+                    continue
+                seen.add(path.name)
+                selected.append((f"{kind}/{path.name}", path))
+    return selected
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink that collects what zipfile writes until drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files, chunk_size=CHUNK_SIZE):
+    """
+    Yield a ZIP archive of (archive name, path) pairs chunk by chunk.
+
+    Files that disappear while the export is running are skipped.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for arcname, path in files:
+            try:
+                src = open(path, "rb")
+            except OSError:
+                continue
+            with src:
+                st = os.fstat(src.fileno())
+                # ZIP timestamps start at 1980
+                info = zipfile.ZipInfo(arcname, time.localtime(max(st.st_mtime, 315532800))[:6])
+                info.compress_type = (zipfile.ZIP_STORED if Path(path).suffix.lower() in STORED_EXTENSIONS
+                                      else zipfile.ZIP_DEFLATED)
+                info.external_attr = 0o644 << 16
+                with archive.open(info, "w", force_zip64=st.st_size > zipfile.ZIP64_LIMIT * 0.9) as dst:
+                    for chunk in iter(lambda: src.read(chunk_size), b""):
+                        dst.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()  # central directory